@@ -6,6 +6,14 @@
 #define NUM_CHORDS 7
 #define VOICES_PER_CHORD 3
 
+// Serial output: 0 = text lines ("f1;f2;f3"), 1 = compact binary frames
+// Frame: 0xA5 | type | length | payload | checksum (see visualizer/teensy_protocol.py)
+#define SERIAL_BINARY_FRAMES 0
+#define FRAME_HEADER 0xA5
+#define FRAME_FREQ 0x01
+#define FRAME_KEY 0x02
+#define FRAME_CHORD 0x03
+
 // PINS
 #define VOL_PIN A8
 #define T60_PIN A0
@@ -46,6 +54,48 @@ AudioConnection* patchDelay;
 
 bool lastState[NUM_CHORDS] = { false };
 
+void sendFrame(uint8_t type, const uint8_t* payload, uint8_t len) {
+    uint8_t sum = type + len;
+    for (uint8_t i = 0; i < len; i++) {
+        sum += payload[i];
+    }
+    Serial.write(FRAME_HEADER);
+    Serial.write(type);
+    Serial.write(len);
+    Serial.write(payload, len);
+    Serial.write(sum);
+}
+
+void sendKey(int key) {
+#if SERIAL_BINARY_FRAMES
+    uint8_t b = (uint8_t)key;
+    sendFrame(FRAME_KEY, &b, 1);
+#else
+    Serial.printf("Key changed: %d\n", key);
+#endif
+}
+
+void sendChordType(bool major) {
+#if SERIAL_BINARY_FRAMES
+    uint8_t b = major ? 1 : 0;
+    sendFrame(FRAME_CHORD, &b, 1);
+#else
+    Serial.println(major ? "Major" : "Minor");
+#endif
+}
+
+void sendFrequencies(const float* freqs) {
+#if SERIAL_BINARY_FRAMES
+    // float32 little-endian, same layout as the Teensy's memory
+    sendFrame(FRAME_FREQ, (const uint8_t*)freqs, VOICES_PER_CHORD * sizeof(float));
+#else
+    Serial.printf("%.2f;%.2f;%.2f\n",
+        freqs[0],
+        freqs[1],
+        freqs[2]);
+#endif
+}
+
 void setup() {
     // Init pins
     for (int i = 0; i < NUM_CHORDS; i++) {
@@ -90,15 +140,15 @@ void loop() {
             if (shift) {
                 if (i == 0) {
                     root = (root + 5) % 12;
-                    Serial.printf("Key changed: %d\n", root);
+                    sendKey(root);
                 }
                 else if (i == 1) {
                     root = (root + 7) % 12;
-                    Serial.printf("Key changed: %d\n", root);
+                    sendKey(root);
                 }
                 else if (i == 2) {
                     isMajor = !isMajor;
-                    Serial.println(isMajor ? "Major" : "Minor");
+                    sendChordType(isMajor);
                 }
             } else {
                 for (int v = 0; v < VOICES_PER_CHORD; v++) {
@@ -151,10 +201,7 @@ void loop() {
             if (!noteTriggered[v] && dt > (unsigned long)(v * strumDelay)) {  // un ecart entre chaque note
 
                 if (v == 0) {
-                    Serial.printf("%.2f;%.2f;%.2f\n",
-                        freqArray[0],
-                        freqArray[1],
-                        freqArray[2]);
+                    sendFrequencies(freqArray);
                 }
 
                 voices[v].setParamValue("note", noteValues[v]);
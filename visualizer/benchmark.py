@@ -0,0 +1,485 @@
+"""
+Benchmark Module
+
+Headless frame-time benchmark for the visualizers. Plays scripted chord
+sequences into TripleFrequency3DVisualizer and the demo_v2
+PhaseShiftVisualizer on an offscreen SDL display (dummy video driver),
+advancing a simulated 60 FPS clock so trail lengths do not depend on how
+fast the machine renders. Trail capacity (MAX_POINTS), lerp_steps, delay
+and volume are swept, and p50/p95/p99 frame times per stage (update,
+project, sort, rasterize, background, UI) are written to JSON that can be
+compared between commits.
+
+Usage:
+    python benchmark.py --out bench.json
+    python benchmark.py --out new.json --compare bench.json
+    python benchmark.py --only 3d --replay stage.tses
+    python benchmark.py --only 3d --renderer gl
+    python benchmark.py --only 3d --renderer phosphor
+    python benchmark.py --only 3d --voices 12
+    python benchmark.py --only 3d --pcm
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pygame
+
+import visualizer as app
+from clock import ManualClock
+from serial_session import ReplaySource, load_session
+from ks_render import SAMPLE_RATE, render_strum
+from pcm_source import BufferSource, PcmLissajous
+from teensy_protocol import MIN_VOICES
+from teensy_stub import VOICES_PER_CHORD, strum_script
+from ui import BackgroundLayer, Sidebar, Theme
+from visualizer_3d import FADE_TIME, MAX_POINTS, TripleFrequency3DVisualizer
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "pc"))
+import demo_v2  # noqa: E402  (pc/ holds the phase-shift demo)
+
+FPS = 60
+CHORD_INTERVAL = 0.75  # Seconds between scripted chords
+
+# I - IV - V - I - vi - IV - V - I in C major, as played by ks_poly_accord
+CHORD_DEGREES = (0, 3, 4, 0, 5, 3, 4, 0)
+# demo_v2 note keys held for the same progression
+PHASE_CHORDS = (
+    ("1", "3", "5"),
+    ("4", "6", "8"),
+    ("5", "7", "2"),
+    ("1", "3", "5"),
+    ("6", "8", "3"),
+    ("4", "6", "8"),
+    ("5", "7", "2"),
+    ("1", "3", "5"),
+)
+
+BASE_3D = {
+    "max_points": MAX_POINTS,
+    "lerp_steps": 30,
+    "delay": 0.0,
+    "volume": 1.0,
+    "fixed_step": False,
+}
+SWEEP_3D = {
+    "max_points": (2000, 5000, 20000, MAX_POINTS),
+    "lerp_steps": (5, 15, 30, 50),
+    "delay": (0.0, 0.5, 1.0),
+    "volume": (0.0, 0.5, 1.0),
+    "fixed_step": (False, True),
+}
+BASE_PHASE = {"lerp_steps": 25}
+SWEEP_PHASE = {"lerp_steps": (5, 25, 50)}
+
+STAGES_3D = ("update", "project", "sort", "rasterize", "background", "ui", "frame")
+STAGES_PHASE = ("update", "rasterize", "background", "ui", "frame")
+
+
+def percentiles(samples):
+    """Summarize stage durations.
+    Inputs: list of durations in seconds.
+    Outputs: dict with p50/p95/p99/mean in milliseconds."""
+    data = np.asarray(samples, dtype=np.float64) * 1e3
+    p50, p95, p99 = np.percentile(data, [50, 95, 99])
+    return {
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "mean_ms": round(float(data.mean()), 4),
+    }
+
+
+def sweep_cases(base, sweep, grid=False):
+    """Parameter sets to benchmark.
+    Inputs: base parameters, candidate values per parameter, grid flag.
+    Outputs: list of parameter dicts - one parameter varied at a time around
+    base (default) or the full cartesian product (grid=True)."""
+    if grid:
+        names = list(sweep)
+        return [dict(zip(names, combo)) for combo in itertools.product(*sweep.values())]
+    cases = []
+    for name, values in sweep.items():
+        for value in values:
+            params = dict(base, **{name: value})
+            if params not in cases:
+                cases.append(params)
+    return cases
+
+
+def _frame_stages(main_surf, background, draw_viz):
+    """Draw the main viewport and time background vs visualizer work.
+    Inputs: viewport subsurface, BackgroundLayer, callable drawing the visualizer.
+    Outputs: seconds spent on the background (grid and corner layer)."""
+    t0 = time.perf_counter()
+    background.draw(main_surf)
+    t1 = time.perf_counter()
+    draw_viz(main_surf)
+    return t1 - t0
+
+
+def run_3d(
+    screen,
+    params,
+    frames,
+    warmup,
+    seed=0,
+    session=None,
+    renderer="software",
+    voices=VOICES_PER_CHORD,
+    pcm=False,
+):
+    """Benchmark TripleFrequency3DVisualizer for one parameter set.
+    Inputs: display surface, params (max_points, lerp_steps, delay, volume,
+    fixed_step),
+    measured frame count, warm-up frame count, RNG seed, an optional
+    recorded session (load_session result) replayed instead of the script
+    the trail renderer ("software", "gl" headless through EGL, or
+    "phosphor") and the number of voices per scripted chord; pcm plots the script rendered
+    through ks_render (audio-driven mode) instead of the synthesized curve.
+    Outputs: case dict with params, mean live points and stage percentiles."""
+    replay = None
+    if session is not None:
+        # One frame of session time per drain: input and clock are repeatable
+        replay = ReplaySource(session, speed=None, frame_dt=1.0 / FPS, loop=True)
+        replay.start()
+        clock = replay.clock
+    else:
+        clock = ManualClock()
+    viz = TripleFrequency3DVisualizer(
+        app.MAIN_VIEW_WIDTH,
+        app.HEIGHT,
+        max_points=params["max_points"],
+        clock=clock,
+        seed=seed,
+    )
+    viz.lerp_steps = params["lerp_steps"]
+    if params["fixed_step"]:
+        viz.set_fixed_timestep(1.0 / FPS)
+    viz.set_delay(params["delay"])
+    viz.set_volume(params["volume"])
+    if renderer == "gl":
+        from gl_renderer import GLRenderer
+
+        viz.set_renderer(GLRenderer(backend="egl"))
+    elif renderer == "phosphor":
+        from phosphor import PhosphorRenderer
+
+        viz.set_renderer(PhosphorRenderer())
+    if pcm and replay is None:
+        # One loop of the audio lasts exactly one pass over the chord script
+        audio, _ = render_strum(
+            CHORD_DEGREES,
+            interval=CHORD_INTERVAL,
+            tail=CHORD_INTERVAL,
+            voices=voices,
+            seed=seed,
+        )
+        viz.set_point_source(PcmLissajous(BufferSource(audio, SAMPLE_RATE)))
+    ui, widgets = app.build_sidebar(viz)
+    sidebar = Sidebar((0, 0, app.SIDEBAR_WIDTH, app.HEIGHT), ui)
+    main_surf = screen.subsurface(
+        (app.SIDEBAR_WIDTH, 0, app.MAIN_VIEW_WIDTH, app.HEIGHT)
+    )
+    layer = BackgroundLayer()
+
+    chords = [event[1] for _, event in strum_script(CHORD_DEGREES, voices=voices)]
+    samples = {stage: [] for stage in STAGES_3D}
+    points = []
+    chord = None
+    for frame in range(warmup + frames):
+        if replay is not None:
+            freqs = [ev.value for ev in replay.drain_events() if ev.kind == "freq"]
+        else:
+            index = int(frame / FPS / CHORD_INTERVAL) % len(chords)
+            freqs = [chords[index]] if index != chord else []
+            chord = index
+        for chord_freqs in freqs:
+            viz.set_frequencies(chord_freqs)
+            f1, f2, f3 = chord_freqs[:3]
+            widgets["bar_x"].set_value(f1)
+            widgets["bar_y"].set_value(f2)
+            widgets["bar_z"].set_value(f3)
+
+        t_frame = time.perf_counter()
+        viz.update()
+        t_ui = time.perf_counter()
+        widgets["points"].set_text(f"Points: {len(viz.points)}")
+        widgets["tilt"].set_text(f"Tilt: {viz.base_rot_deg:.0f}°")
+        sidebar.draw(screen, (0, 0))
+        ui_time = time.perf_counter() - t_ui
+        background = _frame_stages(main_surf, layer, viz.draw)
+        frame_time = time.perf_counter() - t_frame
+        if replay is None:
+            clock.advance(1.0 / FPS)
+
+        if frame >= warmup:
+            for stage in ("update", "project", "sort", "rasterize"):
+                samples[stage].append(viz.frame_stats[stage])
+            samples["background"].append(background)
+            samples["ui"].append(ui_time)
+            samples["frame"].append(frame_time)
+            points.append(len(viz.points))
+
+    viz.set_renderer(None)
+    name = "3d" if replay is None else "3d-replay"
+    if replay is None and voices != VOICES_PER_CHORD:
+        name = f"{name}-{voices}v"
+    if viz.point_source is not None:
+        viz.set_point_source(None)
+        name = f"{name}-pcm"
+    return {
+        "visualizer": name if renderer == "software" else f"{name}-{renderer}",
+        "params": params,
+        "points": round(float(np.mean(points)), 1),
+        "stages": {stage: percentiles(samples[stage]) for stage in STAGES_3D},
+    }
+
+
+def run_phase(screen, params, frames, warmup):
+    """Benchmark demo_v2.PhaseShiftVisualizer for one parameter set.
+    Inputs: display surface, params (lerp_steps), measured and warm-up frames.
+    Outputs: case dict with params, mean live points and stage percentiles."""
+    clock = ManualClock()
+    viz = demo_v2.PhaseShiftVisualizer(demo_v2.MAIN_VIEW_WIDTH, demo_v2.HEIGHT)
+    viz.clock = clock
+    viz.lerp_steps = params["lerp_steps"]
+    ui, widgets = demo_v2.build_sidebar(viz)
+    sidebar = Sidebar((0, 0, demo_v2.SIDEBAR_WIDTH, demo_v2.HEIGHT), ui)
+    main_surf = screen.subsurface(
+        (demo_v2.SIDEBAR_WIDTH, 0, demo_v2.MAIN_VIEW_WIDTH, demo_v2.HEIGHT)
+    )
+    layer = BackgroundLayer()
+
+    samples = {stage: [] for stage in STAGES_PHASE}
+    points = []
+    chord = None
+    for frame in range(warmup + frames):
+        index = int(frame / FPS / CHORD_INTERVAL) % len(PHASE_CHORDS)
+        if index != chord:
+            chord = index
+            viz.set_notes(list(PHASE_CHORDS[chord]))
+
+        t_frame = time.perf_counter()
+        viz.update()
+        t_ui = time.perf_counter()
+        widgets["waves"].set_text(f"Waves: {len(viz.waves)}")
+        widgets["points"].set_text(f"Points: {len(viz.points)}")
+        sidebar.draw(screen, (0, 0))
+        t_main = time.perf_counter()
+        t_draw = []
+
+        def draw_viz(surf):
+            t0 = time.perf_counter()
+            viz.draw(surf)
+            t_draw.append(time.perf_counter() - t0)
+
+        background = _frame_stages(main_surf, layer, draw_viz)
+        frame_time = time.perf_counter() - t_frame
+        clock.advance(1.0 / FPS)
+
+        if frame >= warmup:
+            samples["update"].append(t_ui - t_frame)
+            samples["ui"].append(t_main - t_ui)
+            samples["rasterize"].append(t_draw[0])
+            samples["background"].append(background)
+            samples["frame"].append(frame_time)
+            points.append(len(viz.points))
+
+    return {
+        "visualizer": "phase",
+        "params": params,
+        "points": round(float(np.mean(points)), 1),
+        "stages": {stage: percentiles(samples[stage]) for stage in STAGES_PHASE},
+    }
+
+
+def case_key(case):
+    """Identify a case across result files (visualizer plus parameters)."""
+    params = ",".join(f"{k}={v}" for k, v in sorted(case["params"].items()))
+    return f"{case['visualizer']}[{params}]"
+
+
+def _git_revision():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            timeout=5,
+        )
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(
+    frames=240,
+    warmup=None,
+    grid=False,
+    which=("3d", "phase"),
+    seed=0,
+    replay=None,
+    renderer="software",
+    voices=VOICES_PER_CHORD,
+    pcm=False,
+):
+    """Run the whole sweep headlessly.
+    Inputs: measured frames per case, warm-up frames (defaults to one
+    FADE_TIME so trails reach steady state), grid flag, visualizers to run
+    ("3d" and/or "phase"), jitter RNG seed and optional session file whose
+    recorded input drives the 3D sweep instead of the chord script, the
+    3D trail renderer, the voices per scripted chord and the audio-driven
+    (ks_render PCM) mode flag.
+    Outputs: result dict with "meta" and "cases" (see module docstring)."""
+    if warmup is None:
+        warmup = int(FADE_TIME * FPS)
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    Theme.init_fonts()
+    screen = pygame.display.set_mode((app.WIDTH, app.HEIGHT))
+
+    session = load_session(replay) if replay else None
+    cases = []
+    if "3d" in which:
+        for params in sweep_cases(BASE_3D, SWEEP_3D, grid):
+            cases.append(
+                run_3d(
+                    screen,
+                    params,
+                    frames,
+                    warmup,
+                    seed,
+                    session,
+                    renderer,
+                    voices,
+                    pcm,
+                )
+            )
+            _print_case(cases[-1])
+    if "phase" in which:
+        for params in sweep_cases(BASE_PHASE, SWEEP_PHASE, grid):
+            cases.append(run_phase(screen, params, frames, warmup))
+            _print_case(cases[-1])
+    pygame.quit()
+
+    return {
+        "meta": {
+            "revision": _git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "video_driver": os.environ.get("SDL_VIDEODRIVER"),
+            "fps": FPS,
+            "frames": frames,
+            "warmup": warmup,
+            "seed": seed,
+            "replay": os.path.basename(replay) if replay else None,
+            "voices": voices,
+            "pcm": pcm,
+        },
+        "cases": cases,
+    }
+
+
+def _print_case(case):
+    frame = case["stages"]["frame"]
+    print(
+        f"{case_key(case):<70} points {case['points']:>9.0f}"
+        f"  frame p50 {frame['p50_ms']:7.2f} ms  p95 {frame['p95_ms']:7.2f} ms"
+        f"  p99 {frame['p99_ms']:7.2f} ms"
+    )
+
+
+def compare(old, new, metric="p50_ms"):
+    """Print per-stage changes between two result dicts.
+    Inputs: baseline and new results (as written by run), percentile key.
+    Outputs: prints one line per case present in both; no return value."""
+    baseline = {case_key(case): case for case in old["cases"]}
+    print(
+        f"\n{metric} change vs {old['meta'].get('revision') or 'baseline'}"
+        f" (negative is faster)"
+    )
+    for case in new["cases"]:
+        ref = baseline.get(case_key(case))
+        if ref is None:
+            continue
+        cells = []
+        for stage, values in case["stages"].items():
+            if stage not in ref["stages"]:
+                continue
+            before = ref["stages"][stage][metric]
+            after = values[metric]
+            pct = (after - before) / before * 100.0 if before > 0 else 0.0
+            cells.append(f"{stage} {after:.2f} ({pct:+.0f}%)")
+        print(f"{case_key(case)}: " + ", ".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless visualizer benchmark")
+    parser.add_argument("--out", default="benchmark.json", help="JSON result path")
+    parser.add_argument("--compare", help="Previous result file to diff against")
+    parser.add_argument("--frames", type=int, default=240, help="Measured frames")
+    parser.add_argument("--warmup", type=int, default=None, help="Warm-up frames")
+    parser.add_argument("--grid", action="store_true", help="Full cartesian sweep")
+    parser.add_argument(
+        "--only", choices=("3d", "phase"), help="Benchmark a single visualizer"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Jitter RNG seed")
+    parser.add_argument(
+        "--replay", metavar="PATH", help="Drive the 3D sweep from a recorded session"
+    )
+    parser.add_argument(
+        "--renderer",
+        choices=("software", "gl", "phosphor"),
+        default="software",
+        help="3D trail renderer (gl needs moderngl and EGL)",
+    )
+    parser.add_argument(
+        "--voices",
+        type=int,
+        default=VOICES_PER_CHORD,
+        help=f"Voices per scripted chord (3D sweep, at least {MIN_VOICES})",
+    )
+    parser.add_argument(
+        "--pcm",
+        action="store_true",
+        help="Plot Karplus-Strong audio of the script (ks_render) in the 3D sweep",
+    )
+    args = parser.parse_args()
+    if args.voices < MIN_VOICES:
+        parser.error(f"--voices must be at least {MIN_VOICES}")
+
+    which = (args.only,) if args.only else ("3d", "phase")
+    results = run(
+        args.frames,
+        args.warmup,
+        args.grid,
+        which,
+        args.seed,
+        args.replay,
+        args.renderer,
+        args.voices,
+        args.pcm,
+    )
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nWrote {len(results['cases'])} cases to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Clock Module
+
+Time sources for the visualizers. A clock is any zero-argument callable
+returning seconds like time.time(); ManualClock is a deterministic one for
+benchmarks and tests. FixedStep turns clock readings into fixed-size
+simulation ticks so phase integration does not depend on the frame rate.
+"""
+
+import time
+
+
+class SystemClock:
+    """Wall clock.
+    Inputs: none.
+    Outputs: callable returning time.time()."""
+
+    def __call__(self):
+        return time.time()
+
+
+class ManualClock:
+    """Clock that only moves when told to.
+    Inputs: start time in seconds.
+    Outputs: callable returning the current time; advance()/set() move it."""
+
+    def __init__(self, start=1_000_000.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, dt):
+        self.now += dt
+
+    def set(self, t):
+        self.now = t
+
+
+class FixedStep:
+    """Fixed-timestep accumulator.
+    Inputs: tick length dt in seconds and the most ticks run per advance().
+    Outputs: advance(now) returns the timestamps of the ticks that became due.
+
+    Time left over after the last whole tick stays in the accumulator. If more
+    than max_ticks are due (e.g. after a stall) the excess is dropped, so one
+    slow frame cannot snowball into ever longer catch-up steps."""
+
+    # Tolerance so a clock advanced by exactly dt per frame yields one tick
+    _EPS = 1e-6
+
+    def __init__(self, dt, max_ticks=15):
+        self.dt = float(dt)
+        self.max_ticks = int(max_ticks)
+        self.origin = None  # Clock reading of tick 0
+        self.ticks = 0  # Ticks run since origin
+        self.dropped = 0  # Ticks skipped because the catch-up limit was hit
+
+    @property
+    def sim_time(self):
+        """Timestamp of the last tick run (None before the first advance)."""
+        if self.origin is None:
+            return None
+        return self.origin + self.ticks * self.dt
+
+    def advance(self, now):
+        """Run the accumulator up to now.
+        Inputs: current clock reading.
+        Outputs: list of tick timestamps (oldest first, possibly empty).
+
+        Timestamps are origin + index * dt, so a tick gets the same time
+        whether it runs alone or as part of a catch-up batch."""
+        if self.origin is None:
+            self.origin = now - self.dt
+        due = int((now - self.origin) / self.dt + self._EPS)
+        n = due - self.ticks
+        if n > self.max_ticks:
+            self.dropped += n - self.max_ticks
+            self.origin += (n - self.max_ticks) * self.dt
+            n = self.max_ticks
+        first = self.ticks + 1
+        self.ticks += max(0, n)
+        return [self.origin + i * self.dt for i in range(first, self.ticks + 1)]
+
+    def reset(self):
+        self.origin = None
+        self.ticks = 0
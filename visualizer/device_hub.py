@@ -0,0 +1,460 @@
+"""
+Device Hub Module
+
+Multi-board serial ingestion: one thread services every Teensy from a
+single selectors loop (epoll on Linux). Each port is opened non-blocking
+and registered for readability, and the thread sleeps in select() until a
+port has bytes, a write is queued or a reconnect deadline comes up. Thread
+count stays at one and idle CPU at zero however many boards are attached.
+A hotplug.PortWatcher in the same loop reopens a board as soon as its
+device node comes back, and a board counts as ready when it first talks
+(or after READY_TIMEOUT) rather than after a fixed settle time.
+
+Every board has its own decoder and EventRing. DeviceHub.drain_events()
+merges them into DeviceEvent tuples tagged with the device ID, while
+hub.devices[id] exposes a single board through the TeensyReader consumer
+interface. Each event is handed out once, to whichever of the two drains
+it. Needs serial objects with fileno() (pyserial on POSIX, ptys).
+
+Usage:
+    python device_hub.py /dev/ttyACM0 /dev/ttyACM1
+    python device_hub.py left=/dev/ttyACM0 right=/dev/ttyACM1 --seconds 10
+    python device_hub.py auto
+"""
+
+import argparse
+import os
+import selectors
+import threading
+import time
+from collections import deque, namedtuple
+from operator import attrgetter
+
+import serial
+
+from event_ring import Event, EventRing, ReaderState
+from hotplug import READY_TIMEOUT, RETRY_MAX, PortWatcher
+from teensy_protocol import StreamDecoder
+
+# Most bytes taken from one port per readable wake-up
+READ_SIZE = 65536
+
+# t: arrival time (time.perf_counter), device: board ID, kind/value as in Event
+DeviceEvent = namedtuple("DeviceEvent", ["t", "device", "kind", "value"])
+
+
+def parse_ports(spec):
+    """Parse a port list such as "left=/dev/ttyACM0,/dev/ttyACM1".
+    Inputs: comma-separated ports, each optionally prefixed with "id=".
+    Outputs: dict of device ID -> port (the ID defaults to the port's
+    basename, e.g. "ttyACM1")."""
+    ports = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        device, _, port = item.rpartition("=")
+        ports[device or os.path.basename(port)] = port
+    return ports
+
+
+def discover_ports(match="teensy"):
+    """Find every attached board whose description contains match.
+    Inputs: case-insensitive substring of the port description.
+    Outputs: dict of device ID -> port, keyed by USB serial number when the
+    board reports one (stable across replugging), else by port basename."""
+    from serial.tools import list_ports
+
+    ports = {}
+    for info in sorted(list_ports.comports(), key=attrgetter("device")):
+        if match.lower() in (info.description or "").lower():
+            ports[info.serial_number or os.path.basename(info.device)] = info.device
+    return ports
+
+
+class DeviceChannel(ReaderState):
+    """One board served by a DeviceHub.
+    Inputs: device ID and port name.
+    Outputs: the TeensyReader consumer interface for this board alone
+    (drain_events, get_frequencies, get_state, is_connected), write(data)
+    and counters (received events, connects, dropped writes).
+
+    Written by the hub thread, read by the consumer: latest values go
+    through event_ring.ReaderState like TeensyReader's, events through an
+    EventRing and outbound bytes through a deque, so no lock is shared."""
+
+    def __init__(self, device, port):
+        super().__init__()
+        self.device = device
+        self.port = port
+        self.decoder = StreamDecoder()
+        self.events = EventRing()  # This board's decoded events
+        self._latest = {}  # Kind -> latest value, for state_events()
+        self.serial = None
+        self.fd = None
+        self.connected = False
+        self.last_error = None
+        self.received = 0
+        self.connects = 0
+        self.dropped_writes = 0
+        self.pending = deque()  # Outbound messages, appended by any thread
+        self._notify = None  # Wakes the hub thread (set by DeviceHub)
+
+        # Hub thread bookkeeping
+        self.due = 0.0  # time.monotonic() of the next open or end of settling
+        self.settling = False
+        self.mask = 0  # Selector events registered for fd
+        self.out = None  # Message being written (memoryview)
+
+    def _on_event(self, kind, value):
+        self._latest[kind] = value
+        self.received += 1
+
+    def write(self, data):
+        """Queue bytes for the board (dropped while it is not connected)."""
+        if not self.connected or self._notify is None:
+            self.dropped_writes += 1
+            return
+        self.pending.append(bytes(data))
+        self._notify()
+
+    def state_events(self, t=None):
+        """Latest known values as events, for a consumer switching to this board.
+        Inputs: optional timestamp (defaults to time.perf_counter()).
+        Outputs: list of event_ring.Event, one per kind received so far."""
+        if t is None:
+            t = time.perf_counter()
+        return [Event(t, kind, value) for kind, value in list(self._latest.items())]
+
+    def is_connected(self):
+        """Check if this board is connected."""
+        return self.connected
+
+
+class DeviceHub:
+    """Several Teensy boards read by one selector thread.
+    Inputs: dict of device ID -> port (or an iterable of ports, keyed by
+    basename), baud rate, optional serial factory (pyserial-like, with
+    fileno()), longest wait for a board's first byte after opening,
+    reconnect delay and whether to watch /dev for hot-plug events.
+    Outputs: start()/stop(), drain_events() returning DeviceEvent tuples
+    from every board in arrival order, is_connected() (any board),
+    write(device, data), summary(), and devices: dict of DeviceChannel."""
+
+    def __init__(
+        self,
+        ports,
+        baudrate,
+        serial_factory=None,
+        settle=READY_TIMEOUT,
+        reconnect_delay=RETRY_MAX,
+        watch=True,
+    ):
+        if not isinstance(ports, dict):
+            ports = {os.path.basename(port): port for port in ports}
+        self.devices = {
+            device: DeviceChannel(device, port) for device, port in ports.items()
+        }
+        self.baudrate = baudrate
+        self.serial_factory = serial_factory or serial.Serial
+        self.settle = settle
+        self.reconnect_delay = reconnect_delay
+        self.watch = watch
+        self.watcher = None
+        self.running = False
+        self.thread = None
+        self.selector = None
+        self._wake_r = None
+        self._wake_w = None
+
+    def start(self):
+        """Open the selector and start the hub thread."""
+        if self.running:
+            return
+        self.selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self.selector.register(self._wake_r, selectors.EVENT_READ, None)
+        if self.watch:
+            self.watcher = PortWatcher()
+            if self.watcher.fileno() is not None:
+                self.selector.register(
+                    self.watcher.fileno(), selectors.EVENT_READ, self
+                )
+        for dev in self.devices.values():
+            dev.due = 0.0
+            dev._notify = self._wake
+        self.running = True
+        self.thread = threading.Thread(
+            target=self._serve, name="device-hub", daemon=True
+        )
+        self.thread.start()
+
+    def stop(self):
+        """Stop the hub thread and close every port."""
+        if not self.running:
+            return
+        self.running = False
+        self._wake()
+        self.thread.join(timeout=2.0)
+        self.thread = None
+        for dev in self.devices.values():
+            dev._notify = None
+        self.selector.close()
+        if self.watcher is not None:
+            self.watcher.close()
+            self.watcher = None
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+        self.selector = self._wake_r = self._wake_w = None
+
+    def _wake(self):
+        """Interrupt the hub thread's select() (from any thread)."""
+        try:
+            os.write(self._wake_w, b"\0")
+        except (BlockingIOError, OSError, TypeError):
+            pass  # Already pending, or the hub is stopping
+
+    def _serve(self):
+        """Hub thread: open/settle ports when due, then wait for any fd."""
+        select = self.selector.select
+        try:
+            while self.running:
+                now = time.monotonic()
+                timeout = None
+                for dev in self.devices.values():
+                    if dev.fd is not None and not dev.settling:
+                        continue
+                    if now >= dev.due:
+                        self._advance(dev, now)
+                    if dev.fd is None or dev.settling:
+                        wait = max(0.0, dev.due - now)
+                        timeout = wait if timeout is None else min(timeout, wait)
+                for key, mask in select(timeout):
+                    dev = key.data
+                    if dev is None:
+                        self._drain_wake()
+                        continue
+                    if dev is self:
+                        self._hotplug()
+                        continue
+                    if dev.fd is None or key.fd != dev.fd:
+                        # Closed (or reopened) by an earlier key of this batch,
+                        # e.g. the hot-plug watcher seeing the board go away
+                        continue
+                    if mask & selectors.EVENT_READ:
+                        if dev.settling:
+                            self._advance(dev, now)  # First bytes: ready
+                        self._read(dev)
+                    if mask & selectors.EVENT_WRITE and dev.fd is not None:
+                        self._flush(dev)
+        finally:
+            for dev in self.devices.values():
+                self._close(dev)
+
+    def _drain_wake(self):
+        """Empty the wake pipe and send what other threads queued."""
+        try:
+            while os.read(self._wake_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        for dev in self.devices.values():
+            if dev.pending and dev.out is None and dev.connected:
+                self._flush(dev)
+
+    def _hotplug(self):
+        """Device nodes changed: retry closed boards now, drop removed ones."""
+        added, removed = self.watcher.poll()
+        for dev in self.devices.values():
+            if dev.fd is None and added:
+                dev.due = 0.0
+            elif dev.fd is not None and dev.port in removed:
+                self._lost(dev, "device removed")
+
+    def _advance(self, dev, now):
+        """Open a closed port, or mark an opened one ready."""
+        if dev.fd is None:
+            if not self._open(dev):
+                dev.due = now + self.reconnect_delay
+                return
+            dev.mask = selectors.EVENT_READ
+            self.selector.register(dev.fd, dev.mask, dev)
+            dev.settling = True
+            dev.due = now + self.settle
+            if self.settle > 0:
+                return
+        # Ready (first bytes or settle elapsed): framing starts over
+        dev.settling = False
+        dev.decoder.reset()
+        dev.connected = True
+        dev.last_error = None
+        print(f"[Hub] {dev.device} connected on {dev.port}")
+
+    def _open(self, dev):
+        """Open a board's port non-blocking; False on failure."""
+        try:
+            dev.serial = self.serial_factory(dev.port, self.baudrate, timeout=0)
+        except (serial.SerialException, OSError) as e:
+            dev.last_error = str(e)
+            return False
+        fileno = getattr(dev.serial, "fileno", None)
+        if fileno is None:
+            self._close(dev)
+            if dev.last_error is None:
+                print(f"[Hub] {dev.device}: serial port has no fileno()")
+            dev.last_error = "DeviceHub needs a serial port with fileno()"
+            return False
+        dev.fd = fileno()
+        os.set_blocking(dev.fd, False)
+        dev.connects += 1
+        return True
+
+    def _close(self, dev):
+        if dev.fd is not None and dev.mask:
+            try:
+                self.selector.unregister(dev.fd)
+            except (KeyError, ValueError):
+                pass
+        dev.mask = 0
+        dev.fd = None
+        dev.settling = False
+        dev.connected = False
+        if dev.out is not None or dev.pending:
+            dev.dropped_writes += (dev.out is not None) + len(dev.pending)
+            dev.out = None
+            dev.pending.clear()
+        if dev.serial is not None:
+            try:
+                dev.serial.close()
+            except Exception:
+                pass
+            dev.serial = None
+
+    def _lost(self, dev, reason):
+        dev.last_error = str(reason)
+        print(f"[Hub] {dev.device} serial error: {reason}")
+        self._close(dev)
+        dev.due = time.monotonic() + self.reconnect_delay
+
+    def _read(self, dev):
+        """Take what arrived on one port and publish its events."""
+        try:
+            data = os.read(dev.fd, READ_SIZE)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._lost(dev, e)
+            return
+        if not data:
+            self._lost(dev, "device closed")
+            return
+        dev.publish(dev.decoder.feed(data), time.perf_counter())
+
+    def _set_mask(self, dev, mask):
+        if mask != dev.mask:
+            dev.mask = mask
+            self.selector.modify(dev.fd, mask, dev)
+
+    def _flush(self, dev):
+        """Write queued messages until done or the port's buffer is full."""
+        while dev.fd is not None:
+            if dev.out is None:
+                if not dev.pending:
+                    break
+                dev.out = memoryview(dev.pending.popleft())
+            try:
+                written = os.write(dev.fd, dev.out)
+            except BlockingIOError:
+                self._set_mask(dev, selectors.EVENT_READ | selectors.EVENT_WRITE)
+                return
+            except OSError as e:
+                self._lost(dev, e)
+                return
+            dev.out = dev.out[written:] or None
+        if dev.fd is not None:
+            self._set_mask(dev, selectors.EVENT_READ)
+
+    def write(self, device, data):
+        """Queue bytes for one board (dropped while it is not connected)."""
+        self.devices[device].write(data)
+
+    def drain_events(self):
+        """Take every event received since the last call, from all boards.
+        Returns a list of DeviceEvent(t, device, kind, value) in arrival order."""
+        out = []
+        for dev in self.devices.values():
+            device = dev.device
+            out.extend(
+                DeviceEvent(t, device, kind, value)
+                for t, kind, value in dev.events.drain()
+            )
+        if len(self.devices) > 1:
+            out.sort(key=attrgetter("t"))
+        return out
+
+    def is_connected(self):
+        """True if any board is connected."""
+        return any(dev.connected for dev in self.devices.values())
+
+    def summary(self):
+        """Per-board counters.
+        Inputs: none.
+        Outputs: dict of device ID -> dict with port, connected, events
+        received, connects, dropped events and dropped writes."""
+        return {
+            device: {
+                "port": dev.port,
+                "connected": dev.connected,
+                "events": dev.received,
+                "connects": dev.connects,
+                "dropped": dev.events.dropped,
+                "dropped_writes": dev.dropped_writes,
+            }
+            for device, dev in self.devices.items()
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read several Teensy boards")
+    parser.add_argument(
+        "ports", nargs="+", help='Ports, optionally "id=port", or "auto" to detect'
+    )
+    parser.add_argument("--baud", type=int, default=1000000)
+    parser.add_argument(
+        "--seconds", type=float, default=0, help="Stop after (0: never)"
+    )
+    parser.add_argument("--quiet", action="store_true", help="Only print the summary")
+    args = parser.parse_args()
+
+    if args.ports == ["auto"]:
+        ports = discover_ports()
+        if not ports:
+            parser.error("no Teensy boards found")
+    else:
+        ports = parse_ports(",".join(args.ports))
+    hub = DeviceHub(ports, args.baud)
+    hub.start()
+    start = time.perf_counter()
+    try:
+        while not args.seconds or time.perf_counter() - start < args.seconds:
+            time.sleep(0.05)
+            for ev in hub.drain_events():
+                if not args.quiet:
+                    print(
+                        f"{ev.t - start:9.3f} s  {ev.device:>12}  {ev.kind}: {ev.value}"
+                    )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        hub.stop()
+    for device, stats in hub.summary().items():
+        print(
+            f"{device}: {stats['events']} events, {stats['connects']} connects,"
+            f" {stats['dropped']} dropped"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Event Ring Module
+
+Single-producer / single-consumer ring buffer used to hand timestamped
+serial events from a reader thread to the render loop without a lock, and
+ReaderState, the latest-value bookkeeping the serial readers share.
+"""
+
+import time
+from collections import namedtuple
+
+# t: arrival time (time.perf_counter), kind: "freq" / "key" / "chord", value: payload
+Event = namedtuple("Event", ["t", "kind", "value"])
+
+
+class EventRing:
+    """Lock-free SPSC ring of Event tuples.
+    Inputs: capacity (maximum number of undrained events).
+    Outputs: push() from the producer thread, drain() from the consumer.
+
+    Only the producer writes head and only the consumer writes tail. A slot
+    is filled before head is published, so under the GIL the consumer never
+    sees a half-written event. When the ring is full new events are dropped
+    (and counted) rather than overwriting ones the consumer has not seen."""
+
+    def __init__(self, capacity=4096):
+        self.capacity = int(capacity)
+        self._slots = [None] * self.capacity
+        self._head = 0  # Next sequence number to write (producer only)
+        self._tail = 0  # Next sequence number to read (consumer only)
+        self.dropped = 0
+
+    def __len__(self):
+        return self._head - self._tail
+
+    def push(self, kind, value, t=None):
+        """Publish one event (producer side).
+        Inputs: event kind, payload and optional arrival timestamp
+        (defaults to time.perf_counter()).
+        Outputs: True if stored, False if the ring was full."""
+        head = self._head
+        if head - self._tail >= self.capacity:
+            self.dropped += 1
+            return False
+        self._slots[head % self.capacity] = Event(
+            time.perf_counter() if t is None else t, kind, value
+        )
+        self._head = head + 1
+        return True
+
+    def push_many(self, events, t=None):
+        """Publish a batch of (kind, value) pairs sharing one arrival time.
+        Inputs: iterable of (kind, value) and optional timestamp.
+        Outputs: number of events stored."""
+        if t is None:
+            t = time.perf_counter()
+        stored = 0
+        for kind, value in events:
+            stored += self.push(kind, value, t)
+        return stored
+
+    def drain(self):
+        """Take every pending event (consumer side, never blocks).
+        Inputs: none.
+        Outputs: list of Event tuples in arrival order (may be empty)."""
+        tail = self._tail
+        head = self._head
+        if head == tail:
+            return []
+        cap = self.capacity
+        out = [self._slots[i % cap] for i in range(tail, head)]
+        self._tail = head
+        return out
+
+
+class ReaderState:
+    """Latest-value bookkeeping shared by the serial readers.
+    Inputs: decoded (kind, value) events fed by the transport through
+    publish(events, t), or track(events) for events already in a ring.
+    Outputs: the consumer side of the reader interface: drain_events(),
+    get_frequencies(), get_state(), and the frequencies / chord_type /
+    current_key attributes.
+
+    Subclasses call ReaderState.__init__() and set self.events to the ring
+    drain_events() takes from. Values are written by the producer before
+    their counter is bumped, and consumers compare counters against the
+    last value they saw, so no lock is needed. Override _on_event() to log
+    or keep more per-event state."""
+
+    def __init__(self):
+        self.events = None
+        self.frequencies = (0.0, 0.0, 0.0)
+        self.chord_type = ""  # "Minor", "Major", etc.
+        self.current_key = 0  # Key number (0-11)
+        # Update counters: written by the producer only, compared by the
+        # consumer against the last value it saw
+        self._freq_seq = 0
+        self._state_seq = 0
+        self._freq_seen = 0
+        self._state_seen = 0
+
+    def publish(self, events, t=None):
+        """Push a batch of decoded events into the ring and track them.
+        Inputs: list of (kind, value) events and their shared arrival time
+        (defaults to time.perf_counter()).
+        Outputs: no return value."""
+        if not events:
+            return
+        self.events.push_many(events, t)
+        self.track(events)
+
+    def track(self, events):
+        """Update the latest values from (kind, value) events."""
+        for kind, value in events:
+            if kind == "freq":
+                self.frequencies = value
+                self._freq_seq += 1
+            elif kind == "key":
+                self.current_key = value
+                self._state_seq += 1
+            elif kind == "chord":
+                self.chord_type = value
+                self._state_seq += 1
+            self._on_event(kind, value)
+
+    def _on_event(self, kind, value):
+        pass
+
+    def drain_events(self):
+        """Take every event received since the last call (never blocks).
+        Returns a list of Event(t, kind, value) in arrival order."""
+        return self.events.drain()
+
+    def get_frequencies(self):
+        """Get the latest frequencies. Returns (f1, f2, f3, has_new_data)."""
+        seq = self._freq_seq
+        f = self.frequencies
+        has_new = seq != self._freq_seen
+        self._freq_seen = seq
+        return f[0], f[1], f[2], has_new
+
+    def get_state(self):
+        """Get the current state. Returns (chord_type, key, has_changed)."""
+        seq = self._state_seq
+        has_changed = seq != self._state_seen
+        self._state_seen = seq
+        return self.chord_type, self.current_key, has_changed
+
+
+class LatencyMeter:
+    """Rolling window of event latencies (arrival to consumption).
+    Inputs: window size in samples.
+    Outputs: percentile summary in milliseconds via summary()."""
+
+    def __init__(self, window=2048):
+        self.window = int(window)
+        self._samples = []
+        self.count = 0
+
+    def record(self, events, now=None):
+        """Record latency for a batch of drained events.
+        Inputs: Event list and consumption time (defaults to perf_counter()).
+        Outputs: no return value."""
+        if not events:
+            return
+        if now is None:
+            now = time.perf_counter()
+        self._samples.extend(now - ev.t for ev in events)
+        self.count += len(events)
+        self._trim()
+
+    def add(self, seconds):
+        """Record one latency measured elsewhere (e.g. a reconnect).
+        Inputs: latency in seconds.
+        Outputs: no return value."""
+        self._samples.append(seconds)
+        self.count += 1
+        self._trim()
+
+    def _trim(self):
+        if len(self._samples) > self.window:
+            del self._samples[: len(self._samples) - self.window]
+
+    def summary(self):
+        """Latency percentiles over the current window.
+        Inputs: none.
+        Outputs: dict with count, p50/p95/max in milliseconds (empty if no data)."""
+        if not self._samples:
+            return {}
+        data = sorted(self._samples)
+        last = len(data) - 1
+        return {
+            "count": self.count,
+            "p50_ms": data[last // 2] * 1e3,
+            "p95_ms": data[int(last * 0.95)] * 1e3,
+            "max_ms": data[last] * 1e3,
+        }
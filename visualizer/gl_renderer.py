@@ -0,0 +1,399 @@
+"""
+GL Renderer Module
+
+moderngl backend for TripleFrequency3DVisualizer. The trail ring buffer is
+mirrored into GPU vertex buffers slot for slot (only newly written slots are
+uploaded each frame); rotation, perspective projection and the birth-time
+fade run in the vertex shader and a depth test replaces the NumPy sort. The
+frame is rendered into an offscreen framebuffer and composited onto the
+pygame surface, so it works with a plain pygame window and headless through
+an EGL standalone context (Mesa llvmpipe needs no GPU).
+
+moderngl is optional (see requirements.txt); GLRenderer raises RuntimeError
+when it is missing so callers can fall back to the software renderer.
+
+Run as a script to check the backend headless against the software
+renderer (skipped when moderngl is missing):
+
+    python gl_renderer.py --frames 90
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pygame
+
+try:
+    import moderngl
+except ImportError:  # Optional dependency
+    moderngl = None
+
+from clock import ManualClock
+from visualizer_3d import FADE_TIME, TripleFrequency3DVisualizer
+
+# A pixel counts as different when a channel is off by more than this
+PIXEL_TOLERANCE = 8
+
+# Re-base birth times once they are this far from the epoch, to keep the
+# float32 ages uploaded to the GPU precise
+EPOCH_SPAN = 3600.0
+
+TRAIL_VERTEX_SHADER = """
+#version 330
+uniform mat3 u_rot;
+uniform vec2 u_size;
+uniform float u_z_offset;
+uniform float u_focal;
+uniform float u_view_scale;
+uniform float u_far;
+uniform float u_now;
+uniform float u_fade;
+uniform float u_gain;
+in vec3 in_pos;
+in uint in_rgb;
+in float in_birth;
+in vec2 in_jitter;
+out vec3 v_color;
+
+void main() {
+    float age = u_now - in_birth;
+    // Not born yet at the render time, or fully faded: clip the point away
+    if (age < 0.0 || age >= u_fade) {
+        gl_Position = vec4(2.0, 2.0, 2.0, 1.0);
+        v_color = vec3(0.0);
+        return;
+    }
+    float alpha = 1.0 - age / u_fade;
+    vec3 r = u_rot * in_pos;
+    float zc = max(r.z + u_z_offset, 0.01);
+    vec2 p = vec2(u_size.x * 0.5 + u_view_scale * u_focal * r.x / zc,
+                  u_size.y * 0.5 - u_view_scale * u_focal * r.y / zc);
+    p = clamp(p, vec2(0.0), u_size - 1.0) + in_jitter * 10.0;
+    // 2x2 footprint covering pixels x-1..x, y-1..y like the software path
+    p = floor(p);
+    vec3 rgb = vec3(float((in_rgb >> 16) & 255u), float((in_rgb >> 8) & 255u),
+                    float(in_rgb & 255u));
+    v_color = min(rgb * alpha * u_gain, vec3(255.0)) / 255.0;
+    // Rows are laid out top-down so the read-back needs no flip
+    gl_Position = vec4(p / u_size * 2.0 - 1.0, clamp(zc / u_far, 0.0, 1.0) * 2.0 - 1.0, 1.0);
+    gl_PointSize = 2.0;
+}
+"""
+
+AXIS_VERTEX_SHADER = """
+#version 330
+uniform vec2 u_size;
+uniform float u_far;
+in vec2 in_px;
+in float in_depth;
+in vec3 in_color;
+out vec3 v_color;
+
+void main() {
+    v_color = in_color;
+    vec2 ndc = (in_px + 0.5) / u_size * 2.0 - 1.0;
+    gl_Position = vec4(ndc, clamp(in_depth / u_far, 0.0, 1.0) * 2.0 - 1.0, 1.0);
+}
+"""
+
+FRAGMENT_SHADER = """
+#version 330
+in vec3 v_color;
+out vec4 f_color;
+
+void main() {
+    f_color = vec4(v_color, 1.0);
+}
+"""
+
+
+class GLRenderer:
+    """Trail renderer running on OpenGL through moderngl.
+    Inputs: optional existing moderngl context, standalone backend name
+    ("egl" for headless machines) when creating one.
+    Outputs: draw_trail(viz, surf, now) draws particles and axes into surf;
+    close() releases the GL objects.
+
+    Use with viz.set_renderer(GLRenderer(...)). Honors viz.additive_blend
+    (additive blending instead of depth testing). Timings go to
+    viz.frame_stats: "project" is the buffer upload, "sort" stays 0 and
+    "rasterize" covers drawing, read-back and compositing."""
+
+    name = "gl"
+
+    def __init__(self, ctx=None, backend=None):
+        if moderngl is None:
+            raise RuntimeError("GLRenderer needs moderngl (pip install moderngl)")
+        self._owns_ctx = ctx is None
+        if ctx is None:
+            settings = {"backend": backend} if backend else {}
+            ctx = moderngl.create_standalone_context(require=330, **settings)
+        self.ctx = ctx
+        self.trail_prog = ctx.program(
+            vertex_shader=TRAIL_VERTEX_SHADER, fragment_shader=FRAGMENT_SHADER
+        )
+        self.axis_prog = ctx.program(
+            vertex_shader=AXIS_VERTEX_SHADER, fragment_shader=FRAGMENT_SHADER
+        )
+        # 9 axis/arrow segments, 2 vertices each: px (2f), depth (1f), color (3f)
+        self.axis_vbo = ctx.buffer(reserve=9 * 2 * 6 * 4)
+        self.axis_vao = ctx.vertex_array(
+            self.axis_prog,
+            [(self.axis_vbo, "2f 1f 3f", "in_px", "in_depth", "in_color")],
+        )
+        self._axis_key = None
+        self._axis_vertices = 0
+        self.store = None  # TrailStore mirrored into the vertex buffers
+        self.size = None
+        self.fbo = None
+
+    def _allocate_trail(self, store):
+        """(Re)create vertex buffers with one vertex per ring-buffer slot."""
+        for name in ("vbo_pos", "vbo_rgb", "vbo_birth", "vbo_jitter", "trail_vao"):
+            obj = getattr(self, name, None)
+            if obj is not None:
+                obj.release()
+        n = store.capacity
+        self.vbo_pos = self.ctx.buffer(reserve=n * 12)
+        self.vbo_rgb = self.ctx.buffer(reserve=n * 4)
+        self.vbo_birth = self.ctx.buffer(reserve=n * 4)
+        self.vbo_jitter = self.ctx.buffer(reserve=n * 8)
+        self.trail_vao = self.ctx.vertex_array(
+            self.trail_prog,
+            [
+                (self.vbo_pos, "3f", "in_pos"),
+                (self.vbo_rgb, "1u", "in_rgb"),
+                (self.vbo_birth, "1f", "in_birth"),
+                (self.vbo_jitter, "2f", "in_jitter"),
+            ],
+        )
+        self.store = store
+        self.epoch = None
+        self._clears = store.clears
+        self._synced = store.tail  # Sequence number up to which slots are uploaded
+
+    def _allocate_target(self, size):
+        if self.fbo is not None:
+            self.fbo.release()
+            self.color_rb.release()
+            self.depth_rb.release()
+        self.color_rb = self.ctx.renderbuffer(size, 4)
+        self.depth_rb = self.ctx.depth_renderbuffer(size)
+        self.fbo = self.ctx.framebuffer(
+            color_attachments=[self.color_rb], depth_attachment=self.depth_rb
+        )
+        # Read-back buffer and a pygame surface sharing its memory
+        self.pixels = bytearray(size[0] * size[1] * 4)
+        self.layer = pygame.image.frombuffer(self.pixels, size, "RGBA")
+        self.size = size
+
+    def _upload_slots(self, start, stop):
+        """Copy ring slots [start, stop) of the store into the vertex buffers."""
+        store = self.store
+        pos = np.stack(
+            [store.x[start:stop], store.y[start:stop], store.z[start:stop]], axis=1
+        )
+        self.vbo_pos.write(pos.astype(np.float32).tobytes(), offset=start * 12)
+        self.vbo_rgb.write(
+            store.rgb[start:stop].astype(np.uint32).tobytes(), offset=start * 4
+        )
+        birth = (store.birth[start:stop] - self.epoch).astype(np.float32)
+        self.vbo_birth.write(birth.tobytes(), offset=start * 4)
+        jitter = np.ascontiguousarray(store.jitter[start:stop, :2], dtype=np.float32)
+        self.vbo_jitter.write(jitter.tobytes(), offset=start * 8)
+
+    def sync(self, store, now):
+        """Upload the slots written since the last call.
+        Inputs: the visualizer's TrailStore and the render timestamp.
+        Outputs: updates the vertex buffers; no return value."""
+        if store is not self.store or store.capacity != self.store.capacity:
+            self._allocate_trail(store)
+        if self.epoch is None or abs(now - self.epoch) > EPOCH_SPAN:
+            # New time base: every live slot has to be re-uploaded
+            self.epoch = now
+            self._synced = store.tail
+        if store.clears != self._clears or store.head < self._synced:
+            self._clears = store.clears
+            self._synced = store.tail
+        first = max(self._synced, store.tail)
+        cap = store.capacity
+        while first < store.head:
+            start = first % cap
+            stop = min(cap, start + store.head - first)
+            self._upload_slots(start, stop)
+            first += stop - start
+        self._synced = store.head
+
+    def _sync_axes(self, viz):
+        key = viz.camera_key()
+        if key == self._axis_key:
+            return
+        segments, _ = viz.axis_overlay()
+        rows = []
+        for depth, color, _, x1, y1, x2, y2 in segments:
+            rgb = [c / 255.0 for c in color]
+            rows.append([x1, y1, depth, *rgb])
+            rows.append([x2, y2, depth, *rgb])
+        self._axis_vertices = len(rows)
+        if rows:
+            data = np.asarray(rows, dtype=np.float32).tobytes()
+            if len(data) > self.axis_vbo.size:
+                self.axis_vbo.orphan(len(data))
+            self.axis_vbo.write(data)
+        self._axis_key = key
+
+    def draw_trail(self, viz, surf, now):
+        """Draw the trail particles and axes onto surf.
+        Inputs: the visualizer, target surface and render timestamp.
+        Outputs: composites the GL frame over surf and records timings."""
+        ctx = self.ctx
+        size = surf.get_size()
+        if size != self.size:
+            self._allocate_target(size)
+
+        t_upload = time.perf_counter()
+        store = viz.points
+        self.sync(store, now)
+        self._sync_axes(viz)
+        viz.frame_stats["project"] = time.perf_counter() - t_upload
+        viz.frame_stats["sort"] = 0.0
+
+        t_raster = time.perf_counter()
+        rot = viz.rotation_matrix()
+        far = 4.0 * viz.z_offset
+        prog = self.trail_prog
+        # GLSL matrices are column-major
+        prog["u_rot"].value = tuple(rot[r][c] for c in range(3) for r in range(3))
+        prog["u_size"].value = size
+        prog["u_z_offset"].value = viz.z_offset
+        prog["u_focal"].value = viz.focal
+        prog["u_view_scale"].value = viz.view_scale
+        prog["u_far"].value = far
+        prog["u_now"].value = now - self.epoch
+        prog["u_fade"].value = FADE_TIME
+        prog["u_gain"].value = 1.0 + 1.5 * viz.volume
+        self.axis_prog["u_size"].value = size
+        self.axis_prog["u_far"].value = far
+
+        self.fbo.use()
+        ctx.viewport = (0, 0, *size)
+        self.fbo.clear(0.0, 0.0, 0.0, 0.0, depth=1.0)
+        ctx.enable(moderngl.PROGRAM_POINT_SIZE)
+        if viz.additive_blend:
+            ctx.disable(moderngl.DEPTH_TEST)
+            ctx.enable(moderngl.BLEND)
+            ctx.blend_func = moderngl.ONE, moderngl.ONE
+        else:
+            ctx.disable(moderngl.BLEND)
+            ctx.enable(moderngl.DEPTH_TEST)
+            # Equal depth: the later (newer) point wins, as in the painter's order
+            ctx.depth_func = "<="
+        if self._axis_vertices:
+            ctx.line_width = 3.0
+            self.axis_vao.render(moderngl.LINES, vertices=self._axis_vertices)
+        for start, stop in store.segments():
+            self.trail_vao.render(moderngl.POINTS, vertices=stop - start, first=start)
+
+        self.fbo.read_into(self.pixels, components=4, alignment=1)
+        if viz.additive_blend:
+            surf.blit(self.layer, (0, 0), special_flags=pygame.BLEND_RGB_ADD)
+        else:
+            surf.blit(self.layer, (0, 0))
+        viz.frame_stats["rasterize"] = time.perf_counter() - t_raster
+
+    def close(self):
+        """Release the GL objects (the context too if this renderer made it)."""
+        for name in (
+            "trail_vao",
+            "vbo_pos",
+            "vbo_rgb",
+            "vbo_birth",
+            "vbo_jitter",
+            "axis_vao",
+            "axis_vbo",
+            "fbo",
+            "color_rb",
+            "depth_rb",
+            "trail_prog",
+            "axis_prog",
+        ):
+            obj = getattr(self, name, None)
+            if obj is not None:
+                obj.release()
+                setattr(self, name, None)
+        self.store = None
+        self.size = None
+        if self._owns_ctx and self.ctx is not None:
+            self.ctx.release()
+            self.ctx = None
+
+
+def compare_with_software(frames=90, size=(600, 600), seed=0, backend="egl"):
+    """Render one known trail with GLRenderer and the software renderer.
+    Inputs: simulated frames at 60 FPS, viewport size, jitter seed and the
+    standalone context backend.
+    Outputs: dict with mismatch (fraction of pixels differing by more than
+    PIXEL_TOLERANCE in a channel), max_diff and points, or None when
+    moderngl is not installed."""
+    if moderngl is None:
+        return None
+    clock = ManualClock()
+    viz = TripleFrequency3DVisualizer(*size, clock=clock, seed=seed)
+    viz.set_frequencies((261.63, 329.63, 392.00))
+    for _ in range(frames):
+        clock.advance(1.0 / 60)
+        viz.update()
+    now = clock()
+
+    software = pygame.Surface(size)
+    viz.draw_software_trail(software, now)
+    gl = pygame.Surface(size)
+    renderer = GLRenderer(backend=backend)
+    try:
+        renderer.draw_trail(viz, gl, now)
+    finally:
+        renderer.close()
+
+    diff = np.abs(
+        pygame.surfarray.array3d(software).astype(np.int16)
+        - pygame.surfarray.array3d(gl).astype(np.int16)
+    ).max(axis=2)
+    return {
+        "mismatch": float(np.count_nonzero(diff > PIXEL_TOLERANCE)) / diff.size,
+        "max_diff": int(diff.max()),
+        "points": len(viz.points),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check the GL trail renderer against the software one"
+    )
+    parser.add_argument("--frames", type=int, default=90, help="Simulated frames")
+    parser.add_argument("--seed", type=int, default=0, help="Jitter RNG seed")
+    parser.add_argument("--backend", default="egl", help="moderngl context backend")
+    parser.add_argument(
+        "--max-mismatch",
+        type=float,
+        default=0.01,
+        help="Largest fraction of differing pixels that passes",
+    )
+    args = parser.parse_args()
+
+    result = compare_with_software(args.frames, seed=args.seed, backend=args.backend)
+    if result is None:
+        print("[GL] moderngl not installed, check skipped")
+        return
+    passed = result["mismatch"] <= args.max_mismatch
+    print(
+        f"[GL] {result['points']} points, {result['mismatch']:.2%} of pixels "
+        f"differ (max {result['max_diff']}): {'ok' if passed else 'FAILED'}"
+    )
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
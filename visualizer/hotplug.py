@@ -0,0 +1,291 @@
+"""
+Hotplug Module
+
+Fast (re)connection to the Teensy serial port.
+
+PortWatcher notices tty devices appearing and disappearing in /dev through
+inotify (called via ctypes, with a periodic directory scan where inotify
+is unavailable), so a replugged board is opened as soon as its device node
+exists instead of on the next fixed retry.
+
+open_ready() replaces the fixed sleeps after opening a port with a
+readiness handshake. The port is ready as soon as the board sends its
+first byte, or after READY_TIMEOUT if it stays quiet (the firmware only
+prints on changes). Teensy boards use native USB serial and do not reset
+when the port opens, so there is nothing else to wait out.
+
+PortLink puts both together for a reader thread and measures reconnect
+latency (device node back -> port ready) and outage (port lost -> ready)
+with event_ring.LatencyMeter.
+"""
+
+import ctypes
+import fnmatch
+import os
+import select
+import struct
+import time
+
+import serial
+
+from event_ring import LatencyMeter
+
+# Device nodes a board can show up as
+DEFAULT_PATTERNS = ("ttyACM*", "ttyUSB*", "cu.usbmodem*")
+
+# Longest wait for the board's first byte after opening (s)
+READY_TIMEOUT = 0.25
+
+# Retry backoff while the port cannot be opened (s); hot-plug events cut it short
+RETRY_MIN = 0.05
+RETRY_MAX = 1.0
+
+# Directory scan period without inotify (s)
+SCAN_INTERVAL = 0.25
+
+# inotify event masks (linux/inotify.h)
+IN_ATTRIB = 0x004  # Permissions changed, e.g. by udev right after creation
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+_IN_EVENT = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+
+def _inotify_fd(directory):
+    """Non-blocking inotify descriptor watching directory, or None."""
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None  # Not Linux
+    if fd < 0:
+        return None
+    mask = IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+class PortWatcher:
+    """Notices serial device nodes appearing and disappearing.
+    Inputs: directory to watch and file name patterns of serial devices.
+    Outputs: poll() / wait(timeout) returning (added, removed) sets of
+    paths, fileno() for selectors (None when falling back to scanning) and
+    changed_at, the perf_counter() time the last change was seen.
+
+    A node whose permissions change counts as added again: udev often
+    creates it before granting access, and the open that failed meanwhile
+    deserves an immediate retry."""
+
+    def __init__(self, directory="/dev", patterns=DEFAULT_PATTERNS):
+        self.directory = directory
+        self.patterns = tuple(patterns)
+        self.fd = _inotify_fd(directory)
+        self.ports = self._scan()
+        self.changed_at = None
+
+    def _matches(self, name):
+        return any(fnmatch.fnmatch(name, pattern) for pattern in self.patterns)
+
+    def _scan(self):
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return set()
+        return {os.path.join(self.directory, n) for n in names if self._matches(n)}
+
+    def fileno(self):
+        return self.fd
+
+    def poll(self):
+        """Collect the changes since the last call (never blocks).
+        Inputs: none.
+        Outputs: (added, removed) sets of device paths."""
+        touched = set()
+        if self.fd is not None:
+            while True:
+                try:
+                    data = os.read(self.fd, 4096)
+                except BlockingIOError:
+                    break
+                pos = 0
+                while pos + _IN_EVENT.size <= len(data):
+                    _, mask, _, length = _IN_EVENT.unpack_from(data, pos)
+                    start = pos + _IN_EVENT.size
+                    name = os.fsdecode(data[start : start + length].split(b"\0", 1)[0])
+                    pos = start + length
+                    if mask & IN_ATTRIB and self._matches(name):
+                        touched.add(os.path.join(self.directory, name))
+        ports = self._scan()
+        added = (ports - self.ports) | (touched & ports)
+        removed = self.ports - ports
+        self.ports = ports
+        if added or removed:
+            self.changed_at = time.perf_counter()
+        return added, removed
+
+    def wait(self, timeout):
+        """Block until a device node appears or disappears, or timeout.
+        Inputs: timeout in seconds.
+        Outputs: (added, removed) as from poll() (empty on timeout)."""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if self.fd is not None:
+                ready, _, _ = select.select([self.fd], [], [], max(0.0, remaining))
+                if not ready:
+                    return set(), set()
+            changes = self.poll()
+            if changes[0] or changes[1] or remaining <= 0:
+                return changes
+            if self.fd is None:
+                time.sleep(min(SCAN_INTERVAL, remaining))
+
+    def close(self):
+        """Stop watching."""
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def open_ready(
+    factory, port, baudrate, timeout, ready_timeout=READY_TIMEOUT, flush=False
+):
+    """Open a serial port and wait until the board shows it is alive.
+    Inputs: serial factory (pyserial-like), port, baud rate, read timeout,
+    longest wait for the first byte and whether to drop stale input first.
+    Outputs: the open serial object, returned as soon as a byte is waiting
+    (or after ready_timeout); raises what the factory raises."""
+    ser = factory(port, baudrate, timeout=timeout)
+    try:
+        if flush:
+            ser.reset_input_buffer()
+        fileno = getattr(ser, "fileno", None)
+        if fileno is not None:
+            select.select([fileno()], [], [], ready_timeout)
+        else:
+            deadline = time.perf_counter() + ready_timeout
+            while not ser.in_waiting and time.perf_counter() < deadline:
+                time.sleep(0.005)
+    except (serial.SerialException, OSError, ValueError):
+        ser.close()
+        raise
+    return ser
+
+
+class PortLink:
+    """Connection manager for one board, used by a reader thread.
+    Inputs: port name (None: ask find() on every attempt), baud rate, read
+    timeout, optional serial factory, port finder, whether to watch /dev
+    for hot-plug events, readiness timeout and whether to drop stale input.
+    Outputs: connect() returning a ready serial object or None, wait()
+    sleeping until the next attempt is due, lost() marking a dropped
+    connection, and reconnect/outage LatencyMeters (see summary()).
+
+    Between failed attempts wait() backs off from RETRY_MIN to RETRY_MAX,
+    and returns at once when a tty device node appears."""
+
+    def __init__(
+        self,
+        port,
+        baudrate,
+        timeout,
+        serial_factory=None,
+        find=None,
+        watch=True,
+        ready_timeout=READY_TIMEOUT,
+        flush=False,
+    ):
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.serial_factory = serial_factory or serial.Serial
+        self.find = find
+        self.watch = watch
+        self.ready_timeout = ready_timeout
+        self.flush = flush
+        self.watcher = None  # Created on the first wait()
+        self.current_port = None
+        self.last_error = None
+        self.connects = 0
+        self.retry = RETRY_MIN
+        self.lost_at = None  # perf_counter() when the connection dropped
+        self.appeared_at = None  # When a device node showed up since then
+        self.reconnect = LatencyMeter()  # Device node back -> port ready
+        self.outage = LatencyMeter()  # Connection lost -> port ready
+
+    def connect(self):
+        """Try once to open the port (auto-detected if needed).
+        Inputs: none.
+        Outputs: ready serial object, or None (see last_error)."""
+        port = self.port or (self.find() if self.find else None)
+        if not port:
+            self.last_error = "no serial port found"
+            return None
+        started = time.perf_counter()
+        try:
+            ser = open_ready(
+                self.serial_factory,
+                port,
+                self.baudrate,
+                self.timeout,
+                self.ready_timeout,
+                self.flush,
+            )
+        except (serial.SerialException, OSError, ValueError) as e:
+            self.last_error = str(e)
+            return None
+        now = time.perf_counter()
+        if self.lost_at is not None:
+            self.reconnect.add(now - (self.appeared_at or started))
+            self.outage.add(now - self.lost_at)
+        self.current_port = port
+        self.connects += 1
+        self.last_error = None
+        self.lost_at = self.appeared_at = None
+        self.retry = RETRY_MIN
+        return ser
+
+    def lost(self):
+        """Mark the connection as dropped (starts the outage clock)."""
+        if self.lost_at is None:
+            self.lost_at = time.perf_counter()
+            self.appeared_at = None
+
+    def wait(self):
+        """Sleep until the next connection attempt is due.
+        Inputs: none.
+        Outputs: True if woken early by a device node appearing."""
+        delay = self.retry
+        self.retry = min(self.retry * 2, RETRY_MAX)
+        if self.watch and self.watcher is None:
+            self.watcher = PortWatcher()
+        if self.watcher is None:
+            time.sleep(delay)
+            return False
+        added, _ = self.watcher.wait(delay)
+        if not added:
+            return False
+        if self.appeared_at is None:
+            self.appeared_at = self.watcher.changed_at
+        self.retry = RETRY_MIN
+        return True
+
+    def close(self):
+        """Stop watching for hot-plug events."""
+        if self.watcher is not None:
+            self.watcher.close()
+            self.watcher = None
+
+    def summary(self):
+        """Reconnect statistics.
+        Inputs: none.
+        Outputs: dict with connects, and reconnect / outage latency
+        summaries (LatencyMeter.summary(), empty before a reconnect)."""
+        return {
+            "connects": self.connects,
+            "reconnect": self.reconnect.summary(),
+            "outage": self.outage.summary(),
+        }
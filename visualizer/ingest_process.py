@@ -0,0 +1,360 @@
+"""
+Ingest Process Module
+
+Runs serial ingestion (reading, decoding and timestamping) in a child
+process, so render spikes and GC pauses in the pygame loop no longer delay
+byte processing or skew arrival times.
+
+The child publishes every decoded event into a fixed-record ring in
+multiprocessing.shared_memory. The render process maps the same block as a
+NumPy structured array and drains it in place: nothing is pickled or sent
+through a pipe on the hot path. Only outbound writes (e.g. key messages for
+the Teensy) travel to the child, over a Pipe.
+
+Arrival times are time.perf_counter() readings taken in the child. That
+clock is system-wide, so latencies measured in the render process (see
+event_ring.LatencyMeter) stay meaningful.
+"""
+
+import atexit
+import multiprocessing
+import os
+import signal
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from event_ring import Event, ReaderState
+
+# Most values one event can carry (frequencies beyond this are dropped)
+MAX_VALUES = 16
+
+# Event kinds by their code in the ring
+KINDS = ("freq", "key", "chord")
+_KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+
+# One ring slot: arrival time, kind code, value count, values
+RECORD = np.dtype(
+    [
+        ("t", "<f8"),
+        ("kind", "u1"),
+        ("count", "u1"),
+        ("value", "<f8", (MAX_VALUES,)),
+    ],
+    align=True,
+)
+
+# Header words (int64) in front of the slots
+HEAD, TAIL, DROPPED, CONNECTED, STOP, HEARTBEAT = range(6)
+HEADER_BYTES = 64
+
+# Child status/heartbeat period and how often the parent checks on it (s)
+STATUS_INTERVAL = 0.02
+CHECK_INTERVAL = 0.25
+
+
+class SharedEventRing:
+    """SPSC ring of events in a shared memory block.
+    Inputs: capacity in events, and the block name to attach to an existing
+    ring (None creates a new one, owned and unlinked by this instance).
+    Outputs: the event_ring.EventRing interface: push()/push_many() on the
+    producer side, drain() on the consumer side.
+
+    Same protocol as EventRing: only the producer writes HEAD and only the
+    consumer writes TAIL. A slot is written before HEAD moves past it, and
+    when the ring is full new events are dropped (counted in DROPPED)."""
+
+    def __init__(self, capacity=4096, name=None):
+        self.capacity = int(capacity)
+        self.owner = name is None
+        size = HEADER_BYTES + self.capacity * RECORD.itemsize
+        # A spawned child shares its parent's resource tracker, so attaching
+        # does not hand the block's cleanup to the child
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        self.name = self.shm.name
+        self.header = np.ndarray((6,), dtype=np.int64, buffer=self.shm.buf)
+        self.slots = np.ndarray(
+            (self.capacity,), dtype=RECORD, buffer=self.shm.buf, offset=HEADER_BYTES
+        )
+        if self.owner:
+            self.header[:] = 0
+        self._t = self.slots["t"]
+        self._kind = self.slots["kind"]
+        self._count = self.slots["count"]
+        self._value = self.slots["value"]
+        # Local copies of the index this side owns (a restarted producer
+        # resumes from the published HEAD)
+        self._head = int(self.header[HEAD])
+        self._tail = int(self.header[TAIL])
+
+    def __len__(self):
+        return int(self.header[HEAD]) - int(self.header[TAIL])
+
+    @property
+    def dropped(self):
+        return int(self.header[DROPPED])
+
+    def push(self, kind, value, t=None):
+        """Publish one event (producer side).
+        Inputs: event kind, payload and optional arrival timestamp
+        (defaults to time.perf_counter()).
+        Outputs: True if stored, False if the ring was full."""
+        head = self._head
+        if head - int(self.header[TAIL]) >= self.capacity:
+            self.header[DROPPED] += 1
+            return False
+        slot = head % self.capacity
+        self._t[slot] = time.perf_counter() if t is None else t
+        self._kind[slot] = _KIND_CODES[kind]
+        if kind == "freq":
+            values = value[:MAX_VALUES]
+        elif kind == "chord":
+            values = (1.0 if value == "Major" else 0.0,)
+        else:
+            values = (value,)
+        self._count[slot] = len(values)
+        self._value[slot, : len(values)] = values
+        self._head = head + 1
+        self.header[HEAD] = self._head
+        return True
+
+    def push_many(self, events, t=None):
+        """Publish a batch of (kind, value) pairs sharing one arrival time.
+        Inputs: iterable of (kind, value) and optional timestamp.
+        Outputs: number of events stored."""
+        if t is None:
+            t = time.perf_counter()
+        stored = 0
+        for kind, value in events:
+            stored += self.push(kind, value, t)
+        return stored
+
+    def drain(self):
+        """Take every pending event (consumer side, never blocks).
+        Inputs: none.
+        Outputs: list of event_ring.Event tuples in arrival order, built
+        straight from the mapped slots."""
+        tail = self._tail
+        head = int(self.header[HEAD])
+        if head == tail:
+            return []
+        cap = self.capacity
+        start = tail % cap
+        stop = start + (head - tail)
+        rows = self.slots[start : min(stop, cap)].tolist()
+        if stop > cap:
+            rows += self.slots[: stop - cap].tolist()
+        out = []
+        for t, code, count, values in rows:
+            kind = KINDS[code]
+            if kind == "freq":
+                value = tuple(values[:count].tolist())
+            elif kind == "key":
+                value = int(values[0])
+            else:
+                value = "Major" if values[0] else "Minor"
+            out.append(Event(t, kind, value))
+        self._tail = head
+        self.header[TAIL] = head
+        return out
+
+    def close(self):
+        """Unmap the block (and unlink it if this instance created it)."""
+        if self.shm is None:
+            return
+        # Views into the buffer must go before it can be released
+        self.header = self.slots = None
+        self._t = self._kind = self._count = self._value = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+        self.shm = None
+
+
+def _ingest_main(name, capacity, factory, args, conn):
+    """Child process entry: run a reader publishing into the shared ring.
+    Inputs: ring block name and capacity, reader factory and its arguments,
+    read end of the command pipe.
+    Outputs: none; returns once STOP is set or the parent went away."""
+    # Ctrl+C reaches the whole process group: let the parent shut us down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    ring = SharedEventRing(capacity, name=name)
+    reader = factory(*args)
+    reader.events = ring
+    write = getattr(reader, "write", None)
+    reader.start()
+    header = ring.header
+    try:
+        while not header[STOP]:
+            header[CONNECTED] = 1 if reader.is_connected() else 0
+            header[HEARTBEAT] = time.perf_counter_ns()
+            # Sleeps until the next status update unless a command arrives
+            if conn.poll(STATUS_INTERVAL):
+                data = conn.recv_bytes()
+                if write is not None:
+                    write(data)
+    except EOFError:
+        pass  # Parent closed the pipe
+    finally:
+        reader.stop()
+        header[CONNECTED] = 0
+        header = None
+        ring.close()
+
+
+class IngestProcess(ReaderState):
+    """Serial reader running in a child process, drained through shared memory.
+    Inputs: picklable reader factory and its arguments (the reader needs
+    start(), stop(), is_connected(), an events attribute to replace and
+    optionally write(data); e.g. visualizer.TeensyReader), ring capacity,
+    seconds to wait before restarting a dead child and heartbeat timeout.
+    Outputs: the TeensyReader consumer interface (start, stop, drain_events,
+    get_frequencies, get_state, is_connected) plus write(data).
+
+    The child is spawned (not forked) so it starts without the render
+    process's threads and pygame state. drain_events() also supervises it:
+    a child that exited or stopped heartbeating is restarted after
+    restart_delay and resumes publishing into the same ring."""
+
+    def __init__(
+        self, factory, args=(), capacity=4096, restart_delay=1.0, stall_timeout=2.0
+    ):
+        super().__init__()
+        self.factory = factory
+        self.args = tuple(args)
+        self.capacity = int(capacity)
+        self.restart_delay = restart_delay
+        self.stall_timeout = stall_timeout
+        self.context = multiprocessing.get_context("spawn")
+        self.ring = None
+        self.process = None
+        self.restarts = 0
+        self._conn = None
+        self._down_since = None
+        self._next_check = 0.0
+
+    def start(self):
+        """Create the ring and spawn the ingestion process."""
+        if self.ring is not None:
+            return
+        self.ring = SharedEventRing(self.capacity)
+        # Still clean up (child, shared memory) if the caller never stops us
+        atexit.register(self.stop)
+        try:
+            self._spawn()
+        except BaseException:
+            # Do not leave the shared memory block behind
+            self.stop()
+            raise
+
+    def _spawn(self):
+        header = self.ring.header
+        header[STOP] = header[CONNECTED] = header[HEARTBEAT] = 0
+        receiver, sender = self.context.Pipe(duplex=False)
+        # The child imports the reader's module; keep pygame's banner quiet
+        os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+        self.process = self.context.Process(
+            target=_ingest_main,
+            args=(self.ring.name, self.capacity, self.factory, self.args, receiver),
+            name="serial-ingest",
+            daemon=True,
+        )
+        try:
+            self.process.start()
+        except BaseException:
+            self.process = None
+            sender.close()
+            raise
+        finally:
+            receiver.close()
+        self._conn = sender
+        self._down_since = None
+
+    def _reap(self):
+        """Stop the current child (politely, then by force)."""
+        if self.process is None:
+            return
+        self.ring.header[STOP] = 1
+        self.process.join(timeout=2.0)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout=1.0)
+        self.process = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def supervise(self):
+        """Restart the child if it died or stopped heartbeating.
+        Inputs: none (rate limited to one check every CHECK_INTERVAL).
+        Outputs: True while the child is running; no exception on failure."""
+        if self.ring is None:
+            return False
+        now = time.perf_counter()
+        if now < self._next_check:
+            return self._down_since is None
+        self._next_check = now + CHECK_INTERVAL
+        if self._down_since is None:
+            beat = int(self.ring.header[HEARTBEAT]) / 1e9
+            alive = self.process is not None and self.process.is_alive()
+            if alive and not (beat and now - beat > self.stall_timeout):
+                return True
+            code = self.process.exitcode if self.process is not None else None
+            print(f"[Ingest] Reader process down (exit code {code}), restarting")
+            self._reap()
+            self._down_since = now
+            return False
+        if now - self._down_since < self.restart_delay:
+            return False
+        self._spawn()
+        self.restarts += 1
+        return True
+
+    def stop(self):
+        """Stop the child and release the shared memory (safe to call twice)."""
+        atexit.unregister(self.stop)
+        if self.ring is None:
+            return
+        self._reap()
+        self.ring.close()
+        self.ring = None
+
+    def write(self, data):
+        """Send bytes to the device through the child (dropped while down)."""
+        if self._conn is None:
+            return
+        try:
+            self._conn.send_bytes(bytes(data))
+        except OSError:
+            pass
+
+    def wait_connected(self, timeout):
+        """Block until the child reports a connection or timeout expires.
+        Inputs: timeout in seconds.
+        Outputs: True if connected."""
+        deadline = time.monotonic() + timeout
+        while not self.is_connected():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(STATUS_INTERVAL)
+        return True
+
+    def drain_events(self):
+        """Take every event received since the last call (never blocks).
+        Returns a list of event_ring.Event(t, kind, value) in arrival order."""
+        self.supervise()
+        if self.ring is None:
+            return []
+        events = self.ring.drain()
+        # Latest values follow the drained events (see get_frequencies)
+        self.track((kind, value) for _, kind, value in events)
+        return events
+
+    def is_connected(self):
+        """True while the child runs and its reader reports a connection."""
+        return (
+            self.ring is not None
+            and self._down_since is None
+            and bool(self.ring.header[CONNECTED])
+        )
@@ -0,0 +1,357 @@
+"""
+KS Render Module
+
+Offline NumPy reproduction of dsp/ks_mono.dsp and the strummed chords of
+dsp/ks_poly_accord/ks_poly_accord.ino, so the audio-driven visual modes,
+the benchmark and latency measurements work without a Teensy.
+
+Per voice (same structure and constants as the Faust code):
+    excitation = (noise : lowpass(1, 2000 + 6000 * vel)) * adsr(gate) * vel
+    y[n] = excitation[n] + fdelay(D, att * (y[n-1] + y[n-2]) / 2)
+with D = SR / freq, att = min(0.001 ** (1 / (freq * t60)), 0.999), Faust's
+LCG noise and a linearly interpolated fractional delay. ks_mono's stereo
+output is (y, lowpass(1, 3000) of y delayed 8 samples); the chord firmware
+mixes the voices' left outputs and sends the mix delayed 5 ms to the right.
+
+The feedback loop needs no sample loop: every sample depends only on
+samples at least floor(D) + 1 back, so whole chunks of that length (one
+delay period) are computed at once, for all voices together. The one-pole
+filters run chunk-wise in closed form as well.
+
+Usage:
+    python ks_render.py --out strum.wav --degrees 0 3 4 0
+    python visualizer.py --pcm strum.wav
+"""
+
+import argparse
+import math
+import time
+import wave
+
+import numpy as np
+
+from teensy_stub import VOICES_PER_CHORD, chord_notes
+
+# Teensy audio library rate (AUDIO_SAMPLE_RATE_EXACT is 44117.6 Hz)
+SAMPLE_RATE = 44100
+
+# ks_mono.dsp parameters
+ATTACK = 0.001
+DECAY = 0.01
+SUSTAIN = 0.0
+RELEASE = 0.3
+MAX_DELAY = 4096  # de.fdelay(4096, ...)
+STEREO_DELAY = 8  # right = left @ 8 : lowpass(1, 3000)
+STEREO_CUTOFF = 3000.0
+
+# ks_poly_accord.ino: delayR.delay(0, 5) feeds the right output
+POLY_RIGHT_DELAY_MS = 5
+
+# Faust no.noise: random = +(12345) ~ *(1103515245), scaled by RANDMAX
+_LCG_A = 1103515245
+_LCG_C = 12345
+_RANDMAX = 2147483647.0
+
+# Chunk length of the closed-form one-pole filter
+_POLE_CHUNK = 64
+
+
+def note_frequency(note):
+    """Frequency of a MIDI note (ba.midikey2hz)."""
+    return 440.0 * 2.0 ** ((note - 69) / 12.0)
+
+
+def loop_attenuation(freq, t60):
+    """Per-period loop gain: 60 dB decay after t60 seconds, capped at 0.999."""
+    return min(0.001 ** (1.0 / (freq * t60)), 0.999)
+
+
+def _lcg_state(count):
+    """Faust noise state after `count` samples (affine map by squaring)."""
+    mask = (1 << 32) - 1
+    a, c = 1, 0
+    step_a, step_c = _LCG_A, _LCG_C
+    while count:
+        if count & 1:
+            a, c = (step_a * a) & mask, (step_a * c + step_c) & mask
+        step_a, step_c = (step_a * step_a) & mask, (step_a * step_c + step_c) & mask
+        count >>= 1
+    return c
+
+
+def faust_noise(start, count):
+    """Samples start .. start + count - 1 of Faust's no.noise.
+    Inputs: absolute sample index of the first value and number of values.
+    Outputs: float64 array in [-1, 1].
+
+    Uses the LCG closed form s[start + i] = A^(i+1) s[start-1] + C sum A^k;
+    uint64 products wrap modulo 2^64, which keeps them exact modulo 2^32."""
+    if count <= 0:
+        return np.zeros(0)
+    powers = np.cumprod(np.full(count, _LCG_A, dtype=np.uint64))
+    sums = np.cumsum(np.concatenate([np.ones(1, dtype=np.uint64), powers[:-1]]))
+    state = np.uint64(_lcg_state(start))
+    values = (powers * state + np.uint64(_LCG_C) * sums) & np.uint64(0xFFFFFFFF)
+    return values.astype(np.uint32).view(np.int32) / _RANDMAX
+
+
+def _one_pole(u, pole):
+    """y[n] = pole * y[n-1] + u[n] from zero state, without a sample loop.
+    Chunks of _POLE_CHUNK samples are solved with a triangular matrix; the
+    states carried between chunks form the same recurrence one level down."""
+    n = len(u)
+    if n == 0:
+        return np.zeros(0)
+    size = _POLE_CHUNK
+    chunks = np.zeros(-(-n // size) * size)
+    chunks[:n] = u
+    chunks = chunks.reshape(-1, size)
+    powers = pole ** np.arange(size)
+    lag = np.arange(size)[:, None] - np.arange(size)[None, :]
+    matrix = np.where(lag >= 0, pole ** np.maximum(lag, 0), 0.0)
+    out = chunks @ matrix.T
+    if len(out) > 1:
+        ends = _one_pole(out[:, -1], pole**size)
+        out[1:] += ends[:-1, None] * (pole * powers)[None, :]
+    return out.ravel()[:n]
+
+
+def lowpass1(x, cutoff, sr=SAMPLE_RATE):
+    """First-order Butterworth lowpass, as Faust fi.lowpass(1, cutoff).
+    Inputs: signal array (zero state before it), cutoff in Hz, sample rate.
+    Outputs: filtered float64 array."""
+    c = 1.0 / math.tan(math.pi * cutoff / sr)
+    gain = 1.0 / (1.0 + c)
+    pole = (c - 1.0) / (c + 1.0)
+    x = np.asarray(x, dtype=np.float64)
+    u = gain * (x + np.concatenate([np.zeros(1), x[:-1]]))
+    return _one_pole(u, pole)
+
+
+def adsr(length, release_at=None, sr=SAMPLE_RATE):
+    """Linear en.adsr(ATTACK, DECAY, SUSTAIN, RELEASE) after a gate-on.
+    Inputs: number of samples, sample index of the gate-off (None: held).
+    Outputs: float64 envelope array."""
+    t = np.arange(length) / sr
+    env = np.where(
+        t < ATTACK,
+        t / ATTACK,
+        np.maximum(SUSTAIN, 1.0 - (1.0 - SUSTAIN) * (t - ATTACK) / DECAY),
+    )
+    if release_at is not None and release_at < length:
+        level = env[release_at]
+        fall = level * (1.0 - (t - release_at / sr) / RELEASE)
+        env[release_at:] = np.maximum(fall[release_at:], 0.0)
+    return env
+
+
+def _excitation(start, length, velocity, release_at, sr):
+    """Noise burst of one gate-on, as added into the string loop."""
+    vel = velocity / 127.0
+    # The lowpass runs continuously in Faust; a short lead-in settles it
+    lead = min(start, 256)
+    noise = faust_noise(start - lead, length + lead)
+    burst = lowpass1(noise, 2000.0 + 6000.0 * vel, sr)[lead:]
+    return burst * adsr(length, release_at, sr) * vel
+
+
+def render_voices(triggers, duration, velocity=100, t60=3.0, sr=SAMPLE_RATE):
+    """Render ks_mono voices (the "left" output of each).
+    Inputs: one list per voice of (t_on, midi_note, t_off or None) gate
+    events in seconds, total length in seconds, MIDI velocity, t60 in
+    seconds and sample rate.
+    Outputs: float64 array of shape (voices, samples).
+
+    A new gate-on retunes the voice immediately; the string keeps ringing
+    through the change like the Faust delay line does."""
+    voices = len(triggers)
+    total = int(round(duration * sr))
+    pad = MAX_DELAY + 4  # Zero history before sample 0
+    excitation = np.zeros((voices, total))
+    changes = {0}
+    schedule = []  # (sample, voice, delay, attenuation)
+    for v, events in enumerate(triggers):
+        for t_on, note, t_off in events:
+            start = int(round(t_on * sr))
+            if start >= total:
+                continue
+            freq = note_frequency(note)
+            release_at = None if t_off is None else int(round((t_off - t_on) * sr))
+            # The envelope is zero once decayed (SUSTAIN = 0) or released
+            length = int(math.ceil((ATTACK + DECAY) * sr)) + 1
+            if SUSTAIN > 0.0 or (release_at is not None and release_at < length):
+                end = total if release_at is None else release_at
+                length = end + int(math.ceil(RELEASE * sr)) + 1
+            length = min(length, total - start)
+            excitation[v, start : start + length] += _excitation(
+                start, length, velocity, release_at, sr
+            )
+            delay = min(sr / freq, MAX_DELAY - 1)
+            schedule.append((start, v, delay, loop_attenuation(freq, t60)))
+            changes.add(start)
+    schedule.sort()
+
+    y = np.zeros((voices, pad + total))
+    # y[n] = e[n] + feedback: start from the excitation, add the loop below
+    y[:, pad:] = excitation
+    flat = y.ravel()
+    rows = (np.arange(voices) * (pad + total))[:, None]
+    # Until its first gate-on a voice holds the note 60 string at rest
+    delay = np.full(voices, sr / note_frequency(60))
+    att = np.zeros(voices)
+    bounds = sorted(changes) + [total]
+    k = 0
+    for seg_start, seg_end in zip(bounds[:-1], bounds[1:]):
+        while k < len(schedule) and schedule[k][0] <= seg_start:
+            _, v, delay[v], att[v] = schedule[k]
+            k += 1
+        whole = np.floor(delay).astype(np.int64)
+        frac = delay - whole
+        # feedback = att/2 * (f y[a-2] + y[a-1] + (1-f) y[a]), a = n-1-D
+        coef = (
+            0.5
+            * att[:, None, None]
+            * np.stack([frac, np.ones(voices), 1 - frac], 1)[:, None, :]
+        )
+        period = int(whole.min()) + 1  # Nothing in a chunk depends on itself
+        # Flat indices of the three taps of every sample in a chunk at 0:
+        # taps[v, i] = y[v, i-3-D .. i-1-D], one gather and one batched
+        # matmul per chunk for all voices
+        taps = (
+            rows[:, :, None]
+            + (pad - 3)
+            - whole[:, None, None]
+            + np.arange(period)[None, :, None]
+            + np.arange(3)
+        )
+        for n in range(seg_start, seg_end, period):
+            size = min(period, seg_end - n)
+            window = flat[(taps if size == period else taps[:, :size]) + n]
+            y[:, pad + n : pad + n + size] += np.matmul(
+                coef, window.transpose(0, 2, 1)
+            )[:, 0, :]
+    return y[:, pad:]
+
+
+def render_mono(note, duration, hold=None, velocity=100, t60=3.0, sr=SAMPLE_RATE):
+    """Render one ks_mono note with its stereo output.
+    Inputs: MIDI note, length in seconds, gate-off time in seconds (None:
+    held to the end), velocity, t60 and sample rate.
+    Outputs: float32 (samples, 2) array: left, right = left @ 8 lowpassed."""
+    left = render_voices([[(0.0, note, hold)]], duration, velocity, t60, sr)[0]
+    delayed = np.concatenate([np.zeros(STEREO_DELAY), left[:-STEREO_DELAY]])
+    right = lowpass1(delayed, STEREO_CUTOFF, sr)
+    return np.stack([left, right], axis=1).astype(np.float32)
+
+
+def strum_triggers(
+    degrees,
+    root=0,
+    major=True,
+    interval=1.0,
+    hold=None,
+    strum_ms=40,
+    voices=VOICES_PER_CHORD,
+    seed=None,
+    start=0.0,
+):
+    """Gate events and serial output of a strummed chord progression.
+    Inputs: scale degrees (chord buttons), root key, major flag, seconds
+    between presses, seconds each button is held (None: until the next
+    press), base strum delay in ms (firmware: 10-160), voice count, RNG
+    seed for the firmware's random(0, 20) ms humanization, first press time.
+    Outputs: (triggers, script): per-voice (t_on, note, t_off) lists for
+    render_voices, and a TeensyStub script of the "freq" events (sent when
+    the first voice of a chord sounds)."""
+    rng = np.random.default_rng(seed)
+    triggers = [[] for _ in range(voices)]
+    script = []
+    t = start
+    for degree in degrees:
+        strum = (strum_ms + int(rng.integers(0, 20))) / 1000.0
+        notes = chord_notes(degree, root, major, voices)
+        release = None if hold is None else t + hold
+        for v, note in enumerate(notes):
+            # loop() fires voice v once millis() - start > v * strumDelay
+            triggers[v].append((t + v * strum + 0.001, note, release))
+        freqs = tuple(round(note_frequency(n), 2) for n in notes)
+        script.append((t + 0.001, ("freq", freqs)))
+        t += interval
+    return triggers, script
+
+
+def render_strum(
+    degrees,
+    root=0,
+    major=True,
+    interval=1.0,
+    tail=2.0,
+    volume=0.25,
+    t60=3.0,
+    sr=SAMPLE_RATE,
+    **strum,
+):
+    """Render a chord progression as the ks_poly_accord firmware plays it.
+    Inputs: scale degrees, root key, major flag, seconds between chords,
+    seconds rendered after the last press, mixer gain per voice, t60,
+    sample rate and strum_triggers options (hold, strum_ms, voices, seed).
+    Outputs: (stereo, script): float32 (samples, 2) array (left = voice
+    mix, right = mix delayed POLY_RIGHT_DELAY_MS) and the matching
+    TeensyStub "freq" script."""
+    triggers, script = strum_triggers(degrees, root, major, interval, **strum)
+    duration = interval * max(0, len(script) - 1) + tail
+    left = volume * render_voices(triggers, duration, t60=t60, sr=sr).sum(axis=0)
+    shift = int(POLY_RIGHT_DELAY_MS * sr / 1000)
+    right = np.concatenate([np.zeros(shift), left[: len(left) - shift]])
+    return np.stack([left, right], axis=1).astype(np.float32), script
+
+
+def write_wav(path, stereo, sr=SAMPLE_RATE):
+    """Write a float (samples, channels) array as 16-bit PCM (clipped)."""
+    pcm = (np.clip(stereo, -1.0, 1.0) * 32767.0).astype("<i2")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(pcm.shape[1])
+        f.setsampwidth(2)
+        f.setframerate(sr)
+        f.writeframes(pcm.tobytes())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render Karplus-Strong strums")
+    parser.add_argument("--out", default="strum.wav", help="WAV path")
+    parser.add_argument(
+        "--degrees", type=int, nargs="+", default=[0, 3, 4, 0], help="Chord buttons"
+    )
+    parser.add_argument("--root", type=int, default=0, help="Root key (0-11)")
+    parser.add_argument("--minor", action="store_true", help="Minor chords")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds/chord")
+    parser.add_argument("--strum-ms", type=int, default=40, help="Base strum delay")
+    parser.add_argument("--voices", type=int, default=VOICES_PER_CHORD)
+    parser.add_argument("--t60", type=float, default=3.0, help="Decay time (s)")
+    parser.add_argument("--rate", type=int, default=SAMPLE_RATE, help="Sample rate")
+    parser.add_argument("--seed", type=int, default=0, help="Strum humanization")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    stereo, _ = render_strum(
+        args.degrees,
+        args.root,
+        not args.minor,
+        args.interval,
+        t60=args.t60,
+        sr=args.rate,
+        strum_ms=args.strum_ms,
+        voices=args.voices,
+        seed=args.seed,
+    )
+    elapsed = time.perf_counter() - t0
+    seconds = len(stereo) / args.rate
+    write_wav(args.out, stereo, args.rate)
+    print(
+        f"Wrote {seconds:.1f} s to {args.out} in {elapsed * 1000:.0f} ms"
+        f" ({seconds / elapsed:.0f}x real time)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,7 @@ SON Demo V2 - Phase Shift (Professional Edition)
 import pygame
 import numpy as np
 import time
-from ui import Theme, Button, Label, Panel, Slider, FrequencyBar, draw_grid, draw_corners
+from ui import Theme, Button, Label, Panel, Slider, FrequencyBar, BackgroundLayer, Sidebar, GlowBank
 
 # Config
 WIDTH, HEIGHT = 1280, 800
@@ -52,6 +52,8 @@ class PhaseShiftVisualizer:
         self.lerp_steps = 25
         self.last_point = self.second_last_point = None
         self.use_catmull_rom = True
+        self.clock = time.time  # Swapped for a simulated clock when benchmarking
+        self.glow = GlowBank(layers=((15, 100),))  # Cached head glow sprites
         
     def set_notes(self, keys):
         self.waves, self.colors = [], []
@@ -64,7 +66,7 @@ class PhaseShiftVisualizer:
     def update(self):
         if not self.waves: return
         self.t += self.speed
-        now = time.time()
+        now = self.clock()
         
         x_param = sum(w.value_at(self.t) for w in self.waves) / len(self.waves)
         y_param = sum(w.value_at(self.t * 1.5) for w in self.waves) / len(self.waves)
@@ -112,7 +114,7 @@ class PhaseShiftVisualizer:
 
     def draw(self, surf):
         if not self.points: return
-        now = time.time()
+        now = self.clock()
         for i in range(len(self.points)-1):
             p1, p2 = self.points[i], self.points[i+1]
             a = p1.get_alpha(now)
@@ -124,31 +126,23 @@ class PhaseShiftVisualizer:
         a = last.get_alpha(now)
         if a > 0:
             gc = tuple(int(v*a) for v in last.color)
-            s = pygame.Surface((40,40), pygame.SRCALPHA)
-            pygame.draw.circle(s, (*gc, 100), (20,20), 15)
-            surf.blit(s, (last.x-20, last.y-20))
+            self.glow.blit(surf, (last.x, last.y), gc)
             pygame.draw.circle(surf, (255,255,255), (last.x, last.y), 3)
 
     def clear(self): self.points = []
 
-def main():
-    pygame.init()
-    Theme.init_fonts()
-    screen = pygame.display.set_mode((WIDTH, HEIGHT))
-    pygame.display.set_caption("SON Demo V2 - Professional")
-    clock = pygame.time.Clock()
-    
-    viz = PhaseShiftVisualizer(MAIN_VIEW_WIDTH, HEIGHT)
-    
-    # UI
+def build_sidebar(viz):
+    """Sidebar widgets for the phase-shift demo. Returns (ui, widgets)."""
     ui = []
     y = 20
     ui.append(Label(30, y, "DEMO V2: PHASE SHIFT", Theme.FONT_TITLE, Theme.GOLD_PRIMARY))
     y += 60
     lbl_waves = Label(30, y, "Waves: 0", Theme.FONT_MAIN, Theme.TEXT_WHITE)
+    lbl_waves.readout = True
     ui.append(lbl_waves)
     y += 30
     lbl_pts = Label(30, y, "Points: 0", Theme.FONT_MAIN, Theme.TEXT_GRAY)
+    lbl_pts.readout = True
     ui.append(lbl_pts)
     
     y += 50
@@ -162,7 +156,24 @@ def main():
     ui.append(Button(30, y, 260, 40, "Clear", viz.clear))
     y += 50
     ui.append(Button(30, y, 260, 40, "Exit", lambda: pygame.event.post(pygame.event.Event(pygame.QUIT))))
+    return ui, {"waves": lbl_waves, "points": lbl_pts, "mode": btn_mode}
+
+def main():
+    pygame.init()
+    Theme.init_fonts()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("SON Demo V2 - Professional")
+    clock = pygame.time.Clock()
+    
+    viz = PhaseShiftVisualizer(MAIN_VIEW_WIDTH, HEIGHT)
+    
+    # UI
+    ui, widgets = build_sidebar(viz)
+    lbl_waves, lbl_pts, btn_mode = widgets["waves"], widgets["points"], widgets["mode"]
+    sidebar = Sidebar((0, 0, SIDEBAR_WIDTH, HEIGHT), ui)
+    main_rect = pygame.Rect(SIDEBAR_WIDTH, 0, MAIN_VIEW_WIDTH, HEIGHT)
     
+    background = BackgroundLayer()
     running = True
     pressed = set()
     
@@ -170,7 +181,8 @@ def main():
         mp = pygame.mouse.get_pos()
         for e in pygame.event.get():
             if e.type == pygame.QUIT: running = False
-            for el in ui: el.handle_event(e)
+            if e.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED): sidebar.invalidate()
+            sidebar.handle_event(e)
             
             if e.type == pygame.KEYDOWN:
                 if e.key == pygame.K_ESCAPE: running = False
@@ -191,20 +203,15 @@ def main():
         lbl_pts.set_text(f"Points: {len(viz.points)}")
         btn_mode.text = "Mode: Catmull" if viz.use_catmull_rom else "Mode: Linear"
         
-        # Draw Sidebar
-        screen.fill(Theme.BLACK_BG, (0,0,SIDEBAR_WIDTH,HEIGHT))
-        pygame.draw.rect(screen, (25,25,30), (0,0,SIDEBAR_WIDTH,HEIGHT))
-        pygame.draw.line(screen, Theme.GOLD_DIM, (SIDEBAR_WIDTH,0), (SIDEBAR_WIDTH,HEIGHT), 2)
-        for el in ui: el.update(mp); el.draw(screen)
+        # Draw Sidebar (only the widgets that changed)
+        dirty = sidebar.draw(screen, mp)
         
         # Draw Main
-        main_surf = screen.subsurface((SIDEBAR_WIDTH, 0, MAIN_VIEW_WIDTH, HEIGHT))
-        main_surf.fill(Theme.BLACK_BG)
-        draw_grid(main_surf, main_surf.get_rect())
+        main_surf = screen.subsurface(main_rect)
+        background.draw(main_surf)
         viz.draw(main_surf)
-        draw_corners(main_surf, main_surf.get_rect().inflate(-40,-40))
         
-        pygame.display.flip()
+        pygame.display.update(dirty + [main_rect])
         clock.tick(FPS)
         
     pygame.quit()
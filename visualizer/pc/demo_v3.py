@@ -5,7 +5,7 @@ Keyboard: press 3 keys to set X/Y/Z frequencies. Uses shared visualizer_3d.
 
 import pygame
 import time
-from ui import Theme, Button, Label, Slider, FrequencyBar, draw_grid, draw_corners
+from ui import Theme, Button, Label, Slider, FrequencyBar, BackgroundLayer
 from visualizer_3d import TripleFrequency3DVisualizer, NOTE_FREQUENCIES, NOTE_COLORS
 
 # Config
@@ -70,6 +70,7 @@ def main():
     y += 50
     ui.append(Button(30, y, 260, 40, "Exit", lambda: pygame.event.post(pygame.event.Event(pygame.QUIT))))
 
+    background = BackgroundLayer()  # Grid and corner marks, rendered once
     running = True
     pressed = set()
     drag_started = False
@@ -129,10 +130,8 @@ def main():
             el.update(mp)
             el.draw(screen)
         main_surf = screen.subsurface((SIDEBAR_WIDTH, 0, MAIN_VIEW_WIDTH, HEIGHT))
-        main_surf.fill(Theme.BLACK_BG)
-        draw_grid(main_surf, main_surf.get_rect())
+        background.draw(main_surf)
         viz.draw(main_surf)
-        draw_corners(main_surf, main_surf.get_rect().inflate(-40, -40))
         if viz.current_freq_x <= 1 or viz.current_freq_y <= 1 or viz.current_freq_z <= 1:
             h = Theme.FONT_TITLE.render("Press 3 Keys", True, (100, 100, 100))
             main_surf.blit(h, h.get_rect(center=(MAIN_VIEW_WIDTH // 2, HEIGHT // 2)))
@@ -2,20 +2,26 @@
 SON Music Visualizer V3 - Professional Edition
 """
 
-import pygame
-import serial
-import serial.tools.list_ports
-import time
-import threading
-import numpy as np
 import sys
 import os
 
 # Import visualizer components (shared 3D engine)
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, current_dir)
-from visualizer_3d import TripleFrequency3DVisualizer
-from ui import Theme, Button, Label, Panel, Slider, FrequencyBar, draw_grid, draw_corners
+# Serial helpers shared with visualizer/ (local pc/ modules still take precedence)
+sys.path.insert(1, os.path.dirname(current_dir))
+from startup import StartupProfiler  # Before the imports it times
+
+import argparse
+import pygame
+import serial
+import time
+import threading
+# The 3D engine (and NumPy) is imported once a key is chosen, see main()
+from ui import Theme, Button, Label, Panel, Slider, FrequencyBar, BackgroundLayer, Sidebar, draw_grid, draw_corners
+from event_ring import EventRing, LatencyMeter
+from teensy_protocol import parse_text_line
+from hotplug import PortLink, READY_TIMEOUT
 
 # ============================================
 # Configuration
@@ -26,7 +32,6 @@ SIDEBAR_WIDTH = 320
 MAIN_VIEW_WIDTH = WIDTH - SIDEBAR_WIDTH
 SERIAL_BAUDRATE = 115200
 SERIAL_TIMEOUT = 0.1
-FREQ_UPDATE_INTERVAL = 0.05
 
 # Key Signatures
 MAJOR_KEYS = [
@@ -46,10 +51,25 @@ MINOR_KEYS = [
 # Serial Communication
 # ============================================
 
+def find_port():
+    """Pick the serial port the Teensy is most likely on.
+    Inputs: none; lists the system's serial ports.
+    Outputs: device name (Teensy / USB serial first, else the first port)
+    or None when there is no port."""
+    from serial.tools import list_ports  # Only needed when auto-detecting
+    ports = list_ports.comports()
+    for p in ports:
+        if 'teensy' in p.description.lower() or 'usb serial' in p.description.lower():
+            return p.device
+    return ports[0].device if ports else None
+
 class SerialComm:
     """Manage serial link to Teensy for frequencies and key events.
     Inputs: optional serial port name or None for auto-detection.
-    Outputs: maintains connection state and latest frequency readings."""
+    Outputs: maintains connection state, latest frequency readings and a
+    lock-free EventRing of every timestamped event (see drain_events).
+    Connection setup runs in the reader thread: the board is (re)opened as
+    soon as it answers or its device node appears (see hotplug.PortLink)."""
 
     def __init__(self, port=None):
         """Initialize serial communication fields.
@@ -60,93 +80,232 @@ class SerialComm:
         self.connected = False
         self.running = False
         self.read_thread = None
-        self.latest_freq1 = None
-        self.latest_freq2 = None
-        self.latest_freq3 = None
-        self.freq_lock = threading.Lock()
+        # Replaced as a whole tuple by the reader thread, so reads need no lock
+        self.latest_freqs = (None, None, None)
+        self.events = EventRing()
+        self.link = PortLink(port, SERIAL_BAUDRATE, SERIAL_TIMEOUT, find=find_port, flush=True)
     
     def connect(self, port=None):
-        """Open serial port and start communication.
+        """Open serial port once the board is ready (no fixed settle time).
         Inputs: optional explicit port name; None triggers auto-detect.
         Outputs: True on success, False if connection fails."""
-        if port is None:
-            ports = serial.tools.list_ports.comports()
-            for p in ports:
-                if 'teensy' in p.description.lower() or 'usb serial' in p.description.lower():
-                    port = p.device
-                    break
-            if not port and ports: port = ports[0].device
-            
-        if not port: return False
-        
-        try:
-            self.ser = serial.Serial(port, SERIAL_BAUDRATE, timeout=SERIAL_TIMEOUT)
-            time.sleep(2.0)
-            self.ser.reset_input_buffer()
-            self.port = port
-            self.connected = True
-            return True
-        except:
-            return False
+        if port is not None: self.link.port = port
+        self.ser = self.link.connect()
+        if self.ser is None: return False
+        self.port = self.link.current_port
+        self.connected = True
+        return True
     
     def disconnect(self):
         """Stop reading thread and close serial port.
         Inputs: none; uses current connection state.
         Outputs: no return; updates running and connected flags."""
         self.running = False
-        if self.read_thread: self.read_thread.join(timeout=1.0)
-        if self.ser and self.ser.is_open: self.ser.close()
+        if self.read_thread: self.read_thread.join(timeout=2.0)
+        self.close_port()
+        self.link.close()
+
+    def close_port(self):
+        """Close the port, keeping the reader thread alive to reconnect."""
         self.connected = False
+        if self.ser and self.ser.is_open:
+            try: self.ser.close()
+            except: pass
+        self.ser = None
     
+    def start(self):
+        """Connect (auto-detecting the port) and read in the background.
+        Inputs: none.
+        Outputs: no return; check is_connected() for the result."""
+        if not self.running:
+            self.running = True
+            self.read_thread = threading.Thread(target=self.read_loop, daemon=True)
+            self.read_thread.start()
+
+    def stop(self):
+        """Same as disconnect()."""
+        self.disconnect()
+
+    def is_connected(self):
+        """True while the serial port is open."""
+        return self.connected
+
+    def write(self, data):
+        """Send raw bytes to the Teensy.
+        Inputs: bytes to write.
+        Outputs: writes to serial if connected; errors are ignored."""
+        ser = self.ser
+        if self.connected and ser:
+            try: ser.write(data)
+            except: pass
+
     def send_key(self, note, velocity=100):
         """Send a note-on style message to the Teensy.
         Inputs: MIDI note number and velocity integer.
         Outputs: writes to serial if connected; no return."""
-        if self.connected:
-            try: self.ser.write(f"KEY:{note}:{velocity}\n".encode())
-            except: pass
+        self.write(f"KEY:{note}:{velocity}\n".encode())
     
     def send_key_off(self, note):
         """Send a note-off style message to the Teensy.
         Inputs: MIDI note number to release.
         Outputs: writes to serial if connected; no return."""
-        if self.connected:
-            try: self.ser.write(f"KEY_OFF:{note}\n".encode())
-            except: pass
+        self.write(f"KEY_OFF:{note}\n".encode())
     
     def read_loop(self):
-        """Background loop to parse FREQ:f1:f2:f3 lines.
-        Inputs: reads from open serial port while running is True.
-        Outputs: updates latest_freq1/2/3 under lock; no return."""
-        self.running = True
+        """Background loop to parse FREQ:f1:f2:...:fN and Teensy state lines.
+        Inputs: reads from the serial port while running is True,
+        (re)connecting whenever it is closed.
+        Outputs: pushes timestamped events to self.events and updates
+        latest_freqs; no return."""
         while self.running:
-            if self.ser and self.ser.in_waiting > 0:
-                try:
-                    line = self.ser.readline().decode(errors='ignore').strip()
-                    if line.startswith("FREQ:"):
-                        parts = line.split(":")
-                        if len(parts) >= 4:
-                            with self.freq_lock:
-                                self.latest_freq1 = float(parts[1])
-                                self.latest_freq2 = float(parts[2])
-                                self.latest_freq3 = float(parts[3])
-                except: pass
-            time.sleep(0.01)
+            if not self.connected:
+                if not self.connect(): self.link.wait()  # Wakes early on hot-plug
+                continue
+            try:
+                # Blocks until a full line or the read timeout
+                raw = self.ser.readline()
+            except (serial.SerialException, OSError) as e:
+                print(f"[Serial] Lost {self.port}: {e}")
+                self.close_port()
+                self.link.lost()
+                continue
+            if not raw: continue
+            arrival = time.perf_counter()
+            try:
+                line = raw.decode(errors='ignore').strip()
+                if line.startswith("FREQ:"):
+                    parts = line.split(":")
+                    if len(parts) >= 4:
+                        freqs = tuple(float(p) for p in parts[1:])
+                        self.latest_freqs = freqs
+                        self.events.push("freq", freqs, arrival)
+                else:
+                    # "Key changed: N" / "Major" / "Minor" / f1;f2;f3
+                    event = parse_text_line(line)
+                    if event:
+                        if event[0] == "freq":
+                            self.latest_freqs = event[1]
+                        self.events.push(event[0], event[1], arrival)
+            except ValueError: pass
     
     def start_reading(self):
-        """Spawn reader thread if connected and not already running.
-        Inputs: none; uses current connection state.
+        """Start the background reader (which also connects).
+        Inputs: none.
         Outputs: starts daemon read thread; no return."""
-        if self.connected and not self.running:
-            self.read_thread = threading.Thread(target=self.read_loop, daemon=True)
-            self.read_thread.start()
+        self.start()
     
     def get_frequencies(self):
         """Return the latest triple of frequencies.
-        Inputs: none; thread-safe via internal lock.
+        Inputs: none; lock-free read of the last published tuple.
         Outputs: tuple (freq1, freq2, freq3) or Nones if not yet received."""
-        with self.freq_lock: return self.latest_freq1, self.latest_freq2, self.latest_freq3
-    
+        return self.latest_freqs
+
+    def drain_events(self):
+        """Take every event received since the last call (never blocks).
+        Inputs: none.
+        Outputs: list of event_ring.Event(t, kind, value) in arrival order."""
+        return self.events.drain()
+
+
+def make_comm(ingest):
+    """Create the Teensy link for an --ingest mode (not connected yet).
+    Inputs: "thread", "process" or "asyncio".
+    Outputs: (comm, ticker); ticker is the FrameTicker that paces frames
+    and runs the transport in asyncio mode, else None. The process and
+    asyncio transports are imported here, only when chosen, to keep them
+    (shared memory, NumPy, asyncio) out of the default start-up."""
+    if ingest == "process":
+        from ingest_process import IngestProcess
+
+        class SerialCommProcess(IngestProcess):
+            """SerialComm running in a child process (--ingest process).
+            Inputs: optional serial port name or None for auto-detection.
+            Outputs: the SerialComm interface; events are drained from shared
+            memory and key messages are forwarded to the child."""
+
+            send_key = SerialComm.send_key
+            send_key_off = SerialComm.send_key_off
+
+            def __init__(self, port=None):
+                super().__init__(SerialComm, (port,))
+
+            @property
+            def connected(self):
+                return self.is_connected()
+
+            def connect(self, port=None):
+                """Spawn the reader process and wait for it to open the port.
+                Inputs: optional explicit port name; None triggers auto-detect.
+                Outputs: True once connected, False after a timeout."""
+                if port is not None:
+                    self.args = (port,)
+                self.start()
+                # Mostly the child's start-up: the board itself answers within READY_TIMEOUT
+                return self.wait_connected(3.0)
+
+            def start_reading(self):
+                """No-op: the child starts reading as soon as it is connected."""
+
+            def disconnect(self):
+                """Stop the reader process."""
+                self.stop()
+
+            def get_frequencies(self):
+                """Return the latest drained frequencies (Nones before the first)."""
+                return self.frequencies if self._freq_seq else (None, None, None)
+
+        return SerialCommProcess(), None
+    if ingest == "asyncio":
+        from serial_async import AsyncSerialReader, FrameTicker
+
+        class SerialCommAsync(AsyncSerialReader):
+            """SerialComm on the asyncio transport (--ingest asyncio).
+            Inputs: event loop run by the frame loop (FrameTicker.loop), optional
+            serial port name or None for auto-detection.
+            Outputs: the SerialComm interface; lines are decoded when the port
+            becomes readable and key messages go through the write queue."""
+
+            send_key = SerialComm.send_key
+            send_key_off = SerialComm.send_key_off
+
+            def __init__(self, loop, port=None):
+                # Same readiness handshake and input flush as SerialComm.connect()
+                super().__init__(port, SERIAL_BAUDRATE, loop, settle=READY_TIMEOUT, reset_input=True,
+                                 reconnect_delay=1.0)
+                self.requested_port = port
+
+            async def _open(self):
+                # Auto-detect on every attempt: the board may come back elsewhere
+                self.port = self.requested_port or find_port()
+                if not self.port:
+                    self.last_error = "no serial port found"
+                    return False
+                return await super()._open()
+
+            def connect(self, port=None):
+                """Open the port on the loop and wait for it.
+                Inputs: optional explicit port name; None triggers auto-detect.
+                Outputs: True once connected, False otherwise."""
+                if port is not None:
+                    self.requested_port = port
+                self.start()
+                return self.wait_connected(1.0)
+
+            def start_reading(self):
+                """No-op: the port is read whenever the loop runs."""
+
+            def disconnect(self):
+                """Cancel the transport tasks and close the port."""
+                self.stop()
+
+            def get_frequencies(self):
+                """Return the latest frequencies (Nones before the first)."""
+                return self.frequencies if self._freq_seq else (None, None, None)
+
+        ticker = FrameTicker()
+        return SerialCommAsync(ticker.loop), ticker
+    return SerialComm(), None
+
 # ============================================
 # Helper Functions
 # ============================================
@@ -172,9 +331,10 @@ KEY_TO_NUMBER = {
 # 🎹 Key Selection Screen (Hearthstone Style)
 # ============================================
     
-def select_key_signature(screen):
+def select_key_signature(screen, profiler=None):
     """Interactive screen to choose a musical key.
-    Inputs: main pygame display surface for drawing.
+    Inputs: main pygame display surface for drawing, optional
+    StartupProfiler told when the first frame is shown.
     Outputs: (key_name, offset) tuple or None if user cancels."""
     clock = pygame.time.Clock()
     
@@ -306,6 +466,7 @@ def select_key_signature(screen):
         draw_corners(screen, screen.get_rect())
 
         pygame.display.flip()
+        if profiler: profiler.first_frame()
         clock.tick(60)
 
 # ============================================
@@ -315,24 +476,50 @@ def select_key_signature(screen):
 def main():
     """Main application loop for SON V3 visualizer.
     Inputs: none; reads serial data and keyboard/mouse events.
-    Outputs: runs until quit event is received; no explicit return."""
-    pygame.init()
-    Theme.init_fonts()
+    Outputs: runs until quit event is received; no explicit return.
+    --ingest process reads the serial port in a child process and --ingest
+    asyncio from an event loop run while each frame waits for its deadline;
+    --profile-startup prints the time to the key screen by phase."""
+    profiler = StartupProfiler()
+    profiler.mark("imports")
+    parser = argparse.ArgumentParser(description="SON V3 visualizer")
+    parser.add_argument("--ingest", choices=("thread", "process", "asyncio"), default="thread",
+                        help="Serial ingestion in a reader thread, a separate process or asyncio")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Print the time to the first frame, by phase")
+    args = parser.parse_args()
+    profiler.enabled = args.profile_startup
+
+    # Display and fonts only: pygame.init() would also open the audio mixer
+    pygame.display.init()
+    pygame.font.init()
     # Match demo_v3 window size: 1280×800, main view 960×800
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption("SON V3 Professional")
     clock = pygame.time.Clock()
+    profiler.mark("display")
+    Theme.init_fonts()
+    profiler.mark("fonts")
+    
+    # Connect in the background while the key is being chosen
+    comm, ticker = make_comm(args.ingest)
+    comm.start()
+    profiler.mark("serial")
     
     # Key Selection
-    key_sig = select_key_signature(screen)
-    if not key_sig: return
+    key_sig = select_key_signature(screen, profiler)
+    if not key_sig:
+        comm.disconnect()
+        if ticker is not None: ticker.close()
+        return
     key_name, key_offset = key_sig
     
     # Setup
+    from visualizer_3d import TripleFrequency3DVisualizer
     viz = TripleFrequency3DVisualizer(MAIN_VIEW_WIDTH, HEIGHT)
-    comm = SerialComm()
-    comm.connect()
-    comm.start_reading()
+    # One simulation step per 1/60 s tick, so strums arriving within a frame
+    # each get their own step (see queue_frequencies)
+    viz.set_fixed_timestep(1 / 60)
     
     # UI Layout
     sidebar_rect = pygame.Rect(0, 0, SIDEBAR_WIDTH, HEIGHT)
@@ -360,10 +547,12 @@ def main():
     
     y += 50
     lbl_points = Label(30, y, "Points: 0", Theme.FONT_MAIN, Theme.TEXT_GRAY)
+    lbl_points.readout = True
     ui_elements.append(lbl_points)
     
     y += 30
     lbl_tilt = Label(30, y, f"Tilt: {viz.base_rot_deg:.0f}°", Theme.FONT_MAIN, Theme.TEXT_GRAY)
+    lbl_tilt.readout = True
     ui_elements.append(lbl_tilt)
     y += 30
     def tilt_minus(): viz.set_base_tilt_deg(viz.base_rot_deg - 5)
@@ -394,9 +583,11 @@ def main():
     btn_exit = Button(30, y, 260, 40, "Exit Application", lambda: pygame.event.post(pygame.event.Event(pygame.QUIT)))
     ui_elements.extend([btn_clear, btn_exit])
     
+    sidebar = Sidebar(sidebar_rect, ui_elements)  # Repaints only changed widgets
+    background = BackgroundLayer()  # Grid and corner marks, rendered once
     running = True
     pressed_keys = {}
-    last_update = time.time()
+    latency = LatencyMeter()
     drag_started = False
     last_mouse = (0, 0)
     
@@ -418,8 +609,9 @@ def main():
             elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
                 drag_started = False
 
-            for el in ui_elements:
-                el.handle_event(event)
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                sidebar.invalidate()
+            sidebar.handle_event(event)
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     running = False
@@ -438,45 +630,62 @@ def main():
                         comm.send_key_off(pressed_keys[k])
                         del pressed_keys[k]
 
-        now = time.time()
-        if now - last_update > FREQ_UPDATE_INTERVAL:
-            f1, f2, f3 = comm.get_frequencies()
-            if f1 is not None and f2 is not None and f3 is not None:
-                viz.set_frequencies_direct(f1, f2, f3)
+        # Connection state changes in the background (hot-plug)
+        if comm.is_connected():
+            lbl_status.set_text("Status: Connected")
+            lbl_status.color = Theme.SUCCESS_GREEN
+        else:
+            lbl_status.set_text("Status: Offline")
+            lbl_status.color = Theme.ERROR_RED
+
+        # Queue every strum received since the last frame, in arrival order;
+        # each takes effect at the simulation tick it arrived by
+        events = comm.drain_events()
+        latency.record(events)
+        for ev in events:
+            if ev.kind == "freq":
+                # The pc/ engine fork draws three voices
+                f1, f2, f3 = ev.value[:3]
+                viz.queue_frequencies(f1, f2, f3, ev.t)
                 bar_x.set_value(f1)
                 bar_y.set_value(f2)
                 bar_z.set_value(f3)
-            last_update = now
             
         viz.update()
         lbl_points.set_text(f"Points: {len(viz.points)}")
         lbl_tilt.set_text(f"Tilt: {viz.base_rot_deg:.0f}°")
         
-        # Sidebar
-        screen.fill(Theme.BLACK_BG, sidebar_rect)
-        pygame.draw.rect(screen, (25, 25, 30), sidebar_rect)
-        pygame.draw.line(screen, Theme.GOLD_DIM, (SIDEBAR_WIDTH, 0), (SIDEBAR_WIDTH, HEIGHT), 2)
-        for el in ui_elements:
-            el.update(mouse_pos)
-            el.draw(screen)
+        # Sidebar (returns the rects it repainted)
+        dirty_rects = sidebar.draw(screen, mouse_pos)
             
         # Main View
         main_surf = screen.subsurface(main_view_rect)
-        main_surf.fill(Theme.BLACK_BG)
-        draw_grid(main_surf, main_surf.get_rect())
+        background.draw(main_surf)
         viz.draw(main_surf)
-        draw_corners(main_surf, main_surf.get_rect().inflate(-40, -40))
         
         if viz.current_freq_x <= 1 or viz.current_freq_y <= 1 or viz.current_freq_z <= 1:
-            hint = Theme.FONT_TITLE.render("Waiting for 3 Frequencies...", True, (100, 100, 100))
+            hint = Theme.render_text(Theme.FONT_TITLE, "Waiting for 3 Frequencies...", (100, 100, 100))
             main_surf.blit(hint, hint.get_rect(center=(MAIN_VIEW_WIDTH//2, HEIGHT//2)))
-        hint_drag = Theme.FONT_SMALL.render("Drag to rotate (no zoom)", True, (80, 80, 80))
+        hint_drag = Theme.render_text(Theme.FONT_SMALL, "Drag to rotate (no zoom)", (80, 80, 80))
         main_surf.blit(hint_drag, (12, HEIGHT - 28))
             
-        pygame.display.flip()
-        clock.tick(60)
+        pygame.display.update(dirty_rects + [main_view_rect])
+        if ticker is not None:
+            ticker.tick(60)  # Serial I/O is served while the frame waits
+        else:
+            clock.tick(60)
 
     comm.disconnect()
+    if ticker is not None:
+        ticker.close()
+    stats = latency.summary()
+    if stats:
+        print(f"[Serial] {stats['count']} events, latency p50 {stats['p50_ms']:.1f} ms, "
+              f"p95 {stats['p95_ms']:.1f} ms, max {stats['max_ms']:.1f} ms")
+    stats = comm.link.reconnect.summary() if isinstance(comm, SerialComm) else {}
+    if stats:
+        print(f"[Serial] {stats['count']} reconnects, latency p50 {stats['p50_ms']:.0f} ms, "
+              f"max {stats['max_ms']:.0f} ms")
     pygame.quit()
 
 if __name__ == "__main__":
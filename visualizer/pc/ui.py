@@ -1,5 +1,11 @@
 import pygame
+import json
 import math
+import os
+import re
+from collections import OrderedDict
+
+_READOUT_RUNS = re.compile(r"\d+|\D+")
 
 # ==========================================
 # 🎨 Modern Black & Gold Theme Definition
@@ -30,19 +36,150 @@ class Theme:
     FONT_SMALL = None
     FONT_HUGE = None
 
+    # Resolved system font paths. match_font() scans every installed font
+    # (fontconfig), which can take most of a second; delete to rescan.
+    FONT_CACHE = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+                              "son-visualizer", "fonts.json")
+
+    # Shared surface cache (rendered text, glyph atlases, glow sprites).
+    # Least recently used entries are evicted once the pixel memory held
+    # exceeds CACHE_BYTES.
+    CACHE_BYTES = 8 * 1024 * 1024
+    READOUT_GLYPHS = "0123456789"
+    _cache = OrderedDict()
+    _cache_used = 0
+    _sizes = {}  # Readout sizes, cleared when it grows past a few hundred
+
     @staticmethod
     def init_fonts():
         if Theme.FONT_MAIN is None:
             pygame.font.init()
             # Try to use a modern font, fallback to system default
             fonts = ['segoeui', 'arial', 'microsoftyahei', 'simhei']
-            font_name = pygame.font.match_font(fonts[0])
+            font_name = Theme.font_path(fonts[0])
             
             Theme.FONT_HUGE = pygame.font.Font(font_name, 64)
             Theme.FONT_TITLE = pygame.font.Font(font_name, 36)
             Theme.FONT_MAIN = pygame.font.Font(font_name, 20)
             Theme.FONT_SMALL = pygame.font.Font(font_name, 14)
 
+    @staticmethod
+    def font_path(name):
+        """pygame.font.match_font(name), remembered in FONT_CACHE across runs.
+        A cached path that no longer exists is resolved again."""
+        try:
+            with open(Theme.FONT_CACHE) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+        path = cache.get(name, "")
+        if path is None or (path and os.path.exists(path)):
+            return path
+        path = cache[name] = pygame.font.match_font(name)
+        try:
+            os.makedirs(os.path.dirname(Theme.FONT_CACHE), exist_ok=True)
+            tmp = Theme.FONT_CACHE + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(cache, f)
+            os.replace(tmp, Theme.FONT_CACHE)
+        except OSError:
+            pass  # Read-only home: resolve again next time
+        return path
+
+    @staticmethod
+    def _nbytes(value):
+        surf = value[0] if isinstance(value, tuple) else value
+        return surf.get_pitch() * surf.get_height()
+
+    @staticmethod
+    def cached(key, build):
+        """Surface stored under key; build() creates it on a miss.
+        Values may also be tuples whose first item is the surface."""
+        value = Theme._cache.get(key)
+        if value is not None:
+            Theme._cache.move_to_end(key)
+            return value
+        value = build()
+        Theme._cache[key] = value
+        Theme._cache_used += Theme._nbytes(value)
+        while Theme._cache_used > Theme.CACHE_BYTES and len(Theme._cache) > 1:
+            _, old = Theme._cache.popitem(last=False)
+            Theme._cache_used -= Theme._nbytes(old)
+        return value
+
+    @staticmethod
+    def clear_cache():
+        Theme._cache.clear()
+        Theme._cache_used = 0
+        Theme._sizes.clear()
+
+    @staticmethod
+    def render_text(font, text, color):
+        """font.render(text, True, color), cached."""
+        return Theme.cached(("text", font, text, color), lambda: font.render(text, True, color))
+
+    @staticmethod
+    def glyph_atlas(font, color):
+        """One surface holding READOUT_GLYPHS side by side.
+        Returns (atlas, {char: (area rect, advance)})."""
+        def build():
+            glyphs = [font.render(ch, True, color) for ch in Theme.READOUT_GLYPHS]
+            atlas = pygame.Surface((sum(g.get_width() for g in glyphs),
+                                    max(g.get_height() for g in glyphs)), pygame.SRCALPHA)
+            glyph_map, x = {}, 0
+            for ch, glyph in zip(Theme.READOUT_GLYPHS, glyphs):
+                # MAX onto the transparent atlas copies the glyph's pixels unblended
+                atlas.blit(glyph, (x, 0), special_flags=pygame.BLEND_RGBA_MAX)
+                area = pygame.Rect(x, 0, glyph.get_width(), glyph.get_height())
+                glyph_map[ch] = (area, font.metrics(ch)[0][4])
+                x += glyph.get_width()
+            return atlas, glyph_map
+        return Theme.cached(("atlas", font, color), build)
+
+    @staticmethod
+    def _readout_layout(font, text, color):
+        """Blit list for text: digits from the atlas, other runs from the text cache."""
+        atlas, glyph_map = Theme.glyph_atlas(font, color)
+        blits, x = [], 0
+        for run in _READOUT_RUNS.findall(text):
+            if run[0] in glyph_map:
+                for ch in run:
+                    area, advance = glyph_map[ch]
+                    blits.append((atlas, x, area))
+                    x += advance
+            else:
+                surf, advance = Theme.cached(
+                    ("run", font, run, color),
+                    lambda: (font.render(run, True, color), font.size(run)[0]))
+                blits.append((surf, x, None))
+                x += advance
+        return blits
+
+    @staticmethod
+    def readout_size(font, text, color):
+        """Size of text as drawn by blit_readout."""
+        key = ("readout_size", font, text, color)
+        size = Theme._sizes.get(key)
+        if size is None:
+            width = height = 0
+            for surf, x, area in Theme._readout_layout(font, text, color):
+                w, h = area.size if area else surf.get_size()
+                width, height = max(width, x + w), max(height, h)
+            size = Theme._sizes[key] = (width, height)
+            if len(Theme._sizes) > 256:
+                Theme._sizes.clear()
+        return size
+
+    @staticmethod
+    def blit_readout(surface, font, text, color, pos):
+        """Draw a numeric readout such as "Points: 9731".
+        Digits are copied from the glyph atlas at their font advances and the
+        other runs come from the text cache, so a changing number is never
+        re-rasterized."""
+        x0, y = pos
+        surface.blits([(surf, (x0 + x, y), area) for surf, x, area
+                       in Theme._readout_layout(font, text, color)], doreturn=False)
+
 # ==========================================
 # 🛠️ UI Base Component
 # ==========================================
@@ -52,6 +189,11 @@ class UIElement:
         self.hovered = False
         self.active = True
         self.visible = True
+        # Dirty tracking for Sidebar: an element is redrawn when it was marked
+        # dirty or its render_state() differs from the one last drawn
+        self.dirty = True
+        self.drawn_rect = None   # Area covered by the last draw (None = never drawn)
+        self._drawn_state = None
 
     def update(self, mouse_pos):
         if not self.visible or not self.active:
@@ -59,6 +201,25 @@ class UIElement:
             return
         self.hovered = self.rect.collidepoint(mouse_pos)
 
+    def render_state(self):
+        """Everything draw() depends on; a change means the element must be redrawn."""
+        return (self.visible, tuple(self.rect))
+
+    def bounds(self):
+        """Screen area draw() can touch."""
+        return self.rect.copy()
+
+    def mark_dirty(self):
+        self.dirty = True
+
+    def needs_redraw(self):
+        return self.dirty or self.render_state() != self._drawn_state
+
+    def mark_clean(self):
+        self._drawn_state = self.render_state()
+        self.drawn_rect = self.bounds() if self.visible else None
+        self.dirty = False
+
     def draw(self, surface):
         pass
 
@@ -86,25 +247,46 @@ class Button(UIElement):
         target = 1.0 if self.hovered else 0.0
         self.animation_progress += (target - self.animation_progress) * 0.2
 
+    def _current_color(self):
+        # Interpolate color
+        r = self.base_color[0] + (self.hover_color[0] - self.base_color[0]) * self.animation_progress
+        g = self.base_color[1] + (self.hover_color[1] - self.base_color[1]) * self.animation_progress
+        b = self.base_color[2] + (self.hover_color[2] - self.base_color[2]) * self.animation_progress
+        return (int(r), int(g), int(b))
+
+    def _glow_alpha(self):
+        return int(60 * self.animation_progress) if self.animation_progress > 0.05 else None
+
+    def _glow_surface(self, glow_alpha):
+        size = (self.rect.width + 12, self.rect.height + 12)
+        def build():
+            glow_surf = pygame.Surface(size, pygame.SRCALPHA)
+            pygame.draw.rect(glow_surf, (*Theme.GOLD_PRIMARY, glow_alpha), (0, 0, *size),
+                             border_radius=self.corner_radius + 4)
+            return glow_surf
+        return Theme.cached(("button_glow", size, self.corner_radius, glow_alpha), build)
+
+    def render_state(self):
+        # The hover animation converges asymptotically; only the integer colour
+        # and glow alpha it produces matter for the pixels
+        return (self.visible, tuple(self.rect), self.text, self.font, self.text_color,
+                self._current_color(), self._glow_alpha(), self.hovered)
+
+    def bounds(self):
+        font = self.font if self.font else Theme.FONT_MAIN
+        text_rect = Theme.render_text(font, self.text, self.text_color).get_rect(center=self.rect.center)
+        return self.rect.inflate(12, 12).union(text_rect)
+
     def draw(self, surface):
         if not self.visible:
             return
 
         font = self.font if self.font else Theme.FONT_MAIN
-
-        # Interpolate color
-        r = self.base_color[0] + (self.hover_color[0] - self.base_color[0]) * self.animation_progress
-        g = self.base_color[1] + (self.hover_color[1] - self.base_color[1]) * self.animation_progress
-        b = self.base_color[2] + (self.hover_color[2] - self.base_color[2]) * self.animation_progress
-        current_color = (int(r), int(g), int(b))
+        current_color = self._current_color()
 
         # Glow effect (draw larger, transparent rect behind)
         if self.animation_progress > 0.05:
-            glow_surf = pygame.Surface((self.rect.width + 12, self.rect.height + 12), pygame.SRCALPHA)
-            glow_alpha = int(60 * self.animation_progress)
-            pygame.draw.rect(glow_surf, (*Theme.GOLD_PRIMARY, glow_alpha), 
-                           (0, 0, self.rect.width + 12, self.rect.height + 12), 
-                           border_radius=self.corner_radius + 4)
+            glow_surf = self._glow_surface(self._glow_alpha())
             surface.blit(glow_surf, (self.rect.x - 6, self.rect.y - 6))
 
         # Main Button Body
@@ -115,7 +297,7 @@ class Button(UIElement):
         pygame.draw.rect(surface, Theme.GOLD_PRIMARY, self.rect, border_width, border_radius=self.corner_radius)
 
         # Text
-        text_surf = font.render(self.text, True, self.text_color)
+        text_surf = Theme.render_text(font, self.text, self.text_color)
         text_rect = text_surf.get_rect(center=self.rect.center)
         surface.blit(text_surf, text_rect)
 
@@ -141,37 +323,52 @@ class Label(UIElement):
         self.align = align
         self.shadow_color = (0, 0, 0)
         self.shadow_offset = (2, 2)
+        self.readout = False  # Draw digits from the glyph atlas (for changing numbers)
 
     def set_text(self, text):
         self.text = text
 
-    def draw(self, surface):
-        if not self.visible:
-            return
-            
+    def _layout(self):
         font = self.font if self.font else Theme.FONT_MAIN
 
-        # Shadow
-        shadow_surf = font.render(self.text, True, self.shadow_color)
-        
-        # Main Text
-        text_surf = font.render(self.text, True, self.color)
-        
-        width = text_surf.get_width()
-        height = text_surf.get_height()
-        
+        if self.readout:
+            width, height = Theme.readout_size(font, self.text, self.color)
+        else:
+            width, height = Theme.render_text(font, self.text, self.color).get_size()
+
         # Calculate Position
         pos_x = self.rect.x
         pos_y = self.rect.y
-        
+
         if self.align == "center":
             pos_x = self.rect.x - width // 2
         elif self.align == "right":
             pos_x = self.rect.x - width
-            
+        return font, width, height, pos_x, pos_y
+
+    def render_state(self):
+        return (self.visible, tuple(self.rect), self.text, self.font, self.color,
+                self.align, self.shadow_color, self.shadow_offset, self.readout)
+
+    def bounds(self):
+        _, width, height, pos_x, pos_y = self._layout()
+        dx, dy = self.shadow_offset
+        return pygame.Rect(pos_x + min(0, dx), pos_y + min(0, dy), width + abs(dx), height + abs(dy))
+
+    def draw(self, surface):
+        if not self.visible:
+            return
+
+        font, _, _, pos_x, pos_y = self._layout()
+        shadow_pos = (pos_x + self.shadow_offset[0], pos_y + self.shadow_offset[1])
+
         # Draw Shadow then Text
-        surface.blit(shadow_surf, (pos_x + self.shadow_offset[0], pos_y + self.shadow_offset[1]))
-        surface.blit(text_surf, (pos_x, pos_y))
+        if self.readout:
+            Theme.blit_readout(surface, font, self.text, self.shadow_color, shadow_pos)
+            Theme.blit_readout(surface, font, self.text, self.color, (pos_x, pos_y))
+        else:
+            surface.blit(Theme.render_text(font, self.text, self.shadow_color), shadow_pos)
+            surface.blit(Theme.render_text(font, self.text, self.color), (pos_x, pos_y))
 
 # ==========================================
 # 📦 Panel / Container
@@ -183,14 +380,20 @@ class Panel(UIElement):
         self.border_color = Theme.GOLD_DIM
         self.bg_color = (20, 20, 25, 230) # Semi-transparent
 
+    def render_state(self):
+        return (self.visible, tuple(self.rect), self.title, self.border_color, self.bg_color)
+
     def draw(self, surface):
         if not self.visible:
             return
 
         # Transparent Background
-        s = pygame.Surface((self.rect.width, self.rect.height), pygame.SRCALPHA)
-        s.fill(self.bg_color)
-        surface.blit(s, (self.rect.x, self.rect.y))
+        size, bg_color = self.rect.size, self.bg_color
+        def build():
+            s = pygame.Surface(size, pygame.SRCALPHA)
+            s.fill(bg_color)
+            return s
+        surface.blit(Theme.cached(("panel_bg", size, bg_color), build), (self.rect.x, self.rect.y))
 
         # Border
         pygame.draw.rect(surface, self.border_color, self.rect, 1, border_radius=5)
@@ -198,7 +401,7 @@ class Panel(UIElement):
         # Title
         if self.title:
             font = Theme.FONT_MAIN
-            title_surf = font.render(self.title, True, Theme.GOLD_PRIMARY)
+            title_surf = Theme.render_text(font, self.title, Theme.GOLD_PRIMARY)
             # Draw title background strip
             title_bg_rect = pygame.Rect(self.rect.x, self.rect.y, self.rect.width, 32)
             pygame.draw.rect(surface, (40, 40, 50), title_bg_rect, border_top_left_radius=5, border_top_right_radius=5)
@@ -242,29 +445,47 @@ class Slider(UIElement):
             return False
         return False
 
+    def _label_text(self):
+        return f"{self.label}: {self.value:.0f}"
+
+    def _fill_width(self):
+        ratio = (self.value - self.min_val) / (self.max_val - self.min_val)
+        return int(ratio * self.rect.width)
+
+    def _knob_color(self):
+        return Theme.GOLD_LIGHT if self.dragging or self.hovered else Theme.GOLD_DIM
+
+    def render_state(self):
+        return (self.visible, tuple(self.rect), self._label_text(),
+                self._fill_width(), self._knob_color())
+
+    def bounds(self):
+        # Track plus the knob (radius 8) at either end, and the label above
+        area = pygame.Rect(self.rect.x - 9, self.rect.y + 3, self.rect.width + 19, 19)
+        label = pygame.Rect((self.rect.x, self.rect.y - 18),
+                            Theme.readout_size(Theme.FONT_SMALL, self._label_text(), Theme.TEXT_GRAY))
+        return area.union(label)
+
     def draw(self, surface):
         if not self.visible: return
 
-        font = Theme.FONT_SMALL
-
         # Label
-        label_surf = font.render(f"{self.label}: {self.value:.0f}", True, Theme.TEXT_GRAY)
-        surface.blit(label_surf, (self.rect.x, self.rect.y - 18))
+        Theme.blit_readout(surface, Theme.FONT_SMALL, self._label_text(), Theme.TEXT_GRAY,
+                           (self.rect.x, self.rect.y - 18))
 
         # Track
         track_rect = pygame.Rect(self.rect.x, self.rect.y + 10, self.rect.width, 4)
         pygame.draw.rect(surface, (60, 60, 60), track_rect, border_radius=2)
         
         # Fill
-        ratio = (self.value - self.min_val) / (self.max_val - self.min_val)
-        fill_width = int(ratio * self.rect.width)
+        fill_width = self._fill_width()
         fill_rect = pygame.Rect(self.rect.x, self.rect.y + 10, fill_width, 4)
         pygame.draw.rect(surface, Theme.GOLD_PRIMARY, fill_rect, border_radius=2)
 
         # Knob
         knob_x = int(self.rect.x + fill_width)
         knob_y = int(self.rect.y + 12)
-        color = Theme.GOLD_LIGHT if self.dragging or self.hovered else Theme.GOLD_DIM
+        color = self._knob_color()
         pygame.draw.circle(surface, color, (knob_x, knob_y), 8)
 
 # ==========================================
@@ -287,21 +508,36 @@ class FrequencyBar(UIElement):
         # 平滑动画
         self.value += (self.target_value - self.value) * 0.1
 
+    def _label_text(self):
+        val_text = f"{int(self.value)} Hz" if self.value > 10 else "---"
+        return f"{self.label}: {val_text}"
+
+    def _fill_width(self):
+        ratio = min(1.0, max(0.0, self.value / self.max_freq))
+        return int(self.rect.width * ratio)
+
+    def render_state(self):
+        # value eases towards its target forever; redraw only when the
+        # displayed Hz or the bar length changes
+        return (self.visible, tuple(self.rect), self._label_text(), self._fill_width(), self.bar_color)
+
+    def bounds(self):
+        label = pygame.Rect((self.rect.x, self.rect.y - 18),
+                            Theme.readout_size(Theme.FONT_SMALL, self._label_text(), Theme.TEXT_GOLD))
+        return self.rect.union(label)
+
     def draw(self, surface):
         if not self.visible: return
 
         # Label
-        font = Theme.FONT_SMALL
-        val_text = f"{int(self.value)} Hz" if self.value > 10 else "---"
-        label_surf = font.render(f"{self.label}: {val_text}", True, Theme.TEXT_GOLD)
-        surface.blit(label_surf, (self.rect.x, self.rect.y - 18))
+        Theme.blit_readout(surface, Theme.FONT_SMALL, self._label_text(), Theme.TEXT_GOLD,
+                           (self.rect.x, self.rect.y - 18))
 
         # Background Track
         pygame.draw.rect(surface, (30, 30, 35), self.rect, border_radius=4)
         
         # Fill Bar
-        ratio = min(1.0, max(0.0, self.value / self.max_freq))
-        fill_width = int(self.rect.width * ratio)
+        fill_width = self._fill_width()
         if fill_width > 0:
             fill_rect = pygame.Rect(self.rect.x, self.rect.y, fill_width, self.rect.height)
             pygame.draw.rect(surface, self.bar_color, fill_rect, border_radius=4)
@@ -309,6 +545,69 @@ class FrequencyBar(UIElement):
         # Border
         pygame.draw.rect(surface, (60, 60, 70), self.rect, 1, border_radius=4)
 
+# ==========================================
+# 🗂️ Sidebar (dirty-rectangle redraw)
+# ==========================================
+class Sidebar:
+    """Owns the sidebar widgets and repaints only what changed.
+    draw() returns the screen rects it touched, for pygame.display.update().
+    The first call (or the first after invalidate()) paints the whole panel;
+    after that only elements whose render_state() changed are repainted, by
+    clearing their old and new bounds and redrawing every element overlapping
+    that area. Nothing changed -> nothing drawn, empty list returned."""
+    def __init__(self, rect, elements, bg_color=(25, 25, 30), border_color=Theme.GOLD_DIM):
+        self.rect = pygame.Rect(rect)
+        self.elements = list(elements)
+        self.bg_color = bg_color
+        self.border_color = border_color
+        self._full = True
+
+    def invalidate(self):
+        """Force a full repaint next frame (e.g. after the screen was cleared)."""
+        self._full = True
+
+    def handle_event(self, event):
+        for el in self.elements:
+            el.handle_event(event)
+
+    def draw(self, surface, mouse_pos):
+        for el in self.elements:
+            el.update(mouse_pos)
+
+        if self._full:
+            surface.fill(self.bg_color, self.rect)
+            border = pygame.draw.line(surface, self.border_color, self.rect.topright,
+                                      self.rect.bottomright, 2)
+            for el in self.elements:
+                el.draw(surface)
+                el.mark_clean()
+            self._full = False
+            return [self.rect.union(border)]
+
+        areas = []
+        for el in self.elements:
+            if not el.needs_redraw():
+                continue
+            rects = [r for r in (el.drawn_rect, el.bounds() if el.visible else None) if r]
+            if rects:
+                areas.append(rects[0].unionall(rects[1:]).clip(self.rect))
+        areas = [a for a in areas if a.width and a.height]
+        if not areas:
+            return []
+
+        clip = surface.get_clip()
+        for area in areas:
+            surface.set_clip(area)
+            surface.fill(self.bg_color, area)
+            for el in self.elements:
+                if el.visible and area.colliderect(el.bounds()):
+                    el.draw(surface)
+        surface.set_clip(clip)
+        for el in self.elements:
+            if el.needs_redraw():
+                el.mark_clean()
+        return areas
+
 # ==========================================
 # 📐 Decorative Elements (装饰元素)
 # ==========================================
@@ -333,3 +632,126 @@ def draw_corners(surface, rect, length=20, color=Theme.GOLD_PRIMARY):
     # Bottom Right
     pygame.draw.line(surface, color, (rect.right, rect.bottom), (rect.right - length, rect.bottom), 2)
     pygame.draw.line(surface, color, (rect.right, rect.bottom), (rect.right, rect.bottom - length), 2)
+
+# ==========================================
+# 🧱 Cached Background Layer
+# ==========================================
+class BackgroundLayer:
+    """Viewport background (fill + grid + corner marks) pre-rendered once.
+    draw() composites it with a single opaque blit; the cached surface is only
+    rebuilt when the target size/format or one of the settings changes."""
+    def __init__(self, bg_color=Theme.BLACK_BG, spacing=40, grid_color=(30, 30, 35),
+                 corner_inset=20, corner_color=Theme.GOLD_PRIMARY):
+        self.bg_color = bg_color
+        self.spacing = spacing
+        self.grid_color = grid_color
+        self.corner_inset = corner_inset  # Distance of the corner marks from the edges
+        self.corner_color = corner_color
+        self.surface = None
+        self._key = None
+
+    def invalidate(self):
+        self._key = None
+
+    def draw(self, surface):
+        key = (surface.get_size(), surface.get_bitsize(), self.bg_color, self.spacing,
+               self.grid_color, self.corner_inset, self.corner_color)
+        if key != self._key:
+            self.surface = pygame.Surface(surface.get_size(), 0, surface)
+            self.surface.fill(self.bg_color)
+            rect = self.surface.get_rect()
+            draw_grid(self.surface, rect, self.spacing, self.grid_color)
+            inset = -2 * self.corner_inset
+            draw_corners(self.surface, rect.inflate(inset, inset), color=self.corner_color)
+            self._key = key
+        surface.blit(self.surface, (0, 0))
+
+# ==========================================
+# ✨ Glow Sprite Bank
+# ==========================================
+class GlowBank:
+    """Pre-rendered glow sprites for trail heads and bloom.
+    layers is a stack of (radius, alpha) discs baked into one sprite (drawn
+    as a single blit); falloff "flat" gives solid discs like
+    pygame.draw.circle, "radial" fades each disc to zero at its edge.
+    Colours are snapped to multiples of color_step so nearby colours and
+    fade levels share a sprite (colours are 0-255 ints); sprites live in the
+    Theme cache.
+    additive=True bakes the alpha into the colour and blits with
+    BLEND_RGB_ADD instead of alpha blending."""
+    def __init__(self, layers=((20, 80),), falloff="flat", color_step=8, additive=False, pad=5):
+        self.layers = tuple((int(r), int(a)) for r, a in layers)
+        self.falloff = falloff
+        self.color_step = color_step
+        self.additive = additive
+        self.pad = pad
+        self.half = max(r for r, _ in self.layers) + pad  # Sprite centre offset
+        self._alpha = None
+        # Channel value -> nearest grid value, and the cache key prefix
+        self._snap = [min(255, (v + color_step // 2) // color_step * color_step) for v in range(256)]
+        self._key = ("glow", self.layers, falloff, self.half)
+
+    def quantize(self, color):
+        snap = self._snap
+        return snap[color[0]], snap[color[1]], snap[color[2]]
+
+    def _coverage(self):
+        """Combined alpha (0-255) of the layer stack as a (size, size) array."""
+        if self._alpha is None:
+            import numpy as np  # Not needed before the first sprite (start-up)
+            size = 2 * self.half
+            # Alpha of the union: 1 - prod(1 - a_i * coverage_i)
+            clear = np.ones((size, size))
+            if self.falloff == "radial":
+                d = np.hypot(*np.meshgrid(np.arange(size) - self.half, np.arange(size) - self.half,
+                                          indexing="ij"))
+            for radius, alpha in self.layers:
+                if self.falloff == "radial":
+                    cover = np.clip(1.0 - d / radius, 0.0, 1.0) ** 2
+                else:
+                    mask = pygame.Surface((size, size), pygame.SRCALPHA)
+                    pygame.draw.circle(mask, (255, 255, 255, 255), (self.half, self.half), radius)
+                    cover = pygame.surfarray.array_alpha(mask) / 255.0
+                clear *= 1.0 - cover * (alpha / 255.0)
+            self._alpha = np.rint((1.0 - clear) * 255.0).astype(np.uint8)
+        return self._alpha
+
+    def sprite(self, color):
+        """Sprite for color (snapped to the grid), built on first use."""
+        snap = self._snap
+        color = snap[color[0]], snap[color[1]], snap[color[2]]
+        def build():
+            import numpy as np
+            alpha = self._coverage()
+            size = alpha.shape
+            if self.additive:
+                s = pygame.Surface(size)
+                view = pygame.surfarray.pixels3d(s)
+                view[...] = np.rint(alpha[:, :, None] * (np.array(color) / 255.0)).astype(np.uint8)
+                del view
+            else:
+                s = pygame.Surface(size, pygame.SRCALPHA)
+                s.fill((*color, 0))
+                view = pygame.surfarray.pixels_alpha(s)
+                view[...] = alpha
+                del view
+            return s
+        return Theme.cached((self._key, self.additive, color), build)
+
+    def prewarm(self, colors, levels=8):
+        """Render sprites for each colour at `levels` evenly spaced intensities."""
+        for color in colors:
+            for i in range(1, levels + 1):
+                self.sprite(tuple(c * i // levels for c in color))
+
+    def blit(self, surface, center, color):
+        """Draw one glow centred on center (float coordinates are fine)."""
+        flags = pygame.BLEND_RGB_ADD if self.additive else 0
+        surface.blit(self.sprite(color), (center[0] - self.half, center[1] - self.half),
+                     special_flags=flags)
+
+    def blit_many(self, surface, items):
+        """Draw glows for [(center, color), ...] in one Surface.blits() call."""
+        flags = pygame.BLEND_RGB_ADD if self.additive else 0
+        surface.blits([(self.sprite(color), (x - self.half, y - self.half), None, flags)
+                       for (x, y), color in items], doreturn=False)
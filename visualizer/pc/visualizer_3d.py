@@ -3,6 +3,7 @@ import time
 import colorsys
 import math
 import random
+from collections import deque
 import pygame
 from ui import Theme
 
@@ -69,6 +70,10 @@ class TripleFrequency3DVisualizer:
         self.target_freq_x = self.target_freq_y = self.target_freq_z = 0
         self.current_freq_x = self.current_freq_y = self.current_freq_z = 0
         self.phase_x = self.phase_y = self.phase_z = 0.0
+        # (time, (f1, f2, f3)) targets waiting for their step (see queue_frequencies)
+        self.pending_freqs = deque()
+        # Fixed-timestep simulation (see set_fixed_timestep); None = one step per update()
+        self.stepper = None
 
         self.target_color = (100, 100, 100)
         self.current_color = (100, 100, 100)
@@ -127,6 +132,31 @@ class TripleFrequency3DVisualizer:
         b = int((c1[2] + c2[2] + c3[2]) / 3 * 255)
         self.target_color = (r, g, b)
 
+    def queue_frequencies(self, f1, f2, f3, arrival=None):
+        """Set target frequencies from the simulation step they arrived by.
+        Inputs: f1, f2, f3 in Hz and the time.perf_counter() reading when they
+        were received (event_ring.Event.t; None for now).
+        Outputs: queues the targets; update() applies each one before the first
+        step ending at or after its arrival (see set_frequencies_direct)."""
+        t = time.time()
+        if arrival is not None:
+            t -= max(0.0, time.perf_counter() - arrival)
+        self.pending_freqs.append((t, (f1, f2, f3)))
+
+    def _apply_pending(self, t):
+        """Apply the queued targets that had arrived by time t (None: all)."""
+        pending = self.pending_freqs
+        while pending and (t is None or pending[0][0] <= t):
+            self.set_frequencies_direct(*pending.popleft()[1])
+
+    def set_fixed_timestep(self, dt, max_ticks=15):
+        """Switch between fixed-timestep and per-update simulation.
+        Inputs: tick length in seconds (None: one step per update()) and the
+        most ticks one update() may catch up.
+        Outputs: configures self.stepper; no return value."""
+        from clock import FixedStep  # visualizer/clock.py, on sys.path for main_v3
+        self.stepper = FixedStep(dt, max_ticks) if dt else None
+
     def set_volume(self, v):
         """Set global brightness multiplier for trail rendering.
         Inputs: v in [0, 1] controlling opacity and glow intensity.
@@ -193,9 +223,35 @@ class TripleFrequency3DVisualizer:
     def update(self):
         """Advance phases, interpolate world-space points and manage trail.
         Inputs: none; uses internal target frequencies and elapsed time.
-        Outputs: updates self.points, phases and colors; no return value."""
+        Outputs: updates self.points, phases and colors; no return value.
+
+        With set_fixed_timestep() one step runs per tick due since the last
+        call, each after the queued targets that had arrived by its time."""
         now = time.time()
+        if self.stepper is not None:
+            for t in self.stepper.advance(now):
+                self._apply_pending(t)
+                self._step(t)
+                self._expire(t)
+        else:
+            self._apply_pending(None)
+            self._step(now)
+            self._expire(now)
 
+    def _expire(self, now):
+        """Remove expired points and rebuild last / second_last references."""
+        self.points = [p for p in self.points if p.is_alive(now)]
+        if len(self.points) >= 2:
+            self.second_last_point, self.last_point = self.points[-2], self.points[-1]
+        elif len(self.points) == 1:
+            self.second_last_point, self.last_point = None, self.points[0]
+        else:
+            self.second_last_point = self.last_point = None
+
+    def _step(self, now):
+        """Run one simulation step: smooth frequencies/color, advance phases.
+        Inputs: timestamp of the step (birth time of the new points).
+        Outputs: appends the new point and its interpolated segment."""
         if self.target_freq_x > 0 and self.target_freq_y > 0 and self.target_freq_z > 0:
             if self.current_freq_x == 0:
                 self.current_freq_x = self.target_freq_x
@@ -259,15 +315,6 @@ class TripleFrequency3DVisualizer:
             self.second_last_point = self.last_point
             self.last_point = curr
 
-        # Remove expired points and rebuild last / second_last references
-        self.points = [p for p in self.points if p.is_alive(now)]
-        if len(self.points) >= 2:
-            self.second_last_point, self.last_point = self.points[-2], self.points[-1]
-        elif len(self.points) == 1:
-            self.second_last_point, self.last_point = None, self.points[0]
-        else:
-            self.second_last_point = self.last_point = None
-
     def _catmull(self, p0, p1, p2, p3, t):
         """Catmull–Rom interpolation between 3D trail points.
         Inputs: four TrailPoint3D control points and parameter t in [0, 1].
@@ -0,0 +1,374 @@
+"""
+PCM Source Module
+
+Audio-driven Lissajous mode. Instead of synthesizing sin(phase) from the
+target frequencies, the visualizer plots the real stereo output of the
+Karplus-Strong voice (dsp/ks_mono.dsp: left, right = left delayed 8 samples
+and low-passed): x = left, y = right and z = a derived third channel.
+
+Sources deliver float32 (n, 2) sample blocks for the time elapsed since the
+previous read:
+- WavSource: a WAV file (8/16/24/32-bit PCM, mono or stereo), paced by the
+  clock so it plays in real time; BufferSource does the same for an array
+  (e.g. a ks_render strum).
+- SocketSource: raw interleaved little-endian PCM read from a local TCP
+  ("host:port") or Unix-domain ("unix:/path") socket, e.g.
+  arecord -f S16_LE -r 48000 -c 2 | nc -l 5005.
+
+PcmLissajous turns those blocks into trail points with whole-block NumPy
+operations (boxcar decimation to a point budget, windowed auto-gain,
+birth-time spreading) and is installed with viz.set_point_source().
+"""
+
+import socket
+import wave
+
+import numpy as np
+
+from trail_store import pack_rgb
+
+# Most audio kept waiting for a frame (seconds); older samples are dropped
+# so a stall never makes the view lag behind the sound
+MAX_BACKLOG = 0.25
+
+# Full-scale divisor and offset per PCM sample width in bytes
+_PCM_SCALE = {1: (128.0, 128), 2: (32768.0, 0), 3: (8388608.0, 0), 4: (2147483648.0, 0)}
+
+
+def decode_pcm(data, sample_width, channels):
+    """Convert interleaved little-endian PCM bytes to float samples.
+    Inputs: bytes-like data (whole frames), bytes per sample (1-4), channel
+    count.
+    Outputs: float32 array of shape (frames, 2) in [-1, 1]; mono input is
+    duplicated, channels beyond the second are ignored."""
+    scale, offset = _PCM_SCALE[sample_width]
+    if sample_width == 1:
+        samples = np.frombuffer(data, dtype=np.uint8).astype(np.float32)
+    elif sample_width == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+        # Sign-extend the 24-bit values through the top byte of an int32
+        wide = np.zeros((len(raw), 4), dtype=np.uint8)
+        wide[:, 1:] = raw
+        samples = wide.view("<i4").ravel().astype(np.float32) / 256.0
+    else:
+        dtype = "<i2" if sample_width == 2 else "<i4"
+        samples = np.frombuffer(data, dtype=dtype).astype(np.float32)
+    samples = ((samples - offset) / scale).reshape(-1, channels)
+    if channels == 1:
+        return np.repeat(samples, 2, axis=1)
+    return samples[:, :2]
+
+
+class _PacedSource:
+    """Shared real-time pacing for file-like sources.
+    Subclasses set rate and implement _read_frames(count) / _skip(count)."""
+
+    def _start_pacing(self, speed):
+        self.speed = float(speed)
+        self.t0 = None
+        self.position = 0  # Frames delivered since start (across loops)
+        self.dropped = 0  # Frames skipped to catch up with the clock
+
+    def read(self, now):
+        """Take the samples that became due at time now.
+        Inputs: clock reading in seconds.
+        Outputs: float32 (n, 2) array (empty before the second call)."""
+        if not self.is_connected():
+            return np.zeros((0, 2), dtype=np.float32)
+        if self.t0 is None:
+            self.t0 = now
+        due = int((now - self.t0) * self.rate * self.speed) - self.position
+        backlog = int(MAX_BACKLOG * self.rate)
+        if due > backlog:
+            # Skip what the view can no longer show in time
+            skip = due - backlog
+            self._skip(skip)
+            self.position += skip
+            self.dropped += skip
+            due = backlog
+        block = self._read_frames(max(0, due))
+        self.position += max(0, due)
+        return block
+
+
+class BufferSource(_PacedSource):
+    """Stereo samples from an in-memory array, played back in real time.
+    Inputs: (n, 2) float array (e.g. from ks_render.render_strum), sample
+    rate, loop flag and playback speed.
+    Outputs: read(now) returns the samples due since the previous call."""
+
+    def __init__(self, samples, rate, loop=True, speed=1.0):
+        self.samples = np.asarray(samples, dtype=np.float32).reshape(-1, 2)
+        self.rate = int(rate)
+        self.loop = loop
+        self.cursor = 0
+        self._start_pacing(speed)
+
+    def is_connected(self):
+        return self.samples is not None
+
+    def _read_frames(self, count):
+        n = len(self.samples)
+        if not n:
+            return np.zeros((0, 2), dtype=np.float32)
+        if not self.loop:
+            count = min(count, n - self.cursor)
+            block = self.samples[self.cursor : self.cursor + count]
+            self.cursor += count
+            return block
+        index = (self.cursor + np.arange(count)) % n
+        self.cursor = (self.cursor + count) % n
+        return self.samples[index]
+
+    def _skip(self, count):
+        n = len(self.samples)
+        if n:
+            self.cursor = (
+                (self.cursor + count) % n if self.loop else min(n, self.cursor + count)
+            )
+
+    def close(self):
+        self.samples = None
+
+
+class WavSource(_PacedSource):
+    """Stereo samples from a WAV file, played back in real time.
+    Inputs: file path, loop flag, playback speed (1.0 = real time).
+    Outputs: read(now) returns the samples due since the previous call;
+    raises ValueError for files that are not PCM WAV."""
+
+    def __init__(self, path, loop=True, speed=1.0):
+        self.path = path
+        self.loop = loop
+        try:
+            self.wav = wave.open(path, "rb")
+        except wave.Error as e:
+            raise ValueError(f"{path}: {e}") from e
+        self.rate = self.wav.getframerate()
+        self.channels = self.wav.getnchannels()
+        self.sample_width = self.wav.getsampwidth()
+        self.frames = self.wav.getnframes()
+        self._start_pacing(speed)
+
+    def is_connected(self):
+        return self.wav is not None
+
+    def _read_frames(self, count):
+        chunks = []
+        while count > 0:
+            data = self.wav.readframes(count)
+            got = len(data) // (self.sample_width * self.channels)
+            if got:
+                chunks.append(decode_pcm(data, self.sample_width, self.channels))
+                count -= got
+            if count > 0:
+                if not (self.loop and self.frames):
+                    break
+                self.wav.rewind()
+        if not chunks:
+            return np.zeros((0, 2), dtype=np.float32)
+        return np.concatenate(chunks) if len(chunks) > 1 else chunks[0]
+
+    def _skip(self, count):
+        if self.frames:
+            target = self.wav.tell() + count
+            if self.loop:
+                target %= self.frames
+            self.wav.setpos(min(target, self.frames))
+
+    def close(self):
+        if self.wav is not None:
+            self.wav.close()
+            self.wav = None
+
+
+class SocketSource:
+    """Stereo samples streamed as raw PCM over a local socket.
+    Inputs: address ("host:port" for TCP, "unix:/path" for a Unix socket),
+    sample rate, channel count and bytes per sample of the stream.
+    Outputs: read(now) drains everything received since the previous call
+    without blocking; only the newest MAX_BACKLOG seconds are kept."""
+
+    RECV_BYTES = 1 << 16
+
+    def __init__(self, address, rate=48000, channels=2, sample_width=2):
+        self.address = address
+        self.rate = int(rate)
+        self.channels = int(channels)
+        self.sample_width = int(sample_width)
+        self.frame_bytes = self.channels * self.sample_width
+        self._buffer = bytearray(self.RECV_BYTES)
+        self._view = memoryview(self._buffer)
+        self._partial = bytearray()  # Bytes of an incomplete trailing frame
+        self.dropped = 0
+        self.sock = None
+        self.connect()
+
+    def connect(self):
+        """Open the connection; returns True on success."""
+        try:
+            if self.address.startswith("unix:"):
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.connect(self.address[5:])
+            else:
+                host, _, port = self.address.rpartition(":")
+                sock = socket.create_connection((host or "127.0.0.1", int(port)))
+            sock.setblocking(False)
+            self.sock = sock
+            print(f"[PCM] Connected to {self.address}")
+            return True
+        except (OSError, ValueError) as e:
+            print(f"[PCM] Connection to {self.address} failed: {e}")
+            self.sock = None
+            return False
+
+    def is_connected(self):
+        return self.sock is not None
+
+    def read(self, now):
+        """Take every complete frame received so far.
+        Inputs: clock reading (unused; the stream paces itself).
+        Outputs: float32 (n, 2) array."""
+        data = self._partial
+        while self.sock is not None:
+            try:
+                n = self.sock.recv_into(self._buffer)
+            except BlockingIOError:
+                break
+            except OSError:
+                n = 0
+            if n == 0:
+                print(f"[PCM] {self.address} closed the stream")
+                self.close()
+                break
+            data += self._view[:n]
+        whole = len(data) - len(data) % self.frame_bytes
+        keep = int(MAX_BACKLOG * self.rate) * self.frame_bytes
+        start = max(0, whole - keep)
+        self.dropped += start // self.frame_bytes
+        block = decode_pcm(bytes(data[start:whole]), self.sample_width, self.channels)
+        self._partial = bytearray(data[whole:])
+        return block
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+def open_source(spec, rate=48000):
+    """Open a PCM source from a command-line style spec.
+    Inputs: WAV path, "host:port" or "unix:/path"; stream rate for sockets.
+    Outputs: WavSource or SocketSource."""
+    if spec.lower().endswith(".wav"):
+        return WavSource(spec)
+    return SocketSource(spec, rate=rate)
+
+
+class PcmLissajous:
+    """Point source plotting a PCM stream as a 3D Lissajous figure.
+    Inputs: WavSource/SocketSource, point budget in points per second,
+    third channel ("side": left - right, or "lag": left delayed by lag
+    samples), analysis window length in output points and gain release time.
+    Outputs: read_points(viz, now) returns (x, y, z, rgb, birth) arrays for
+    TrailStore.append_many, or None when no samples arrived.
+
+    Each block of samples is low-passed and decimated by averaging groups of
+    `decimation` samples, split into windows whose per-channel peaks drive a
+    peak-hold/exponential-release auto-gain, and spread over the block's
+    time span so the trail fades continuously."""
+
+    def __init__(
+        self, source, point_rate=12000, third="side", lag=8, window=64, release=0.5
+    ):
+        if third not in ("side", "lag"):
+            raise ValueError(f"Unknown third channel: {third}")
+        self.source = source
+        self.rate = source.rate
+        self.decimation = max(1, int(round(self.rate / float(point_rate))))
+        self.third = third
+        self.lag = max(1, int(lag))
+        self.window = max(1, int(window))
+        # Per-point gain decay so a peak falls by 1/e after `release` seconds
+        self.decay = float(np.exp(-self.decimation / (self.rate * release)))
+        self.floor = 0.05  # Smallest envelope: silence is not blown up
+        self._carry = np.zeros((0, 3), dtype=np.float32)  # Leftover < decimation
+        self._history = np.zeros(self.lag, dtype=np.float32)  # Last left samples
+        self._envelope = np.full(3, self.floor)
+        self._last_birth = None
+        self.level = 0.0  # Peak magnitude of the last block (0-1)
+
+    def _channels(self, block):
+        """Stack left, right and the derived third channel as (n, 3)."""
+        left, right = block[:, 0], block[:, 1]
+        if self.third == "side":
+            third = left - right
+        else:
+            delayed = np.concatenate([self._history, left])
+            third = delayed[: len(left)]
+            self._history = delayed[-self.lag :]
+        return np.stack([left, right, third], axis=1)
+
+    def _decimate(self, samples):
+        samples = (
+            np.concatenate([self._carry, samples]) if len(self._carry) else samples
+        )
+        d = self.decimation
+        whole = len(samples) - len(samples) % d
+        self._carry = samples[whole:]
+        if d == 1:
+            return samples[:whole]
+        return samples[:whole].reshape(-1, d, 3).mean(axis=1)
+
+    def _gain(self, points):
+        """Per-point normalization from windowed peaks (peak hold + release)."""
+        n = len(points)
+        w = self.window
+        count = -(-n // w)
+        padded = np.zeros((count * w, 3), dtype=points.dtype)
+        padded[:n] = np.abs(points)
+        peaks = padded.reshape(count, w, 3).max(axis=1)
+        # env_k = max(peak_k, env_{k-1} * r) unrolled: max_j peak_j * r^(k-j)
+        r = self.decay**w
+        k = np.arange(count)[:, None]
+        scaled = np.vstack([self._envelope[None, :] * r, peaks * r ** (-k)])
+        env = np.maximum.accumulate(scaled, axis=0)[1:] * r**k
+        env = np.maximum(env, self.floor)
+        self._envelope = env[-1]
+        return np.repeat(1.0 / env, w, axis=0)[:n]
+
+    def read_points(self, viz, now):
+        """Convert the samples received since the last call into trail points.
+        Inputs: the visualizer (axis scale, colors) and the current time.
+        Outputs: (x, y, z, rgb, birth) arrays, or None when nothing arrived."""
+        block = self.source.read(now)
+        if len(block) == 0:
+            return None
+        points = self._decimate(self._channels(block))
+        n = len(points)
+        if n == 0:
+            return None
+        xyz = points * self._gain(points) * viz.axis_scale
+        # Samples are evenly spaced in time and the newest one is "now"
+        step = self.decimation / float(self.rate)
+        birth = now - step * np.arange(n - 1, -1, -1)
+        if self._last_birth is not None:
+            birth = np.maximum(birth, self._last_birth)
+        self._last_birth = birth[-1]
+
+        # Voice color when the chord is known, brighter with amplitude
+        magnitude = np.sqrt((xyz * xyz).sum(axis=1)) / (viz.axis_scale * 1.7320508)
+        self.level = float(magnitude.max())
+        base = np.array(viz.current_color if viz.has_signal() else viz.target_color)
+        shade = 0.55 + 0.45 * np.minimum(magnitude, 1.0)
+        rgb = np.minimum(base[None, :] * shade[:, None] * 1.4, 255).astype(np.int64)
+        return (
+            xyz[:, 0].astype(np.float64),
+            xyz[:, 1].astype(np.float64),
+            xyz[:, 2].astype(np.float64),
+            pack_rgb(rgb[:, 0], rgb[:, 1], rgb[:, 2]),
+            birth,
+        )
+
+    def close(self):
+        self.source.close()
@@ -0,0 +1,189 @@
+"""
+Phosphor Renderer Module
+
+Persistent-phosphor trail backend for TripleFrequency3DVisualizer. Instead
+of re-projecting and re-fading every stored point each frame, only the
+points born since the last frame are projected and splatted into a float
+accumulation buffer, and the whole buffer decays exponentially with one
+in-place multiply per frame. Frame cost follows the point rate, not the
+trail length, so the persistence can be much longer than FADE_TIME.
+
+The buffer holds screen-space light, so it cannot follow a camera change:
+while the view rotates (mouse drag, tilt, resize) the trail is drawn from
+the stored points like the software renderer, with the same exponential
+fade, and the buffer is rebuilt from them once the camera is still again.
+"""
+
+import time
+
+import numpy as np
+import pygame
+
+from trail_store import unpack_rgb
+
+# Default decay time constant of the phosphor (seconds to 1/e brightness)
+PERSISTENCE = 2.0
+
+
+class PhosphorRenderer:
+    """Trail renderer accumulating light into a decaying screen buffer.
+    Inputs: decay time constant in seconds.
+    Outputs: draw_trail(viz, surf, now) adds the phosphor image over the
+    axes in surf; close() drops the buffers.
+
+    Use with viz.set_renderer(PhosphorRenderer(...)). Overlapping particles
+    keep the brightest value, or add up with viz.additive_blend. Timings go
+    to viz.frame_stats: "project" covers the new points, "sort" stays 0 and
+    "rasterize" is decay, splat and compositing."""
+
+    name = "phosphor"
+
+    def __init__(self, persistence=PERSISTENCE):
+        if persistence <= 0:
+            raise ValueError("Persistence must be positive")
+        self.persistence = float(persistence)
+        # (h, w, 4) float32 light in BGRA byte order, and the 8-bit copy a
+        # pygame surface shares memory with (channel 3 stays 0, ignored by
+        # the additive blit)
+        self.buffer = None
+        self.pixels = None
+        self.layer = None
+        self.size = None
+        self.store = None  # TrailStore the buffer was built from
+        self._key = None  # Camera key the buffer was built for
+        self._clears = 0
+        self._synced = 0  # Sequence number up to which points are splatted
+        self._last_now = None
+        self._region = None  # (x0, y0, x1, y1) holding non-zero light
+        self.rebuilds = 0  # Buffer rebuilds (camera changes, clears, resizes)
+
+    def _splat(self, viz, now, count):
+        """Project the newest count stored points and add their light.
+        Inputs: the visualizer, render timestamp and number of points.
+        Outputs: number of points splatted (those born up to now)."""
+        px, py, _, alpha, _ = viz.project_trail(
+            now, newest=count, persistence=self.persistence
+        )
+        # Births are ordered: alpha > 1 only for a tail not shown yet
+        born = int(np.count_nonzero(alpha <= 1.0))
+        if born == 0:
+            return 0
+        store = viz.points
+        jitter = store.column("jitter")[-count:][:born]
+        cx = (px[:born] + jitter[:, 0] * 10).astype(np.int32)
+        cy = (py[:born] + jitter[:, 1] * 10).astype(np.int32)
+        xs = (cx[:, None] + viz.SPRITE_DX).ravel()
+        ys = (cy[:, None] + viz.SPRITE_DY).ravel()
+        src = np.repeat(np.arange(born), len(viz.SPRITE_DX))
+        w, h = self.size
+        inside = (xs >= 0) & (xs < w) & (ys >= 0) & (ys < h)
+        if not inside.all():
+            xs, ys, src = xs[inside], ys[inside], src[inside]
+        if len(xs) == 0:
+            return born
+        # Unclamped light: saturation is applied when compositing, so a
+        # bright point stays at 255 for as long as the software fade keeps it
+        gain = alpha[:born] * (1.0 + 1.5 * viz.volume)
+        base = np.stack(unpack_rgb(store.column("rgb")[-count:][:born]), axis=1)
+        light = np.zeros((born, 4), dtype=np.float32)
+        light[:, 2::-1] = base * gain[:, None]
+        flat = self.buffer.reshape(w * h, 4)
+        if viz.additive_blend:
+            np.add.at(flat, ys * w + xs, light[src])
+        else:
+            np.maximum.at(flat, ys * w + xs, light[src])
+        box = (int(xs.min()), int(ys.min()), int(xs.max()) + 1, int(ys.max()) + 1)
+        if self._region is not None:
+            x0, y0, x1, y1 = self._region
+            box = (min(x0, box[0]), min(y0, box[1]), max(x1, box[2]), max(y1, box[3]))
+        self._region = box
+        return born
+
+    def _rebuild(self, viz, now, size):
+        """Restart the buffer from every stored point born up to now."""
+        store = viz.points
+        if size != self.size:
+            self.buffer = np.zeros((size[1], size[0], 4), dtype=np.float32)
+            self.pixels = np.zeros((size[1], size[0], 4), dtype=np.uint8)
+            self.layer = pygame.image.frombuffer(self.pixels, size, "BGRA")
+            self.size = size
+        else:
+            self.buffer.fill(0.0)
+        self._region = None
+        self.store = store
+        self._key = viz.camera_key()
+        self._clears = store.clears
+        self._synced = store.tail
+        if len(store):
+            self._synced += self._splat(viz, now, len(store))
+        self._last_now = now
+        self.rebuilds += 1
+
+    def draw_trail(self, viz, surf, now):
+        """Draw the axes and the phosphor image onto surf.
+        Inputs: the visualizer, target surface and render timestamp.
+        Outputs: updates the buffer (or falls back to the stored points
+        while the camera moves) and records timings."""
+        store = viz.points
+        key = viz.camera_key()
+        if key != self._key:
+            # Camera moving: the buffer is stale, re-project the stored points
+            self._key = key
+            self._last_now = None
+            viz.draw_software_trail(surf, now, persistence=self.persistence)
+            return
+
+        t_project = time.perf_counter()
+        size = surf.get_size()
+        if (
+            self._last_now is None
+            or size != self.size
+            or store is not self.store
+            or store.clears != self._clears
+            or store.head < self._synced
+        ):
+            self._rebuild(viz, now, size)
+            viz.frame_stats["project"] = time.perf_counter() - t_project
+            t_raster = time.perf_counter()
+        else:
+            viz.frame_stats["project"] = 0.0
+            t_raster = time.perf_counter()
+            # Everything already on screen fades by the elapsed time
+            if self._region is not None and now > self._last_now:
+                x0, y0, x1, y1 = self._region
+                factor = np.float32(np.exp(-(now - self._last_now) / self.persistence))
+                self.buffer[y0:y1, x0:x1] *= factor
+            self._last_now = max(self._last_now, now)
+            # Then the points born since the last frame are added
+            first = max(self._synced, store.tail)
+            if first < store.head:
+                t_project = time.perf_counter()
+                self._synced = first + self._splat(viz, now, store.head - first)
+                viz.frame_stats["project"] = time.perf_counter() - t_project
+        viz.frame_stats["sort"] = 0.0
+
+        segments, _ = viz.axis_overlay()
+        for _, color, width, x1, y1, x2, y2 in segments:
+            pygame.draw.line(surf, color, (int(x1), int(y1)), (int(x2), int(y2)), width)
+        if self._region is not None:
+            x0, y0, x1, y1 = self._region
+            np.minimum(
+                self.buffer[y0:y1, x0:x1],
+                255.0,
+                out=self.pixels[y0:y1, x0:x1],
+                casting="unsafe",
+            )
+            area = pygame.Rect(x0, y0, x1 - x0, y1 - y0)
+            surf.blit(self.layer, area, area, special_flags=pygame.BLEND_RGB_ADD)
+        viz.frame_stats["rasterize"] = time.perf_counter() - t_raster
+
+    def close(self):
+        """Drop the accumulation buffer."""
+        self.buffer = None
+        self.pixels = None
+        self.layer = None
+        self.size = None
+        self.store = None
+        self._key = None
+        self._last_now = None
+        self._region = None
@@ -0,0 +1,270 @@
+"""
+Pitch Tracker Module
+
+Streaming spectral analysis of the audio actually produced, so the
+visualizer can follow what the strings ring at (after detuning and decay)
+rather than the frequencies the Teensy meant to play.
+
+PitchTracker takes PCM blocks of any size (pcm_source sources, ks_render
+output), keeps the newest fft_size samples in a preallocated ring and every
+hop samples runs a Hann-windowed rfft over it (75% overlap by default).
+Spectral peaks are refined by parabolic interpolation on the log magnitude;
+the strongest `voices` peaks are reported either as raw partials or as
+fundamentals (a harmonic sieve: the peak whose harmonics carry the most
+energy wins, its harmonics are removed, repeat). poll() hands the latest
+estimate out at a configurable rate for
+TripleFrequency3DVisualizer.set_frequencies_direct, and every feed() call is
+timed against a per-block latency budget.
+
+Usage:
+    python pitch_tracker.py strum.wav
+"""
+
+import argparse
+import time
+import wave
+
+import numpy as np
+
+from pcm_source import decode_pcm
+
+# Per-block compute budget (feed() call) in seconds
+BLOCK_BUDGET = 0.020
+
+# Highest harmonic a peak may be of a fundamental (fundamentals mode)
+HARMONICS = 8
+
+
+class PitchTracker:
+    """Overlapped-FFT tracker of the strongest partials or fundamentals.
+    Inputs: sample rate, FFT length, hop between analyses (samples),
+    number of frequencies to report, search range in Hz, mode
+    ("fundamentals" or "partials"), poll() rate in Hz and silence threshold
+    (frame RMS).
+    Outputs: frequencies (ascending tuple, or None while silent/unknown),
+    poll(now) for rate-limited updates and summary() of block timings."""
+
+    def __init__(
+        self,
+        rate,
+        fft_size=4096,
+        hop=1024,
+        voices=3,
+        min_freq=60.0,
+        max_freq=2000.0,
+        mode="fundamentals",
+        update_rate=20.0,
+        silence=1e-3,
+    ):
+        if mode not in ("fundamentals", "partials"):
+            raise ValueError(f"Unknown mode: {mode}")
+        self.rate = int(rate)
+        self.fft_size = int(fft_size)
+        self.hop = max(1, min(int(hop), self.fft_size))
+        self.voices = int(voices)
+        self.mode = mode
+        self.update_interval = 1.0 / update_rate if update_rate > 0 else 0.0
+        self.silence = float(silence)
+        # Harmonic matching tolerance (relative) in fundamentals mode
+        self.tolerance = 0.02
+        # Strongest spectral peaks considered per analysis
+        self.max_peaks = 32
+        # Peaks must be within this many dB of the strongest one
+        self.floor_db = 40.0
+
+        bin_hz = self.rate / self.fft_size
+        self.lo = max(2, int(min_freq / bin_hz))
+        self.hi = min(self.fft_size // 2 - 1, int(np.ceil(max_freq / bin_hz)) + 1)
+
+        # Preallocated analysis buffers
+        self._ring = np.zeros(self.fft_size)
+        self._pos = 0  # Next ring slot to write
+        self._since = 0  # Samples fed since the last analysis
+        self._frame = np.zeros(self.fft_size)
+        self._window = np.hanning(self.fft_size)
+        self._mag = np.zeros(self.fft_size // 2 + 1)
+        self._log = np.zeros(self.hi - self.lo + 2)
+        self._peak = np.zeros(self.hi - self.lo, dtype=bool)
+
+        self.frequencies = None
+        self.analyses = 0
+        self._fresh = False
+        self._last_poll = None
+
+        # Rolling per-block compute times (seconds)
+        self._times = np.zeros(2048)
+        self.blocks = 0
+        self.over_budget = 0
+
+    def _write(self, samples):
+        n = len(samples)
+        first = min(n, self.fft_size - self._pos)
+        self._ring[self._pos : self._pos + first] = samples[:first]
+        if first < n:
+            self._ring[: n - first] = samples[first:]
+        self._pos = (self._pos + n) % self.fft_size
+
+    def feed(self, block):
+        """Append samples and run every analysis that became due.
+        Inputs: (n, 2) stereo or (n,) mono float array.
+        Outputs: number of FFT analyses run; the time taken is recorded."""
+        t_start = time.perf_counter()
+        block = np.asarray(block)
+        mono = block.mean(axis=1) if block.ndim == 2 else block
+        ran = 0
+        pos = 0
+        n = len(mono)
+        while pos < n:
+            take = min(self.hop - self._since, n - pos)
+            self._write(mono[pos : pos + take])
+            self._since += take
+            pos += take
+            if self._since >= self.hop:
+                self._since = 0
+                self._analyze()
+                ran += 1
+        if n:
+            elapsed = time.perf_counter() - t_start
+            self._times[self.blocks % len(self._times)] = elapsed
+            self.blocks += 1
+            if elapsed > BLOCK_BUDGET:
+                self.over_budget += 1
+        return ran
+
+    def _analyze(self):
+        """One windowed FFT over the ring (oldest sample first)."""
+        split = self.fft_size - self._pos
+        self._frame[:split] = self._ring[self._pos :]
+        self._frame[split:] = self._ring[: self._pos]
+        self.analyses += 1
+        if np.sqrt(np.mean(self._frame * self._frame)) < self.silence:
+            self._publish(None)
+            return
+        np.multiply(self._frame, self._window, out=self._frame)
+        np.abs(np.fft.rfft(self._frame), out=self._mag)
+
+        # Local maxima within the search range, at most floor_db down
+        lo, hi = self.lo, self.hi
+        band = self._mag[lo - 1 : hi + 1]
+        np.log(np.maximum(band, 1e-12), out=self._log)
+        log = self._log
+        mid = log[1:-1]
+        np.greater(mid, log[:-2], out=self._peak)
+        self._peak &= mid >= log[2:]
+        self._peak &= mid >= mid.max() - self.floor_db * np.log(10.0) / 20.0
+        index = np.flatnonzero(self._peak)
+        if len(index) < self.voices:
+            self._publish(None)
+            return
+
+        # Parabolic interpolation on log magnitude (sub-bin accuracy)
+        a, b, c = log[index], log[index + 1], log[index + 2]
+        denom = a - 2.0 * b + c
+        curved = denom < 0.0
+        offset = np.where(curved, 0.5 * (a - c) / np.where(curved, denom, -1.0), 0.0)
+        height = b - 0.25 * (a - c) * offset
+        strongest = np.argsort(height)[::-1][: self.max_peaks]
+        freqs = ((lo + index + offset) * self.rate / self.fft_size)[strongest]
+        if self.mode == "partials":
+            chosen = freqs[: self.voices]
+        else:
+            chosen = self._fundamentals(freqs, np.exp(height[strongest]))
+            if len(chosen) < self.voices:
+                self._publish(None)
+                return
+        self._publish(tuple(float(f) for f in np.sort(chosen)))
+
+    def _fundamentals(self, freqs, amps):
+        """Harmonic sieve: every peak is a candidate fundamental scored by the
+        magnitudes of the peaks on its harmonics (1x..HARMONICS x); the best
+        is taken and the peaks it explains are removed, voices times."""
+        ratio = freqs[None, :] / freqs[:, None]
+        k = np.rint(ratio)
+        explains = (
+            (k >= 1) & (k <= HARMONICS) & (np.abs(ratio - k) <= self.tolerance * k)
+        )
+        weights = amps.copy()
+        alive = np.ones(len(freqs), dtype=bool)
+        chosen = []
+        for _ in range(self.voices):
+            scores = np.where(alive, explains @ weights, 0.0)
+            best = int(np.argmax(scores))
+            if scores[best] <= 0.0:
+                break
+            chosen.append(freqs[best])
+            weights[explains[best]] = 0.0
+            alive &= ~explains[best]
+        return chosen
+
+    def _publish(self, freqs):
+        self.frequencies = freqs
+        self._fresh = freqs is not None
+
+    def poll(self, now):
+        """Rate-limited access for the render loop.
+        Inputs: current time in seconds.
+        Outputs: the frequencies tuple when an estimate newer than the last
+        poll exists and the update interval elapsed, else None."""
+        if not self._fresh:
+            return None
+        if self._last_poll is not None and now - self._last_poll < self.update_interval:
+            return None
+        self._fresh = False
+        self._last_poll = now
+        return self.frequencies
+
+    def summary(self):
+        """Per-block compute time over the recent window.
+        Inputs: none.
+        Outputs: dict with blocks, analyses, p50/p95/max in milliseconds and
+        the number of blocks over BLOCK_BUDGET (empty if nothing was fed)."""
+        if not self.blocks:
+            return {}
+        data = self._times[: min(self.blocks, len(self._times))]
+        return {
+            "blocks": self.blocks,
+            "analyses": self.analyses,
+            "p50_ms": float(np.percentile(data, 50)) * 1e3,
+            "p95_ms": float(np.percentile(data, 95)) * 1e3,
+            "max_ms": float(data.max()) * 1e3,
+            "over_budget": self.over_budget,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Track pitches in a WAV file")
+    parser.add_argument("path", help="PCM WAV file (e.g. from ks_render.py)")
+    parser.add_argument("--voices", type=int, default=3)
+    parser.add_argument("--fft", type=int, default=4096, help="FFT length")
+    parser.add_argument("--hop", type=int, default=1024, help="Samples per analysis")
+    parser.add_argument(
+        "--mode", choices=("fundamentals", "partials"), default="fundamentals"
+    )
+    parser.add_argument("--block", type=int, default=735, help="Samples per feed")
+    args = parser.parse_args()
+
+    with wave.open(args.path, "rb") as f:
+        rate = f.getframerate()
+        data = f.readframes(f.getnframes())
+        samples = decode_pcm(data, f.getsampwidth(), f.getnchannels())
+    tracker = PitchTracker(
+        rate, args.fft, args.hop, args.voices, mode=args.mode, update_rate=0
+    )
+    last = None
+    for start in range(0, len(samples), args.block):
+        tracker.feed(samples[start : start + args.block])
+        freqs = tracker.poll(start / rate)
+        if freqs is not None and freqs != last:
+            print(f"{start / rate:7.3f} s  " + "  ".join(f"{f:8.2f}" for f in freqs))
+            last = freqs
+    stats = tracker.summary()
+    if stats:
+        print(
+            f"{stats['blocks']} blocks, {stats['analyses']} FFTs: block p50"
+            f" {stats['p50_ms']:.2f} ms, p95 {stats['p95_ms']:.2f} ms,"
+            f" max {stats['max_ms']:.2f} ms, {stats['over_budget']} over budget"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+Serial Async Module
+
+asyncio transport for the Teensy serial link. The port is opened
+non-blocking and its file descriptor is registered with a selector event
+loop (epoll on Linux), so bytes are read and decoded as soon as the fd
+becomes readable instead of by a thread that polls or sleeps. Writes go
+through an asyncio.Queue drained by a writer task, which waits for the fd
+to become writable when the port's output buffer is full.
+
+The loop needs no thread of its own: FrameTicker.tick() replaces
+pygame.time.Clock.tick() and runs the loop for the rest of each frame, so
+serial I/O is served while the frame waits for its deadline and nothing
+busy-waits. Needs serial objects with fileno() (pyserial on POSIX, ptys);
+with anything else the reader reports the error and stays disconnected.
+"""
+
+import asyncio
+import os
+import time
+
+import serial
+
+from event_ring import EventRing, ReaderState
+from hotplug import READY_TIMEOUT, PortWatcher
+from teensy_protocol import StreamDecoder
+
+# Most bytes taken per readable wake-up
+READ_SIZE = 65536
+
+# Outbound messages queued before write() starts dropping them
+WRITE_QUEUE = 256
+
+
+class FrameTicker:
+    """pygame.time.Clock replacement that runs an asyncio loop between frames.
+    Inputs: optional selector event loop (a new one by default).
+    Outputs: tick(fps) serves I/O callbacks and tasks until the next frame
+    is due and returns the milliseconds since the previous tick, like
+    Clock.tick; close() cancels what is left and closes the loop."""
+
+    def __init__(self, loop=None):
+        self.loop = loop or asyncio.SelectorEventLoop()
+        self._last = None
+
+    def run(self, seconds):
+        """Run the loop for a while (0: only what is ready right now)."""
+        self.loop.run_until_complete(asyncio.sleep(seconds))
+
+    def tick(self, fps=0):
+        """Wait out the rest of the frame while the loop handles I/O.
+        Inputs: target frame rate (0: do not wait).
+        Outputs: milliseconds elapsed since the previous call."""
+        now = time.perf_counter()
+        delay = 0.0
+        if fps > 0 and self._last is not None:
+            delay = 1.0 / fps - (now - self._last)
+        self.run(max(0.0, delay))
+        now = time.perf_counter()
+        elapsed = 0.0 if self._last is None else now - self._last
+        self._last = now
+        return int(elapsed * 1000)
+
+    def close(self):
+        """Cancel pending tasks and close the loop."""
+        if self.loop.is_closed():
+            return
+        tasks = asyncio.all_tasks(self.loop)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self.loop.close()
+
+
+class AsyncSerialReader(ReaderState):
+    """Serial reader woken by fd readability on an asyncio loop.
+    Inputs: port name, baud rate, event loop (e.g. FrameTicker.loop),
+    optional serial factory (pyserial-like, with fileno()), decoder with
+    feed()/reset() (StreamDecoder by default), SessionRecorder, longest
+    wait for the board's first byte after opening (see hotplug.open_ready),
+    reconnect delay (cut short when a tty device appears, if watch), and
+    whether to drop stale input on opening.
+    Outputs: the TeensyReader consumer interface (start, stop,
+    drain_events, get_frequencies, get_state, is_connected); outbound bytes
+    go through send(data) (awaitable) or write(data) (never blocks)."""
+
+    def __init__(
+        self,
+        port,
+        baudrate,
+        loop,
+        serial_factory=None,
+        decoder=None,
+        recorder=None,
+        settle=READY_TIMEOUT,
+        reconnect_delay=2.0,
+        reset_input=False,
+        watch=True,
+    ):
+        super().__init__()
+        self.port = port
+        self.baudrate = baudrate
+        self.loop = loop
+        self.serial_factory = serial_factory or serial.Serial
+        self.decoder = decoder or StreamDecoder()
+        self.recorder = recorder
+        self.settle = settle
+        self.reconnect_delay = reconnect_delay
+        self.reset_input = reset_input
+        self.watch = watch
+        self.watcher = None  # hotplug.PortWatcher while started
+        self.events = EventRing()  # Every decoded event, timestamped on arrival
+        self.serial = None
+        self.connected = False
+        self.running = False
+        self.last_error = None
+        self.dropped_writes = 0
+        self._fd = None
+        self._lost = None  # Future completed when the port goes away
+        self._queue = None
+        self._tasks = []
+
+    def start(self):
+        """Schedule the connect/read and write tasks on the loop."""
+        if self.running:
+            return
+        self.running = True
+        self._queue = asyncio.Queue(WRITE_QUEUE)
+        if self.watch:
+            self.watcher = PortWatcher()
+        self._tasks = [
+            self.loop.create_task(self._run()),
+            self.loop.create_task(self._write_loop()),
+        ]
+
+    def stop(self):
+        """Cancel the tasks and close the port (the loop must not be running)."""
+        self.running = False
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        if tasks and not self.loop.is_closed():
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self._close_port()
+        if self.watcher is not None:
+            self.watcher.close()
+            self.watcher = None
+
+    def _close_port(self):
+        if self._fd is not None and not self.loop.is_closed():
+            self.loop.remove_reader(self._fd)
+            self.loop.remove_writer(self._fd)
+        self._fd = None
+        if self.serial is not None:
+            try:
+                self.serial.close()
+            except Exception:
+                pass
+            self.serial = None
+        self.connected = False
+
+    async def _open(self):
+        """Open the port and register it for readability; False on failure."""
+        try:
+            self.serial = self.serial_factory(self.port, self.baudrate, timeout=0)
+        except (serial.SerialException, OSError) as e:
+            self.last_error = str(e)
+            return False
+        fileno = getattr(self.serial, "fileno", None)
+        if fileno is None:
+            self._close_port()
+            raise RuntimeError("AsyncSerialReader needs a serial port with fileno()")
+        self._fd = fileno()
+        os.set_blocking(self._fd, False)
+        if self.reset_input:
+            self.serial.reset_input_buffer()
+        # Ready once the board talks (or after settle if it stays quiet)
+        await self._wait_fd(self.loop.add_reader, self.loop.remove_reader, self.settle)
+        self.decoder.reset()
+        self._lost = self.loop.create_future()
+        self.loop.add_reader(self._fd, self._on_readable)
+        self.connected = True
+        self.last_error = None
+        print(f"[Teensy] Connected on {self.port}")
+        return True
+
+    async def _run(self):
+        """Connect, serve the port until it is lost, reconnect after a delay."""
+        try:
+            while self.running:
+                try:
+                    opened = await self._open()
+                except RuntimeError as e:
+                    self.last_error = str(e)
+                    print(f"[Teensy] {e}")
+                    return
+                if opened:
+                    reason = await self._lost
+                    self.last_error = str(reason)
+                    print(f"[Teensy] Serial error: {reason}")
+                    self._close_port()
+                await self._retry_wait()
+        finally:
+            self._close_port()
+
+    def _connection_lost(self, reason):
+        if self._lost is not None and not self._lost.done():
+            self._lost.set_result(reason)
+
+    def _on_readable(self):
+        """Reader callback: take what arrived and publish its events."""
+        try:
+            data = os.read(self._fd, READ_SIZE)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._connection_lost(e)
+            return
+        if not data:
+            self._connection_lost("device closed")
+            return
+        t = time.perf_counter()
+        if self.recorder is not None:
+            self.recorder.write(data, t)
+        self.publish(self.decoder.feed(data), t)
+
+    def _on_event(self, kind, value):
+        if kind == "key":
+            print(f"[Teensy] Key changed to: {value}")
+        elif kind == "chord":
+            print(f"[Teensy] Chord type: {value}")
+
+    async def _retry_wait(self):
+        """Sleep reconnect_delay, or less if a tty device appears meanwhile."""
+        fd = self.watcher.fileno() if self.watcher is not None else None
+        if fd is None:
+            await asyncio.sleep(self.reconnect_delay)
+            return
+        appeared = self.loop.create_future()
+
+        def check():
+            if self.watcher.poll()[0] and not appeared.done():
+                appeared.set_result(None)
+
+        self.loop.add_reader(fd, check)
+        try:
+            await asyncio.wait_for(appeared, self.reconnect_delay)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self.loop.remove_reader(fd)
+
+    async def _wait_fd(self, add, remove, timeout=None):
+        """Wait until the port's fd is ready (add_reader/add_writer pair).
+        Inputs: loop registration functions and optional timeout in seconds.
+        Outputs: True if ready, False on timeout."""
+        fd = self._fd
+        ready = self.loop.create_future()
+
+        def wake():
+            if not ready.done():
+                ready.set_result(None)
+
+        add(fd, wake)
+        try:
+            await asyncio.wait_for(ready, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            if not self.loop.is_closed():
+                remove(fd)
+
+    async def _write_loop(self):
+        """Writer task: send queued messages in order (dropped while offline)."""
+        while True:
+            data = memoryview(await self._queue.get())
+            while data and self.connected:
+                try:
+                    data = data[os.write(self._fd, data) :]
+                except BlockingIOError:
+                    await self._wait_fd(self.loop.add_writer, self.loop.remove_writer)
+                except OSError as e:
+                    self._connection_lost(e)
+                    break
+            if data:
+                self.dropped_writes += 1
+
+    async def send(self, data):
+        """Queue bytes for the device, waiting while the queue is full."""
+        await self._queue.put(bytes(data))
+
+    def write(self, data):
+        """Queue bytes for the device without blocking (dropped when full)."""
+        if self._queue is None:
+            return
+        try:
+            self._queue.put_nowait(bytes(data))
+        except asyncio.QueueFull:
+            self.dropped_writes += 1
+
+    def wait_connected(self, timeout):
+        """Run the loop until the port is open or timeout expires.
+        Inputs: timeout in seconds.
+        Outputs: True if connected."""
+        deadline = time.monotonic() + timeout
+        while not self.connected and time.monotonic() < deadline:
+            self.loop.run_until_complete(asyncio.sleep(0.02))
+        return self.connected
+
+    def is_connected(self):
+        """Check if connected to Teensy."""
+        return self.connected
@@ -0,0 +1,259 @@
+"""
+Serial Session Module
+
+Records the raw Teensy byte stream with arrival timestamps and replays it
+through the same interface as visualizer.TeensyReader (get_frequencies,
+get_state, is_connected, drain_events), so a stage session can be played
+back at real time, at a scaled speed or as fast as possible.
+
+File layout (little-endian):
+    header: magic "TSES" | version (u8) | wall-clock start time (f64)
+    record: offset from start in seconds (f64) | length (u32) | raw bytes
+
+Usage:
+    python serial_session.py record session.tses [--port /dev/ttyACM0]
+    python serial_session.py info session.tses
+"""
+
+import argparse
+import struct
+import time
+
+from event_ring import EventRing, ReaderState
+from teensy_protocol import StreamDecoder
+
+SESSION_MAGIC = b"TSES"
+SESSION_VERSION = 1
+_HEADER = struct.Struct("<4sBd")
+_RECORD = struct.Struct("<dI")
+
+
+class SessionRecorder:
+    """Append raw serial chunks with arrival timestamps to a session file.
+    Inputs: output path.
+    Outputs: write(data) from the reader thread; close() flushes the file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.start_wall = time.time()
+        self._t0 = time.perf_counter()
+        self._file = open(path, "wb")
+        self._file.write(_HEADER.pack(SESSION_MAGIC, SESSION_VERSION, self.start_wall))
+        self.chunks = 0
+        self.bytes = 0
+
+    def write(self, data, t=None):
+        """Record one chunk as read from the port.
+        Inputs: raw bytes and optional perf_counter arrival time (defaults to now).
+        Outputs: appends one record; no return value."""
+        if not data or self._file is None:
+            return
+        if t is None:
+            t = time.perf_counter()
+        self._file.write(_RECORD.pack(t - self._t0, len(data)))
+        self._file.write(data)
+        self.chunks += 1
+        self.bytes += len(data)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_session(path):
+    """Read a recorded session.
+    Inputs: session file path.
+    Outputs: (start_wall_time, [(offset_s, bytes), ...]) in recording order."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    if len(raw) < _HEADER.size:
+        raise ValueError(f"{path}: not a serial session file")
+    magic, version, start_wall = _HEADER.unpack_from(raw, 0)
+    if magic != SESSION_MAGIC or version != SESSION_VERSION:
+        raise ValueError(f"{path}: unsupported session format")
+    chunks = []
+    pos = _HEADER.size
+    while pos + _RECORD.size <= len(raw):
+        offset, length = _RECORD.unpack_from(raw, pos)
+        pos += _RECORD.size
+        chunks.append((offset, raw[pos : pos + length]))
+        pos += length
+    return start_wall, chunks
+
+
+class ReplaySource(ReaderState):
+    """Replay a recorded session through the TeensyReader interface.
+    Inputs: session path (or a (start_wall, chunks) tuple from load_session),
+    speed (1.0 real time, 2.0 twice as fast, None as fast as possible),
+    frame_dt (session seconds per drain_events() call when speed is None)
+    and loop flag.
+    Outputs: decoded events via drain_events / get_frequencies / get_state,
+    and clock(), a session-derived time.time() replacement for visualizers.
+
+    With speed=None nothing depends on the machine: each drain_events() call
+    (once per rendered frame) advances the session by exactly frame_dt, so
+    the events seen by every frame and the clock() values are repeatable."""
+
+    def __init__(self, session, speed=1.0, frame_dt=1.0 / 60.0, loop=False):
+        super().__init__()
+        if isinstance(session, str):
+            session = load_session(session)
+        self.start_wall, self.chunks = session
+        self.speed = speed
+        self.frame_dt = frame_dt
+        self.loop = loop
+        # Gap inserted before the session starts over when looping
+        self.duration = (self.chunks[-1][0] if self.chunks else 0.0) + frame_dt
+        self.decoder = StreamDecoder()
+        self.events = EventRing()
+        self.connected = False
+        self.position = 0.0  # Session seconds played so far
+        self._base = 0.0  # Session time at which the current lap started
+        self._next = 0
+        self._t0 = None
+
+    def start(self):
+        """Start playback from the beginning of the session."""
+        self.decoder.reset()
+        self.position = self._base = 0.0
+        self._next = 0
+        self._t0 = time.monotonic()
+        self.connected = True
+
+    def stop(self):
+        """Stop playback."""
+        self.connected = False
+
+    @property
+    def finished(self):
+        return not self.loop and self._next >= len(self.chunks)
+
+    def clock(self):
+        """Session time as a wall-clock timestamp (assign to viz.clock).
+        Inputs: none.
+        Outputs: recording start time plus the current playback position."""
+        return self.start_wall + self._position()
+
+    def _position(self):
+        if self.speed is None or self._t0 is None:
+            return self.position
+        return (time.monotonic() - self._t0) * self.speed
+
+    def advance(self, dt=None):
+        """Move an as-fast-as-possible replay forward.
+        Inputs: session seconds to advance (defaults to frame_dt).
+        Outputs: updates position; no effect in real-time/scaled mode."""
+        if self.speed is None:
+            self.position += self.frame_dt if dt is None else dt
+
+    def _pump(self):
+        """Decode every chunk whose recorded offset has been reached.
+
+        Events are stamped with their recorded time, as the perf_counter()
+        reading that lies as far before now as the chunk lies before the
+        playback position, so chunks due in the same frame keep their
+        recorded spacing whatever the frame rate."""
+        if not self.connected:
+            return
+        self.position = self._position()
+        now = time.perf_counter()
+        while self._next < len(self.chunks):
+            offset, data = self.chunks[self._next]
+            if self._base + offset > self.position:
+                return
+            arrival = now - (self.position - (self._base + offset))
+            self.publish(self.decoder.feed(data), arrival)
+            self._next += 1
+            if self._next == len(self.chunks) and self.loop:
+                self._next = 0
+                self._base += self.duration
+        if self.finished:
+            self.connected = False
+
+    def drain_events(self):
+        """Take every event due since the last call (call once per frame).
+        Returns a list of event_ring.Event(t, kind, value) in recorded order."""
+        self.advance()
+        self._pump()
+        return super().drain_events()
+
+    def get_frequencies(self):
+        """Get the latest frequencies. Returns (f1, f2, f3, has_new_data)."""
+        self._pump()
+        return super().get_frequencies()
+
+    def get_state(self):
+        """Get the current state. Returns (chord_type, key, has_changed)."""
+        self._pump()
+        return super().get_state()
+
+    def is_connected(self):
+        """True while the session is playing."""
+        return self.connected
+
+
+def record(path, port, baudrate, seconds=None):
+    """Capture a live session straight from the serial port.
+    Inputs: output path, serial port, baud rate, optional duration (Ctrl-C stops).
+    Outputs: writes the session file and prints a summary."""
+    import serial
+
+    link = serial.Serial(port, baudrate, timeout=0.1)
+    deadline = None if seconds is None else time.monotonic() + seconds
+    with SessionRecorder(path) as recorder:
+        print(f"Recording {port} to {path} (Ctrl-C to stop)")
+        try:
+            while deadline is None or time.monotonic() < deadline:
+                recorder.write(link.read(link.in_waiting or 1))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            link.close()
+    print(f"{recorder.chunks} chunks, {recorder.bytes} bytes")
+
+
+def info(path):
+    """Print duration and event counts of a session file."""
+    start_wall, chunks = load_session(path)
+    decoder = StreamDecoder()
+    counts = {}
+    for _, data in chunks:
+        for kind, _ in decoder.feed(data):
+            counts[kind] = counts.get(kind, 0) + 1
+    duration = chunks[-1][0] if chunks else 0.0
+    print(f"{path}: recorded {time.ctime(start_wall)}")
+    print(
+        f"  {duration:.1f} s, {len(chunks)} chunks, {sum(len(d) for _, d in chunks)} bytes"
+    )
+    print("  events: " + ", ".join(f"{k}={n}" for k, n in sorted(counts.items())))
+    if decoder.bad_frames:
+        print(f"  bad frames: {decoder.bad_frames}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record or inspect Teensy sessions")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record", help="Capture the raw serial stream")
+    rec.add_argument("path")
+    rec.add_argument("--port", default="/dev/ttyACM0")
+    rec.add_argument("--baudrate", type=int, default=1000000)
+    rec.add_argument("--seconds", type=float, default=None)
+    show = sub.add_parser("info", help="Summarize a session file")
+    show.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args.path, args.port, args.baudrate, args.seconds)
+    else:
+        info(args.path)
+
+
+if __name__ == "__main__":
+    main()
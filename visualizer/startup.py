@@ -0,0 +1,85 @@
+"""
+Startup Module
+
+Time-to-first-frame profiler for the front ends. Import it before anything
+heavy: the time from process start to that import is reported as
+"interpreter" (read from /proc on Linux, left out elsewhere) and the time
+up to the first mark() covers the imports that follow it. Each
+mark(phase) closes a phase, and first_frame() closes the last one and,
+when enabled, prints the breakdown once:
+
+    [Startup] 412 ms to first frame: interpreter 38, imports 120, ...
+"""
+
+import os
+import time
+
+_IMPORTED = time.perf_counter()
+
+
+def _process_age():
+    """Seconds since this process started, or None where unknown."""
+    try:
+        with open("/proc/self/stat") as f:
+            stat = f.read()
+        # Field 22, start time in clock ticks since boot (the command name
+        # before it is in parentheses and may contain spaces)
+        ticks = int(stat.rsplit(")", 1)[1].split()[19])
+        return time.clock_gettime(time.CLOCK_BOOTTIME) - ticks / os.sysconf(
+            "SC_CLK_TCK"
+        )
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+_INTERPRETER = _process_age()
+
+
+class StartupProfiler:
+    """Phase timer from process start to the first frame.
+    Inputs: whether first_frame() prints the report.
+    Outputs: mark(phase) and first_frame() to close phases, summary() of
+    phase durations and report() as one line of text."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.phases = []  # (name, seconds) in order
+        if _INTERPRETER is not None:
+            self.phases.append(("interpreter", max(0.0, _INTERPRETER)))
+        self._last = _IMPORTED
+        self.done = False
+
+    def mark(self, phase):
+        """Close the current phase under the given name (ignored once the
+        first frame is done)."""
+        if self.done:
+            return
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def first_frame(self):
+        """Close the last phase once the first frame is on screen (only the
+        first call counts) and print the report if enabled."""
+        if self.done:
+            return
+        self.mark("first frame")
+        self.done = True
+        if self.enabled:
+            print(self.report())
+
+    def summary(self):
+        """Phase durations.
+        Inputs: none.
+        Outputs: dict with total_ms and phases: list of (name, ms)."""
+        return {
+            "total_ms": sum(s for _, s in self.phases) * 1e3,
+            "phases": [(name, s * 1e3) for name, s in self.phases],
+        }
+
+    def report(self):
+        """One-line breakdown in milliseconds."""
+        stats = self.summary()
+        parts = ", ".join(f"{name} {ms:.0f}" for name, ms in stats["phases"])
+        done = "to first frame" if self.done else "so far"
+        return f"[Startup] {stats['total_ms']:.0f} ms {done}: {parts}"
@@ -0,0 +1,181 @@
+"""
+Teensy Serial Protocol Module
+
+Decodes the Teensy output stream into events. Two formats can be mixed on
+the same link:
+
+- Text lines (default firmware output):
+    "f1;f2;...;fN"      frequencies in Hz, one per voice (N >= 3),
+                        e.g. 261.63;329.63;392.00
+    "FREQ:f1:f2:...:fN" the same, as printed by the pc/ (main_v3) firmware
+    "Key changed: N"    new root key (0-11)
+    "Major" / "Minor"   chord type
+- Compact binary frames:
+    0xA5 | type | length | payload (length bytes) | checksum
+  checksum = (type + length + sum(payload)) & 0xFF. Frequencies are
+  little-endian float32 values (at least three), key and chord type are
+  one byte each.
+
+Events are (kind, value) tuples: ("freq", (f1, ..., fN)), ("key", n) and
+("chord", "Major" | "Minor").
+"""
+
+import struct
+
+FRAME_HEADER = 0xA5
+FRAME_FREQ = 0x01
+FRAME_KEY = 0x02
+FRAME_CHORD = 0x03
+
+# Fewest voices a frequency frame (text or binary) needs; the front ends
+# show the first three
+MIN_VOICES = 3
+
+# Upper bound for a partial line kept while waiting for its newline
+MAX_PENDING_BYTES = 4096
+
+
+def parse_text_line(line):
+    """Parse one decoded text line from the Teensy.
+    Inputs: line without trailing newline.
+    Outputs: (kind, value) event tuple, or None for unknown/invalid lines."""
+    if line == "Minor" or line == "Major":
+        return ("chord", line)
+
+    if line.startswith("Key changed:"):
+        try:
+            return ("key", int(line.split(":")[1].strip()))
+        except (IndexError, ValueError):
+            return None
+
+    if line.startswith("FREQ:"):
+        parts = line[5:].split(":")
+    else:
+        parts = line.split(";")
+    if len(parts) >= MIN_VOICES:
+        try:
+            return ("freq", tuple(float(part) for part in parts))
+        except ValueError:
+            return None
+    return None
+
+
+def _checksum(frame_type, payload):
+    return (frame_type + len(payload) + sum(payload)) & 0xFF
+
+
+def encode_frame(event):
+    """Encode an event as a binary frame.
+    Inputs: (kind, value) event tuple.
+    Outputs: bytes ready to be written to the serial link."""
+    kind, value = event
+    if kind == "freq":
+        frame_type = FRAME_FREQ
+        payload = struct.pack("<%df" % len(value), *value)
+    elif kind == "key":
+        frame_type, payload = FRAME_KEY, bytes([int(value) & 0xFF])
+    elif kind == "chord":
+        frame_type, payload = FRAME_CHORD, bytes([1 if value == "Major" else 0])
+    else:
+        raise ValueError(f"Unknown event kind: {kind}")
+    return (
+        bytes([FRAME_HEADER, frame_type, len(payload)])
+        + payload
+        + bytes([_checksum(frame_type, payload)])
+    )
+
+
+def encode_text(event):
+    """Encode an event the way the stock firmware prints it.
+    Inputs: (kind, value) event tuple.
+    Outputs: newline-terminated ASCII bytes."""
+    kind, value = event
+    if kind == "freq":
+        return (";".join(f"{f:.2f}" for f in value) + "\n").encode("ascii")
+    if kind == "key":
+        return f"Key changed: {int(value)}\n".encode("ascii")
+    if kind == "chord":
+        return f"{value}\n".encode("ascii")
+    raise ValueError(f"Unknown event kind: {kind}")
+
+
+def _decode_frame(frame_type, payload):
+    if (
+        frame_type == FRAME_FREQ
+        and len(payload) % 4 == 0
+        and len(payload) >= 4 * MIN_VOICES
+    ):
+        return ("freq", struct.unpack("<%df" % (len(payload) // 4), payload))
+    if frame_type == FRAME_KEY and len(payload) == 1:
+        return ("key", payload[0])
+    if frame_type == FRAME_CHORD and len(payload) == 1:
+        return ("chord", "Major" if payload[0] else "Minor")
+    return None
+
+
+class StreamDecoder:
+    """Incremental decoder for the mixed text/binary Teensy byte stream.
+    Inputs: raw byte chunks of any size via feed().
+    Outputs: list of decoded events per chunk; partial data is kept in a
+    reusable bytearray until the rest arrives."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.bad_frames = 0  # Checksum failures / malformed frames (resynced)
+
+    def feed(self, data):
+        """Append raw bytes and decode every complete line or frame.
+        Inputs: bytes-like chunk read from the serial port.
+        Outputs: list of (kind, value) events in arrival order."""
+        buf = self.buffer
+        buf += data
+        events = []
+        pos = 0
+        n = len(buf)
+        while pos < n:
+            if buf[pos] == FRAME_HEADER:
+                if n - pos < 3:
+                    break
+                length = buf[pos + 2]
+                end = pos + 4 + length
+                if end > n:
+                    break
+                frame_type = buf[pos + 1]
+                payload = bytes(buf[pos + 3 : end - 1])
+                event = None
+                if buf[end - 1] == _checksum(frame_type, payload):
+                    event = _decode_frame(frame_type, payload)
+                if event is None:
+                    # Not a valid frame: skip the header byte and resync
+                    self.bad_frames += 1
+                    pos += 1
+                    continue
+                events.append(event)
+                pos = end
+                continue
+
+            newline = buf.find(b"\n", pos)
+            header = buf.find(FRAME_HEADER, pos, newline if newline >= 0 else n)
+            if header >= 0:
+                # Text is pure ASCII, so a header byte ends any garbled line
+                pos = header
+                continue
+            if newline < 0:
+                break
+            line = buf[pos:newline].decode("ascii", errors="ignore").strip()
+            pos = newline + 1
+            if line:
+                event = parse_text_line(line)
+                if event is not None:
+                    events.append(event)
+
+        del buf[:pos]
+        if len(buf) > MAX_PENDING_BYTES:
+            buf.clear()
+        return events
+
+    def reset(self):
+        """Drop any partially received line or frame.
+        Inputs: none.
+        Outputs: clears the internal buffer; no return value."""
+        self.buffer.clear()
@@ -0,0 +1,168 @@
+"""
+Teensy Stub Module
+
+Software stand-in for the Teensy board so the serial path can be exercised
+without hardware. TeensyStub exposes the subset of the pyserial Serial API
+used by the readers and replays a scripted session in real time, in the
+text or binary protocol. The chord helpers mirror ks_poly_accord.ino.
+"""
+
+import threading
+import time
+
+from teensy_protocol import encode_frame, encode_text
+
+# Same scales and voicing as dsp/ks_poly_accord/ks_poly_accord.ino
+MAJOR_SCALE = (0, 2, 4, 5, 7, 9, 11)
+MINOR_SCALE = (0, 2, 3, 5, 7, 8, 10)
+VOICES_PER_CHORD = 3
+
+
+def chord_notes(degree, root=0, major=True, voices=VOICES_PER_CHORD):
+    """MIDI notes the firmware plays for a chord button.
+    Inputs: scale degree (button index 0-6), root key (0-11), major flag,
+    number of voices.
+    Outputs: list of MIDI note numbers, one per voice (stacked thirds)."""
+    scale = MAJOR_SCALE if major else MINOR_SCALE
+    notes = []
+    for v in range(voices):
+        step = degree + 2 * v
+        notes.append(60 + root + scale[step % 7] + (step // 7) * 12)
+    return notes
+
+
+def chord_frequencies(degree, root=0, major=True, voices=VOICES_PER_CHORD):
+    """Frequencies the firmware prints for a chord button.
+    Inputs: same as chord_notes.
+    Outputs: list of frequencies in Hz."""
+    return [
+        440.0 * 2.0 ** ((n - 69) / 12.0)
+        for n in chord_notes(degree, root, major, voices)
+    ]
+
+
+def strum_script(
+    degrees, root=0, major=True, interval=0.5, start=0.0, voices=VOICES_PER_CHORD
+):
+    """Build a stub script that plays a chord progression.
+    Inputs: iterable of scale degrees, root key, major flag, seconds between
+    chords, time of the first chord and voices per chord.
+    Outputs: list of (time_offset, event) pairs for TeensyStub."""
+    script = []
+    t = start
+    for degree in degrees:
+        freqs = chord_frequencies(degree, root, major, voices)
+        script.append((t, ("freq", tuple(round(f, 2) for f in freqs))))
+        t += interval
+    return script
+
+
+class TeensyStub:
+    """Fake serial port replaying a scripted Teensy session.
+    Inputs: script of (time_offset_s, event) pairs, binary flag to send
+    binary frames instead of text, loop flag, read timeout in seconds.
+    Outputs: event bytes through in_waiting / read / readline once their
+    time offset (relative to open) has elapsed; writes are recorded."""
+
+    def __init__(
+        self, script, binary=False, loop=False, timeout=0.1, port="stub", clock=None
+    ):
+        self.script = sorted(script, key=lambda item: item[0])
+        self.binary = binary
+        self.loop = loop
+        self.timeout = timeout
+        self.port = port
+        self.clock = clock or time.monotonic
+        self.written = []  # Bytes the host sent (e.g. KEY:60:100)
+        self.is_open = True
+        self._pending = bytearray()
+        self._next = 0
+        self._t0 = self.clock()
+        self._cond = threading.Condition()
+        self._period = (self.script[-1][0] if self.script else 0.0) + 0.5
+
+    def __call__(self, port=None, baudrate=None, timeout=None, **kwargs):
+        """Act as a serial factory: reopen and return this stub.
+        Inputs: pyserial-style constructor arguments (only timeout is used).
+        Outputs: self, restarted from the beginning of the script."""
+        if timeout is not None:
+            self.timeout = timeout
+        self._pending.clear()
+        self._next = 0
+        self._t0 = self.clock()
+        self.is_open = True
+        return self
+
+    def _pump(self):
+        """Move every event whose time has come into the pending buffer."""
+        elapsed = self.clock() - self._t0
+        encode = encode_frame if self.binary else encode_text
+        while self.script:
+            if self._next >= len(self.script):
+                if not self.loop:
+                    return
+                self._next = 0
+                self._t0 += self._period
+                elapsed -= self._period
+            t, event = self.script[self._next]
+            if t > elapsed:
+                return
+            self._pending += encode(event)
+            self._next += 1
+
+    def _next_due(self):
+        """Seconds until the next scripted event (None when exhausted)."""
+        if self._next >= len(self.script):
+            if not (self.loop and self.script):
+                return None
+            t = self.script[0][0] + self._period
+        else:
+            t = self.script[self._next][0]
+        return max(0.0, t - (self.clock() - self._t0))
+
+    @property
+    def in_waiting(self):
+        self._pump()
+        return len(self._pending)
+
+    def read(self, size=1):
+        """Read up to size bytes, waiting at most timeout for the first one."""
+        deadline = time.monotonic() + (self.timeout or 0.0)
+        while True:
+            self._pump()
+            if self._pending or not self.is_open:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            due = self._next_due()
+            wait = remaining if due is None else min(remaining, due)
+            with self._cond:
+                self._cond.wait(wait)
+        data = bytes(self._pending[:size])
+        del self._pending[:size]
+        return data
+
+    def readline(self):
+        """Read one newline-terminated chunk (or whatever arrives before timeout)."""
+        out = bytearray()
+        deadline = time.monotonic() + (self.timeout or 0.0)
+        while time.monotonic() <= deadline:
+            chunk = self.read(1)
+            out += chunk
+            if chunk == b"\n":
+                break
+        return bytes(out)
+
+    def write(self, data):
+        self.written.append(bytes(data))
+        return len(data)
+
+    def reset_input_buffer(self):
+        self._pump()
+        self._pending.clear()
+
+    def close(self):
+        self.is_open = False
+        with self._cond:
+            self._cond.notify_all()
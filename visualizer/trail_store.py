@@ -0,0 +1,167 @@
+"""
+Trail Store Module
+
+Fixed-capacity ring buffer holding 3D trail points as preallocated NumPy
+columns (structure of arrays) instead of one Python object per point.
+"""
+
+import numpy as np
+
+
+def pack_rgb(r, g, b):
+    """Pack 8-bit RGB channels into a single integer (0xRRGGBB).
+    Inputs: r, g, b as ints or integer NumPy arrays in [0, 255].
+    Outputs: packed value(s) with the same shape as the inputs."""
+    return (r << 16) | (g << 8) | b
+
+
+def unpack_rgb(packed):
+    """Split packed 0xRRGGBB values back into channels.
+    Inputs: packed int or uint32 NumPy array.
+    Outputs: (r, g, b) tuple of ints or integer arrays."""
+    return (packed >> 16) & 0xFF, (packed >> 8) & 0xFF, packed & 0xFF
+
+
+class TrailStore:
+    """Ring buffer of trail points stored column-wise.
+    Inputs: capacity (maximum number of live points).
+    Outputs: bulk append / expiry and contiguous column views for rendering.
+
+    head and tail are absolute sequence numbers (slot = index % capacity), so
+    len() is head - tail and expiring old points is a single tail move."""
+
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self.x = np.zeros(self.capacity, dtype=np.float64)
+        self.y = np.zeros(self.capacity, dtype=np.float64)
+        self.z = np.zeros(self.capacity, dtype=np.float64)
+        self.rgb = np.zeros(self.capacity, dtype=np.uint32)
+        self.birth = np.zeros(self.capacity, dtype=np.float64)
+        self.jitter = np.zeros((self.capacity, 3), dtype=np.float64)
+        self.head = 0  # Sequence number of the next slot to write
+        self.tail = 0  # Sequence number of the oldest live point
+        self.clears = 0  # Bumped by clear() so mirrors of the slots can resync
+
+    def __len__(self):
+        return self.head - self.tail
+
+    def segments(self):
+        """Slot ranges covering the live points, oldest first.
+        Inputs: none.
+        Outputs: list of one or two (start, stop) slot ranges."""
+        n = self.head - self.tail
+        if n == 0:
+            return []
+        start = self.tail % self.capacity
+        stop = start + n
+        if stop <= self.capacity:
+            return [(start, stop)]
+        return [(start, self.capacity), (0, stop - self.capacity)]
+
+    def append(self, x, y, z, rgb, birth, jitter=(0.0, 0.0, 0.0)):
+        """Append a single point.
+        Inputs: world x/y/z, packed RGB int, birth timestamp, jitter triple.
+        Outputs: writes one slot, evicting the oldest point when full."""
+        slot = self.head % self.capacity
+        self.x[slot] = x
+        self.y[slot] = y
+        self.z[slot] = z
+        self.rgb[slot] = rgb
+        self.birth[slot] = birth
+        self.jitter[slot] = jitter
+        self.head += 1
+        if self.head - self.tail > self.capacity:
+            self.tail = self.head - self.capacity
+
+    def append_many(self, x, y, z, rgb, birth, jitter=None):
+        """Append a batch of points with at most two slice writes per column.
+        Inputs: equal-length arrays x/y/z, packed rgb, birth and optional
+        (n, 3) jitter array (zeros when omitted).
+        Outputs: writes the batch in order, evicting the oldest points when full."""
+        n = len(x)
+        if n == 0:
+            return
+        if n > self.capacity:
+            # Only the newest `capacity` points can survive anyway
+            skip = n - self.capacity
+            x, y, z = x[skip:], y[skip:], z[skip:]
+            rgb, birth = rgb[skip:], birth[skip:]
+            if jitter is not None:
+                jitter = jitter[skip:]
+            self.head += skip
+            n = self.capacity
+        start = self.head % self.capacity
+        first = min(n, self.capacity - start)
+        self._write(start, x, y, z, rgb, birth, jitter, 0, first)
+        if first < n:
+            self._write(0, x, y, z, rgb, birth, jitter, first, n)
+        self.head += n
+        if self.head - self.tail > self.capacity:
+            self.tail = self.head - self.capacity
+
+    def _write(self, slot, x, y, z, rgb, birth, jitter, lo, hi):
+        """Copy batch rows [lo, hi) into consecutive slots starting at slot."""
+        dst = slice(slot, slot + hi - lo)
+        self.x[dst] = x[lo:hi]
+        self.y[dst] = y[lo:hi]
+        self.z[dst] = z[lo:hi]
+        self.rgb[dst] = rgb[lo:hi]
+        self.birth[dst] = birth[lo:hi]
+        self.jitter[dst] = 0.0 if jitter is None else jitter[lo:hi]
+
+    def get(self, index):
+        """Read a single live point.
+        Inputs: index into the live points (negative counts from the newest).
+        Outputs: (x, y, z, rgb, birth, (jx, jy, jz)) tuple of Python scalars."""
+        n = self.head - self.tail
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("trail index out of range")
+        slot = (self.tail + index) % self.capacity
+        return (
+            float(self.x[slot]),
+            float(self.y[slot]),
+            float(self.z[slot]),
+            int(self.rgb[slot]),
+            float(self.birth[slot]),
+            tuple(float(v) for v in self.jitter[slot]),
+        )
+
+    def expire(self, now, fade_time):
+        """Drop points whose age reached fade_time.
+        Inputs: current timestamp and fade duration in seconds.
+        Outputs: advances tail past expired points; returns number removed.
+
+        Birth times are appended in non-decreasing order, so the cut-off is
+        found with a binary search and applied as one tail move."""
+        cutoff = now - fade_time
+        removed = 0
+        for start, stop in self.segments():
+            seg = self.birth[start:stop]
+            k = int(np.searchsorted(seg, cutoff, side="right"))
+            removed += k
+            if k < stop - start:
+                break
+        self.tail += removed
+        return removed
+
+    def column(self, name):
+        """Return one column for the live points in age order.
+        Inputs: column name ("x", "y", "z", "rgb", "birth" or "jitter").
+        Outputs: NumPy array view (copy only when the ring has wrapped)."""
+        data = getattr(self, name)
+        segs = self.segments()
+        if not segs:
+            return data[:0]
+        if len(segs) == 1:
+            start, stop = segs[0]
+            return data[start:stop]
+        return np.concatenate([data[a:b] for a, b in segs])
+
+    def clear(self):
+        """Remove all points.
+        Inputs: none.
+        Outputs: resets head and tail; column memory is reused."""
+        self.head = self.tail = 0
+        self.clears += 1
@@ -1,15 +1,20 @@
 """
 SON Demo V3 - Triple Frequency 3D Lissajous (Perspective Projection)
 With Teensy serial communication for real-time frequency input.
-Format: f1;f2;f3 (e.g., 261.63;329.63;392.00)
+Format: f1;f2;f3 (e.g., 261.63;329.63;392.00) or binary frames (see teensy_protocol)
 """
 
+from startup import StartupProfiler  # First, so it can time the imports below
+
+import argparse
 import threading
-import time
 
 import pygame
 import serial
-from ui import Button, FrequencyBar, Label, Slider, Theme, draw_corners, draw_grid
+from event_ring import EventRing, LatencyMeter, ReaderState
+from hotplug import PortLink
+from teensy_protocol import StreamDecoder
+from ui import BackgroundLayer, Button, FrequencyBar, Label, Sidebar, Slider, Theme
 from visualizer_3d import TripleFrequency3DVisualizer
 
 # Config
@@ -24,30 +29,43 @@ SERIAL_BAUDRATE = 1000000
 SERIAL_TIMEOUT = 0.1
 
 
-class TeensyReader:
+class TeensyReader(ReaderState):
     """Thread-safe serial reader for Teensy frequency data.
-    Reads lines in format: f1;f2;f3 (e.g., 261.63;329.63;392.00)
+    Reads lines in format: f1;f2;f3 (e.g., 261.63;329.63;392.00) and/or
+    binary frames. Everything available is drained per read() and decoded
+    as one batch. Every event is published with its arrival time to an
+    EventRing (see drain_events); the latest values stay available through
+    get_frequencies / get_state (event_ring.ReaderState). No lock is shared
+    with the render loop.
     """
 
     def __init__(
-        self, port=SERIAL_PORT, baudrate=SERIAL_BAUDRATE, timeout=SERIAL_TIMEOUT
+        self,
+        port=SERIAL_PORT,
+        baudrate=SERIAL_BAUDRATE,
+        timeout=SERIAL_TIMEOUT,
+        serial_factory=None,
+        verbose=False,
+        recorder=None,
     ):
+        super().__init__()
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
+        # Callable returning a pyserial-like object (e.g. teensy_stub.TeensyStub)
+        self.serial_factory = serial_factory or serial.Serial
+        self.verbose = verbose  # Log every frequency triple (costly at high rates)
+        # Optional serial_session.SessionRecorder receiving every raw chunk
+        self.recorder = recorder
+        self.decoder = StreamDecoder()
+        # Opens the port once the board answers and retries on hot-plug
+        self.link = PortLink(port, baudrate, timeout, self.serial_factory)
         self.serial = None
         self.running = False
         self.thread = None
-        self.lock = threading.Lock()
-        self.frequencies = (0.0, 0.0, 0.0)
+        self.events = EventRing()  # Every decoded event, timestamped on arrival
         self.connected = False
         self.last_error = None
-        self.new_data = False  # Flag to indicate new data received
-
-        # State information from Teensy
-        self.chord_type = ""  # "Minor", "Major", etc.
-        self.current_key = 0  # Key number (0-11)
-        self.state_changed = False  # Flag for state updates
 
     def start(self):
         """Start the serial reading thread."""
@@ -60,6 +78,10 @@ class TeensyReader:
         self.running = False
         if self.thread:
             self.thread.join(timeout=2.0)
+        self._close()
+        self.link.close()
+
+    def _close(self):
         if self.serial:
             try:
                 self.serial.close()
@@ -69,128 +91,61 @@ class TeensyReader:
         self.connected = False
 
     def _connect(self):
-        """Attempt to connect to the serial port."""
-        try:
-            if self.serial:
-                self.serial.close()
-            self.serial = serial.Serial(self.port, self.baudrate, timeout=self.timeout)
-            time.sleep(0.5)  # Brief wait for connection to stabilize
-            self.connected = True
-            self.last_error = None
-            print(f"[Teensy] Connected on {self.port}")
-            return True
-        except serial.SerialException as e:
-            self.connected = False
-            self.last_error = str(e)
+        """Attempt to connect to the serial port (see hotplug.PortLink)."""
+        self._close()
+        self.serial = self.link.connect()
+        if self.serial is None:
+            self.last_error = self.link.last_error
             return False
+        self.decoder.reset()
+        self.connected = True
+        self.last_error = None
+        print(f"[Teensy] Connected on {self.port}")
+        return True
 
     def _read_loop(self):
         """Main reading loop running in separate thread."""
-        reconnect_delay = 2.0
-        last_reconnect_attempt = 0
-
         while self.running:
-            # Try to connect if not connected
+            # Reconnect as soon as the port is back; wait() returns early
+            # when a tty device appears
             if not self.connected:
-                current_time = time.time()
-                if current_time - last_reconnect_attempt >= reconnect_delay:
-                    last_reconnect_attempt = current_time
-                    if not self._connect():
-                        time.sleep(0.1)
-                        continue
-
-            # Read data
+                if not self._connect():
+                    self.link.wait()
+                continue
+
+            # Drain everything available in one call; when idle, read() blocks
+            # for up to `timeout` waiting for the next byte instead of polling
             try:
-                if self.serial and self.serial.in_waiting > 0:
-                    line = self.serial.readline().decode("utf-8").rstrip()
-                    if line:
-                        self._parse_line(line)
-                else:
-                    time.sleep(0.005)  # Small delay to avoid busy-waiting
-            except serial.SerialException as e:
-                self.connected = False
+                data = self.serial.read(self.serial.in_waiting or 1)
+                if data:
+                    if self.recorder is not None:
+                        self.recorder.write(data)
+                    self.publish(self.decoder.feed(data))
+            except (serial.SerialException, OSError) as e:
+                self._close()
                 self.last_error = str(e)
+                self.link.lost()
                 print(f"[Teensy] Serial error: {e}")
-            except UnicodeDecodeError:
-                # Ignore decode errors and continue
-                pass
 
-    def _parse_line(self, line):
-        """Parse a line from Teensy - either frequencies or state messages."""
-        # Check for state messages first
-        if line == "Minor" or line == "Major":
-            with self.lock:
-                self.chord_type = line
-                self.state_changed = True
-            print(f"[Teensy] Chord type: {line}")
-            return
-
-        if line.startswith("Key changed:"):
-            try:
-                key_str = line.split(":")[1].strip()
-                key_num = int(key_str)
-                with self.lock:
-                    self.current_key = key_num
-                    self.state_changed = True
-                print(f"[Teensy] Key changed to: {key_num}")
-            except (IndexError, ValueError):
-                pass
-            return
-
-        # Try to parse as frequencies (f1;f2;f3)
-        try:
-            parts = line.split(";")
-            if len(parts) >= 3:
-                f1 = float(parts[0])
-                f2 = float(parts[1])
-                f3 = float(parts[2])
-                with self.lock:
-                    self.frequencies = (f1, f2, f3)
-                    self.new_data = True
-                print(f"[Teensy] Frequencies: {f1:.2f}, {f2:.2f}, {f3:.2f}")
-        except ValueError:
-            # Unknown format, ignore
-            pass
-
-    def get_frequencies(self):
-        """Get the latest frequencies (thread-safe). Returns (f1, f2, f3, has_new_data)."""
-        with self.lock:
-            has_new = self.new_data
-            self.new_data = False
-            return (
-                self.frequencies[0],
-                self.frequencies[1],
-                self.frequencies[2],
-                has_new,
-            )
-
-    def get_state(self):
-        """Get the current state (thread-safe). Returns (chord_type, key, has_changed)."""
-        with self.lock:
-            has_changed = self.state_changed
-            self.state_changed = False
-            return self.chord_type, self.current_key, has_changed
+    def _on_event(self, kind, value):
+        if kind == "freq":
+            if self.verbose:
+                print("[Teensy] Frequencies: " + ", ".join(f"{f:.2f}" for f in value))
+        elif kind == "key":
+            print(f"[Teensy] Key changed to: {value}")
+        elif kind == "chord":
+            print(f"[Teensy] Chord type: {value}")
 
     def is_connected(self):
         """Check if connected to Teensy."""
         return self.connected
 
 
-def main():
-    """Main entry point with Teensy serial integration.
-    Reads frequencies from Teensy and visualizes them as 3D Lissajous curves."""
-    pygame.init()
-    Theme.init_fonts()
-    screen = pygame.display.set_mode((WIDTH, HEIGHT))
-    pygame.display.set_caption("SON Visualizer - 3D Lissajous (Teensy)")
-    clock = pygame.time.Clock()
-
-    viz = TripleFrequency3DVisualizer(MAIN_VIEW_WIDTH, HEIGHT)
-
-    # Initialize Teensy reader
-    teensy = TeensyReader()
-    teensy.start()
-
+def build_sidebar(viz):
+    """Create the sidebar widgets controlling a 3D visualizer.
+    Inputs: TripleFrequency3DVisualizer the sliders and buttons act on.
+    Outputs: (ui, widgets) - list of all elements in draw order and a dict of
+    the ones the main loop updates (status, chord, key, bar_x/y/z, points, tilt)."""
     ui = []
     y = 20
     ui.append(Label(30, y, "SON VISUALIZER", Theme.FONT_TITLE, Theme.GOLD_PRIMARY))
@@ -224,11 +179,13 @@ def main():
     y += 55
 
     lbl_pts = Label(30, y, "Points: 0", Theme.FONT_SMALL, Theme.TEXT_GRAY)
+    lbl_pts.readout = True
     ui.append(lbl_pts)
     y += 28
 
     # Tilt angle controls
     lbl_tilt = Label(30, y, "Tilt: -23°", Theme.FONT_SMALL, Theme.TEXT_GRAY)
+    lbl_tilt.readout = True
     ui.append(lbl_tilt)
     y += 35
 
@@ -283,9 +240,200 @@ def main():
         )
     )
 
+    widgets = {
+        "status": lbl_status,
+        "chord": lbl_chord,
+        "key": lbl_key,
+        "bar_x": bar_x,
+        "bar_y": bar_y,
+        "bar_z": bar_z,
+        "points": lbl_pts,
+        "tilt": lbl_tilt,
+    }
+    return ui, widgets
+
+
+def main():
+    """Main entry point with Teensy serial integration.
+    Reads frequencies from Teensy and visualizes them as 3D Lissajous curves.
+    --record saves the raw serial stream; --replay plays a saved session
+    instead of the board (--speed 0 runs it as fast as possible); --renderer gl
+    draws the trail with OpenGL (needs moderngl) and --renderer phosphor
+    accumulates it into a decaying screen buffer (--persistence); --pcm plots real audio from
+    a WAV file or local socket instead of the synthesized curve, or with
+    --track drives the synthesized curve from pitches tracked in that audio;
+    --ingest process reads the serial port in a child process and --ingest
+    asyncio from an event loop run while each frame waits for its deadline;
+    --ports reads several boards from one selector thread (TAB switches the
+    board shown); --profile-startup prints the time to the first frame by
+    phase."""
+    profiler = StartupProfiler()
+    profiler.mark("imports")
+    parser = argparse.ArgumentParser(description="SON 3D Lissajous visualizer")
+    parser.add_argument("--record", metavar="PATH", help="Record the serial session")
+    parser.add_argument("--replay", metavar="PATH", help="Replay a recorded session")
+    parser.add_argument(
+        "--speed", type=float, default=1.0, help="Replay speed (0: as fast as possible)"
+    )
+    parser.add_argument(
+        "--ingest",
+        choices=("thread", "process", "asyncio"),
+        default="thread",
+        help="Serial ingestion in a reader thread, a separate process or asyncio",
+    )
+    parser.add_argument(
+        "--ports",
+        metavar="LIST",
+        help='Several boards: "id=port,port,..." or "auto" (every Teensy found)',
+    )
+    parser.add_argument(
+        "--renderer",
+        choices=("software", "gl", "phosphor"),
+        default="software",
+        help="Trail rendering backend",
+    )
+    parser.add_argument(
+        "--persistence",
+        type=float,
+        default=2.0,
+        help="Phosphor decay time constant in seconds",
+    )
+    parser.add_argument(
+        "--pcm",
+        metavar="SOURCE",
+        help="Plot stereo audio: WAV path, host:port or unix:/path (raw PCM)",
+    )
+    parser.add_argument(
+        "--pcm-rate", type=int, default=48000, help="Sample rate of a PCM socket"
+    )
+    parser.add_argument(
+        "--third",
+        choices=("side", "lag"),
+        default="side",
+        help="Derived z channel in PCM mode (left-right, or delayed left)",
+    )
+    parser.add_argument(
+        "--track",
+        action="store_true",
+        help="With --pcm: follow the pitches tracked in the audio instead",
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Print the time to the first frame, by phase",
+    )
+    args = parser.parse_args()
+    profiler.enabled = args.profile_startup
+    if args.record and args.ingest == "process":
+        # A restarted child would start the recording over
+        parser.error("--record needs --ingest thread")
+    ports = None
+    if args.ports:
+        if args.record or args.replay or args.ingest != "thread":
+            parser.error(
+                "--ports cannot be combined with --record, --replay or --ingest"
+            )
+        from device_hub import DeviceHub, discover_ports, parse_ports
+
+        ports = discover_ports() if args.ports == "auto" else parse_ports(args.ports)
+        if not ports:
+            parser.error("no Teensy boards found")
+
+    profiler.mark("arguments")
+    # Only the modules in use: pygame.init() would also open the audio mixer
+    # and joysticks, which can take a while
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("SON Visualizer - 3D Lissajous (Teensy)")
+    clock = pygame.time.Clock()
+    profiler.mark("display")
+    Theme.init_fonts()
+    profiler.mark("fonts")
+
+    viz = TripleFrequency3DVisualizer(MAIN_VIEW_WIDTH, HEIGHT)
+    # Simulate at a fixed rate so dropped frames do not change the curve
+    viz.set_fixed_timestep(1 / FPS)
+    if args.renderer == "gl":
+        try:
+            from gl_renderer import GLRenderer
+
+            viz.set_renderer(GLRenderer())
+        except Exception as e:
+            print(f"[Render] OpenGL unavailable ({e}), using software renderer")
+    elif args.renderer == "phosphor":
+        from phosphor import PhosphorRenderer
+
+        viz.set_renderer(PhosphorRenderer(args.persistence))
+    tracker = None
+    tracked = None  # Audio source read by the pitch tracker
+    if args.pcm:
+        from pcm_source import PcmLissajous, open_source
+
+        try:
+            source = open_source(args.pcm, rate=args.pcm_rate)
+            if args.track:
+                from pitch_tracker import PitchTracker
+
+                tracker = PitchTracker(source.rate)
+                tracked = source
+            else:
+                viz.set_point_source(PcmLissajous(source, third=args.third))
+        except (OSError, EOFError, ValueError) as e:
+            print(f"[PCM] Cannot open {args.pcm} ({e}), using the frequencies")
+
+    # Initialize Teensy reader (or a recorded session standing in for it)
+    recorder = None
+    ticker = None  # Frame pacing that also runs the asyncio serial transport
+    hub = None
+    device = None  # Board shown when reading several
+    if ports:
+        teensy = hub = DeviceHub(ports, SERIAL_BAUDRATE)
+        device = next(iter(ports))
+    elif args.replay:
+        from serial_session import ReplaySource
+
+        teensy = ReplaySource(args.replay, speed=args.speed or None, frame_dt=1 / FPS)
+        viz.clock = teensy.clock  # Trail timing follows the session
+    else:
+        if args.record:
+            from serial_session import SessionRecorder
+
+            recorder = SessionRecorder(args.record)
+        if args.ingest == "process":
+            from ingest_process import IngestProcess
+
+            teensy = IngestProcess(TeensyReader)
+        elif args.ingest == "asyncio":
+            from serial_async import AsyncSerialReader, FrameTicker
+
+            ticker = FrameTicker()
+            teensy = AsyncSerialReader(
+                SERIAL_PORT, SERIAL_BAUDRATE, ticker.loop, recorder=recorder
+            )
+        else:
+            teensy = TeensyReader(recorder=recorder)
+    teensy.start()
+    latency = LatencyMeter()  # Serial arrival -> frame consumption
+
+    ui, widgets = build_sidebar(viz)
+    lbl_status = widgets["status"]
+    lbl_chord = widgets["chord"]
+    lbl_key = widgets["key"]
+    bar_x, bar_y, bar_z = widgets["bar_x"], widgets["bar_y"], widgets["bar_z"]
+    lbl_pts = widgets["points"]
+    lbl_tilt = widgets["tilt"]
+    # Repaints only the widgets whose text/value changed since the last frame
+    sidebar = Sidebar((0, 0, SIDEBAR_WIDTH, HEIGHT), ui)
+    main_rect = pygame.Rect(SIDEBAR_WIDTH, 0, MAIN_VIEW_WIDTH, HEIGHT)
+
+    background = BackgroundLayer()  # Grid and corner marks, rendered once
+    profiler.mark("setup")
+
     running = True
     drag_started = False
     last_mouse = (0, 0)
+    switched = False  # Board shown changed (TAB)
 
     while running:
         mp = pygame.mouse.get_pos()
@@ -303,86 +451,143 @@ def main():
                 last_mouse = e.pos
             elif e.type == pygame.MOUSEBUTTONUP and e.button == 1:
                 drag_started = False
-            for el in ui:
-                el.handle_event(e)
+            if e.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                sidebar.invalidate()
+            sidebar.handle_event(e)
             if e.type == pygame.KEYDOWN:
                 if e.key == pygame.K_ESCAPE:
                     running = False
                 elif e.key == pygame.K_SPACE:
                     viz.clear()
-
-        # Get frequencies from Teensy
-        f1, f2, f3, has_new = teensy.get_frequencies()
-        if has_new and f1 > 0 and f2 > 0 and f3 > 0:
-            viz.set_frequencies_direct(f1, f2, f3)
-            bar_x.set_value(f1)
-            bar_y.set_value(f2)
-            bar_z.set_value(f3)
+                elif e.key == pygame.K_TAB and hub is not None:
+                    ids = list(hub.devices)
+                    device = ids[(ids.index(device) + 1) % len(ids)]
+                    viz.clear()
+                    switched = True
+
+        # Apply every event received since the last frame, in arrival order;
+        # frequency targets take effect at the simulation tick they arrived by
+        events = teensy.drain_events()
+        latency.record(events)
+        if hub is not None:
+            # Only the board shown drives the view; a newly shown one starts
+            # from its latest values
+            events = [ev for ev in events if ev.device == device]
+            if switched:
+                events = hub.devices[device].state_events() + events
+                switched = False
+        for ev in events:
+            if ev.kind == "freq":
+                if min(ev.value) > 0:
+                    viz.queue_frequencies(ev.value, ev.t)
+                    # The bars show the first three voices
+                    f1, f2, f3 = ev.value[:3]
+                    bar_x.set_value(f1)
+                    bar_y.set_value(f2)
+                    bar_z.set_value(f3)
+            elif ev.kind == "chord":
+                lbl_chord.set_text(f"Chord: {ev.value}")
+                if ev.value == "Major":
+                    lbl_chord.color = Theme.GOLD_PRIMARY
+                else:
+                    lbl_chord.color = (150, 150, 255)  # Blueish for Minor
+            elif ev.kind == "key":
+                lbl_key.set_text(f"Key: {ev.value}")
+
+        # Pitches measured in the audio override the Teensy frequencies
+        if tracker is not None:
+            now = viz.clock()
+            tracker.feed(tracked.read(now))
+            freqs = tracker.poll(now)
+            if freqs is not None:
+                viz.queue_frequencies(freqs)
+                bar_x.set_value(freqs[0])
+                bar_y.set_value(freqs[1])
+                bar_z.set_value(freqs[2])
 
         # Update status label
-        if teensy.is_connected():
-            lbl_status.set_text("Teensy: Connected")
+        link = teensy if hub is None else hub.devices[device]
+        name = "Teensy" if hub is None else f"Teensy {device}"
+        if link.is_connected():
+            lbl_status.set_text(f"{name}: Connected")
             lbl_status.color = Theme.SUCCESS_GREEN
         else:
-            lbl_status.set_text("Teensy: Disconnected")
+            lbl_status.set_text(f"{name}: Disconnected")
             lbl_status.color = Theme.ERROR_RED
 
-        # Update state labels
-        chord_type, key_num, state_changed = teensy.get_state()
-        if state_changed or chord_type:
-            if chord_type:
-                lbl_chord.set_text(f"Chord: {chord_type}")
-                if chord_type == "Major":
-                    lbl_chord.color = Theme.GOLD_PRIMARY
-                else:
-                    lbl_chord.color = (150, 150, 255)  # Blueish for Minor
-            lbl_key.set_text(f"Key: {key_num}")
-
         viz.update()
         lbl_pts.set_text(f"Points: {len(viz.points)}")
         lbl_tilt.set_text(f"Tilt: {viz.base_rot_deg:.0f}°")
 
-        screen.fill(Theme.BLACK_BG, (0, 0, SIDEBAR_WIDTH, HEIGHT))
-        pygame.draw.rect(screen, (25, 25, 30), (0, 0, SIDEBAR_WIDTH, HEIGHT))
-        pygame.draw.line(
-            screen, Theme.GOLD_DIM, (SIDEBAR_WIDTH, 0), (SIDEBAR_WIDTH, HEIGHT), 2
-        )
-        for el in ui:
-            el.update(mp)
-            el.draw(screen)
-        main_surf = screen.subsurface((SIDEBAR_WIDTH, 0, MAIN_VIEW_WIDTH, HEIGHT))
-        main_surf.fill(Theme.BLACK_BG)
-        draw_grid(main_surf, main_surf.get_rect())
+        dirty = sidebar.draw(screen, mp)
+        main_surf = screen.subsurface(main_rect)
+        background.draw(main_surf)
         viz.draw(main_surf)
-        draw_corners(main_surf, main_surf.get_rect().inflate(-40, -40))
 
         # Show status message if no frequencies yet
-        if (
-            viz.current_freq_x <= 1
-            or viz.current_freq_y <= 1
-            or viz.current_freq_z <= 1
-        ):
-            if teensy.is_connected():
+        if viz.point_source is None and not viz.has_signal():
+            if link.is_connected():
                 msg = "Waiting for Teensy data..."
             else:
                 msg = "Teensy not connected"
             if Theme.FONT_TITLE:
-                h = Theme.FONT_TITLE.render(msg, True, (100, 100, 100))
+                h = Theme.render_text(Theme.FONT_TITLE, msg, (100, 100, 100))
                 main_surf.blit(
                     h, h.get_rect(center=(MAIN_VIEW_WIDTH // 2, HEIGHT // 2))
                 )
 
         if Theme.FONT_SMALL:
-            hint = Theme.FONT_SMALL.render(
-                "SPACE: Clear | ESC: Exit | Drag to rotate", True, (80, 80, 80)
-            )
+            keys = "SPACE: Clear | ESC: Exit | Drag to rotate"
+            if hub is not None:
+                keys += " | TAB: Next board"
+            hint = Theme.render_text(Theme.FONT_SMALL, keys, (80, 80, 80))
             main_surf.blit(hint, (12, HEIGHT - 28))
 
-        pygame.display.flip()
-        clock.tick(FPS)
+        # The 3D view changes every frame; the sidebar only where it was redrawn
+        pygame.display.update(dirty + [main_rect])
+        profiler.first_frame()
+        if ticker is not None:
+            ticker.tick(FPS)  # Serial I/O is served while the frame waits
+        else:
+            clock.tick(FPS if args.speed else 0)
 
     # Cleanup
+    viz.set_renderer(None)
+    viz.set_point_source(None)
+    if tracked is not None:
+        tracked.close()
     teensy.stop()
+    if ticker is not None:
+        ticker.close()
+    if recorder is not None:
+        recorder.close()
+        print(f"[Teensy] Recorded {recorder.chunks} chunks to {recorder.path}")
+    stats = latency.summary()
+    if stats:
+        print(
+            f"[Teensy] {stats['count']} events, latency p50 {stats['p50_ms']:.1f} ms,"
+            f" p95 {stats['p95_ms']:.1f} ms, max {stats['max_ms']:.1f} ms"
+        )
+    port_link = getattr(teensy, "link", None)
+    stats = port_link.reconnect.summary() if port_link is not None else {}
+    if stats:
+        print(
+            f"[Teensy] {stats['count']} reconnects, latency p50"
+            f" {stats['p50_ms']:.0f} ms, max {stats['max_ms']:.0f} ms"
+        )
+    if hub is not None:
+        for board, stats in hub.summary().items():
+            print(
+                f"[Hub] {board}: {stats['events']} events, {stats['connects']} connects,"
+                f" {stats['dropped']} dropped"
+            )
+    stats = tracker.summary() if tracker is not None else {}
+    if stats:
+        print(
+            f"[Pitch] {stats['blocks']} blocks, {stats['analyses']} FFTs,"
+            f" block p50 {stats['p50_ms']:.2f} ms, p95 {stats['p95_ms']:.2f} ms,"
+            f" max {stats['max_ms']:.2f} ms, {stats['over_budget']} over budget"
+        )
     pygame.quit()
 
 
@@ -7,19 +7,60 @@ rotation controls, and trail rendering with fade-out effects.
 
 import colorsys
 import math
-import random
 import time
 from collections import deque
 
+import numpy as np
 import pygame
 
-from ui import Theme
+from clock import FixedStep
+from trail_store import TrailStore, pack_rgb, unpack_rgb
+from ui import GlowBank, Theme
 
 # Shared fade configuration
 FADE_TIME = 4.0
 
 # Maximum number of points to keep in the trail
-MAX_POINTS = 10000
+MAX_POINTS = 100000
+
+
+def default_projection(voices):
+    """Build the default voice-to-axis projection matrix.
+    Inputs: number of voices N (>= 1).
+    Outputs: 3 x N float array; voice i drives axis i % 3 and every axis
+    averages the sines of its voices, so coordinates stay in [-1, 1].
+    For N = 3 this is the identity (one voice per axis)."""
+    voices = int(voices)
+    if voices < 1:
+        raise ValueError("At least one voice is required")
+    matrix = np.zeros((3, voices))
+    index = np.arange(voices)
+    matrix[index % 3, index] = 1.0
+    matrix /= np.maximum(matrix.sum(axis=1, keepdims=True), 1.0)
+    return matrix
+
+
+class SoftwareRenderer:
+    """Default trail backend: NumPy projection and depth sort, pygame drawing.
+    Inputs: none.
+    Outputs: draw_trail(viz, surf, now) renders the trail particles and axes
+    into surf; close() releases resources.
+
+    Any object with these two methods can be installed with
+    TripleFrequency3DVisualizer.set_renderer() (see gl_renderer.GLRenderer
+    and phosphor.PhosphorRenderer). Renderers read the visualizer through
+    its public interface: points (the TrailStore, see its segments()),
+    rotation_matrix(), camera_key(), project_trail(), axis_overlay(),
+    draw_software_trail() and the SPRITE_DX / SPRITE_DY particle footprint,
+    plus the volume, additive_blend and projection attributes."""
+
+    name = "software"
+
+    def draw_trail(self, viz, surf, now):
+        viz.draw_software_trail(surf, now)
+
+    def close(self):
+        pass
 
 
 class TrailPoint3D:
@@ -57,19 +98,34 @@ class TrailPoint3D:
 
 
 class TripleFrequency3DVisualizer:
-    """3D Lissajous visualizer driven by three frequencies.
-    Inputs: target surface width/height in pixels.
-    Outputs: maintains internal 3D trail and renders onto a pygame surface."""
+    """3D Lissajous visualizer driven by N voice frequencies (three by default).
+    Inputs: target surface width/height in pixels, trail capacity in points,
+    optional clock (time.time replacement) and jitter RNG seed.
+    Outputs: maintains internal 3D trail and renders onto a pygame surface.
 
-    def __init__(self, w, h):
-        self.width, self.height = w, h
-        # 3D trail points stored in world coordinates using deque for efficiency
-        self.points = deque(maxlen=MAX_POINTS)
+    Each voice advances its own phase; the 3D point is the projection matrix
+    (3 x N, see set_projection) applied to the vector of voice sines."""
+
+    # Pixel offsets of a radius-1 particle (matches pygame.draw.circle)
+    SPRITE_DX = np.array([-1, 0, -1, 0], dtype=np.int32)
+    SPRITE_DY = np.array([-1, -1, 0, 0], dtype=np.int32)
 
-        # Three frequencies (x, y, z)
-        self.target_freq_x = self.target_freq_y = self.target_freq_z = 0
-        self.current_freq_x = self.current_freq_y = self.current_freq_z = 0
-        self.phase_x = self.phase_y = self.phase_z = 0.0
+    def __init__(self, w, h, max_points=MAX_POINTS, clock=None, seed=None):
+        self.width, self.height = w, h
+        # 3D trail points stored in world coordinates as NumPy ring-buffer columns
+        self.points = TrailStore(max_points)
+
+        # Per-voice frequencies and phases; the voice count follows the
+        # frames received (3 = one voice per x, y, z axis)
+        self.voices = 3
+        self.target_freqs = np.zeros(self.voices)
+        self.current_freqs = np.zeros(self.voices)
+        self.phases = np.zeros(self.voices)
+        self.projection = default_projection(self.voices)
+        self._custom_projection = False
+        # (time, freqs) targets waiting for their simulation step, oldest
+        # first (see queue_frequencies)
+        self.pending_freqs = deque()
 
         self.target_color = (100, 100, 100)
         self.current_color = (100, 100, 100)
@@ -81,9 +137,17 @@ class TripleFrequency3DVisualizer:
         self.lerp_steps = 30
         self.last_point = self.second_last_point = None
         self.use_catmull_rom = True
+        # Vectorized RNG for per-point jitter (seed it for repeatable runs)
+        self.rng = np.random.default_rng(seed)
 
         # Time tracking for frame-rate independent animation
         self.last_update_time = None
+        # Wall-clock source for birth times and fading. Benchmarks and session
+        # replay pass a simulated clock so runs are exactly repeatable
+        self.clock = clock or time.time
+        # Fixed-timestep simulation (see set_fixed_timestep); None = per frame
+        self.stepper = None
+        self.sim_ticks = 0  # Simulation steps run by the last update()
 
         # 3D Lissajous amplitude (world space, before projection)
         # Slightly reduced radius so points do not touch the border
@@ -106,24 +170,112 @@ class TripleFrequency3DVisualizer:
         self.volume = 1.0
         self.delay = 0.0
 
-    def set_frequencies_direct(self, f1, f2, f3):
+        # Trail particle rasterizer: "pixels" scatters into the surface buffer,
+        # "circles" issues one pygame.draw.circle per point
+        self.raster_mode = "pixels"
+        self.additive_blend = False
+        # Pre-rendered glow sprites: the trail head, and optional bloom along
+        # the newest bloom_points trail points (one sprite every bloom_stride
+        # points, fading with distance from the head). Set .additive on a
+        # bank to blend its sprites additively
+        self.glow = GlowBank(layers=((20, 80),))
+        self.bloom = GlowBank(layers=((14, 24), (8, 40), (4, 64)), falloff="radial")
+        self.bloom_points = 0
+        self.bloom_stride = 8
+        # (camera key, segments, depths) for the axis overlay, see axis_overlay
+        self._axis_cache = None
+        # Backend drawing the trail and axes (see set_renderer)
+        self.renderer = SoftwareRenderer()
+        # External producer of trail points replacing the synthesized curve
+        # (see set_point_source)
+        self.point_source = None
+
+        # Seconds spent in each stage of the last update()/draw() (profiling)
+        self.frame_stats = {
+            "update": 0.0,
+            "project": 0.0,
+            "sort": 0.0,
+            "rasterize": 0.0,
+        }
+
+    def set_frequencies(self, freqs):
+        """Set target frequencies for all voices.
+        Inputs: sequence of N frequencies in Hz (one per voice).
+        Outputs: updates target frequencies and computes target color.
+
+        A different N than before resizes the voice arrays: phases of the
+        voices kept are preserved, and the projection falls back to
+        default_projection(N) unless a custom one of that width is set."""
+        freqs = np.asarray(freqs, dtype=float).ravel()
+        if len(freqs) != self.voices:
+            self._set_voices(len(freqs))
+        self.target_freqs[:] = freqs
+        # Generate color based on frequency values: mean of the voice hues
+        hues = (freqs % 1000) / 1000.0
+        rgb = np.mean([colorsys.hsv_to_rgb(h, 0.8, 0.9) for h in hues], axis=0)
+        self.target_color = tuple(int(c * 255) for c in rgb)
+
+    def queue_frequencies(self, freqs, arrival=None):
+        """Set target frequencies from the simulation step they arrived by.
+        Inputs: sequence of N frequencies in Hz and the time.perf_counter()
+        reading when they were received (event_ring.Event.t; None for now).
+        Outputs: queues the targets; update() applies each one (see
+        set_frequencies) at the first step at or after its arrival, so the
+        chords of a strum received within one frame each drive their own
+        fixed-timestep ticks instead of only the last one."""
+        t = self.clock()
+        if arrival is not None:
+            t -= max(0.0, time.perf_counter() - arrival)
+        self.pending_freqs.append((t, freqs))
+
+    def _apply_pending(self, t):
+        """Apply the queued targets that had arrived by time t (None: all)."""
+        pending = self.pending_freqs
+        while pending and (t is None or pending[0][0] <= t):
+            self.set_frequencies(pending.popleft()[1])
+
+    def set_frequencies_direct(self, *freqs):
         """Set target frequencies directly from numeric values.
-        Inputs: f1, f2, f3 frequencies in Hz.
+        Inputs: f1, f2, ... frequencies in Hz (one argument per voice).
         Outputs: updates target frequencies and computes target color."""
-        self.target_freq_x = f1
-        self.target_freq_y = f2
-        self.target_freq_z = f3
-        # Generate color based on frequency values
-        h1 = (f1 % 1000) / 1000.0
-        h2 = (f2 % 1000) / 1000.0
-        h3 = (f3 % 1000) / 1000.0
-        c1 = colorsys.hsv_to_rgb(h1, 0.8, 0.9)
-        c2 = colorsys.hsv_to_rgb(h2, 0.8, 0.9)
-        c3 = colorsys.hsv_to_rgb(h3, 0.8, 0.9)
-        r = int((c1[0] + c2[0] + c3[0]) / 3 * 255)
-        g = int((c1[1] + c2[1] + c3[1]) / 3 * 255)
-        b = int((c1[2] + c2[2] + c3[2]) / 3 * 255)
-        self.target_color = (r, g, b)
+        self.set_frequencies(freqs)
+
+    def _set_voices(self, voices):
+        if voices < 1:
+            raise ValueError("At least one voice is required")
+        keep = min(voices, self.voices)
+        phases = np.zeros(voices)
+        phases[:keep] = self.phases[:keep]
+        self.phases = phases
+        self.target_freqs = np.zeros(voices)
+        # Restart smoothing so the new chord snaps in like the first one
+        self.current_freqs = np.zeros(voices)
+        self.voices = voices
+        if not self._custom_projection or self.projection.shape[1] != voices:
+            self.projection = default_projection(voices)
+            self._custom_projection = False
+
+    def set_projection(self, matrix=None):
+        """Set the matrix mapping voice sines to world-space x, y, z.
+        Inputs: 3 x N array-like for the current voice count N, or None to
+        restore default_projection(N). Rows are typically normalized so
+        their absolute sums stay <= 1 (points remain inside the axes).
+        Outputs: updates self.projection; raises ValueError on a bad shape."""
+        if matrix is None:
+            self.projection = default_projection(self.voices)
+            self._custom_projection = False
+            return
+        matrix = np.array(matrix, dtype=float)
+        if matrix.shape != (3, self.voices):
+            raise ValueError(
+                f"Projection must be 3 x {self.voices}, got {matrix.shape}"
+            )
+        self.projection = matrix
+        self._custom_projection = True
+
+    def has_signal(self):
+        """Return True while every voice is sounding (above 1 Hz)."""
+        return bool((self.current_freqs > 1).all())
 
     def set_volume(self, v):
         """Set global brightness multiplier for trail rendering.
@@ -145,10 +297,10 @@ class TripleFrequency3DVisualizer:
         self.base_rot_deg = deg
         self.base_rot_x = math.radians(deg)
 
-    def _rotate_point(self, x, y, z):
-        """Apply camera rotation around screen-up axis then pitch.
-        Inputs: world-space x, y, z coordinates.
-        Outputs: rotated coordinates (xr, yr, zr) in camera-aligned space."""
+    def rotation_matrix(self):
+        """Build the camera rotation as a single 3x3 matrix.
+        Inputs: none; uses rot_y (yaw around screen-up) and base_rot_x + rot_x (pitch).
+        Outputs: row-major tuple of three row tuples (plain Python floats)."""
         # Keep screen up axis fixed: first rotate around up vector, then apply pitch R_x
         # Screen up in world = R_x(-total_rot_x) * (0, 1, 0) = (0, cos(total_rot_x), sin(total_rot_x))
         total_rot_x = self.base_rot_x + self.rot_x
@@ -156,18 +308,61 @@ class TripleFrequency3DVisualizer:
         ux, uy, uz = 0.0, cx, sx
         cos_y = math.cos(self.rot_y)
         sin_y = math.sin(self.rot_y)
-        # Rodrigues formula: rotate around arbitrary unit axis u by rot_y
-        dot = ux * x + uy * y + uz * z
-        cross_x = uy * z - uz * y
-        cross_y = uz * x - ux * z
-        cross_z = ux * y - uy * x
-        x1 = x * cos_y + cross_x * sin_y + ux * dot * (1 - cos_y)
-        y1 = y * cos_y + cross_y * sin_y + uy * dot * (1 - cos_y)
-        z1 = z * cos_y + cross_z * sin_y + uz * dot * (1 - cos_y)
+        k = 1 - cos_y
+        # Rodrigues formula: R = cos*I + sin*[u]x + (1 - cos)*u*u^T
+        r = (
+            (cos_y + ux * ux * k, -uz * sin_y + ux * uy * k, uy * sin_y + ux * uz * k),
+            (uz * sin_y + uy * ux * k, cos_y + uy * uy * k, -ux * sin_y + uy * uz * k),
+            (-uy * sin_y + uz * ux * k, ux * sin_y + uz * uy * k, cos_y + uz * uz * k),
+        )
         # Then apply pitch rotation R_x around screen-horizontal axis
-        y2 = y1 * cx - z1 * sx
-        z2 = y1 * sx + z1 * cx
-        return x1, y2, z2
+        return (
+            r[0],
+            tuple(r[1][j] * cx - r[2][j] * sx for j in range(3)),
+            tuple(r[1][j] * sx + r[2][j] * cx for j in range(3)),
+        )
+
+    def _rotate_point(self, x, y, z):
+        """Apply camera rotation around screen-up axis then pitch.
+        Inputs: world-space x, y, z coordinates (floats or NumPy arrays).
+        Outputs: rotated coordinates (xr, yr, zr) in camera-aligned space."""
+        # Same expression for scalars and arrays so both paths round identically
+        (m00, m01, m02), (m10, m11, m12), (m20, m21, m22) = self.rotation_matrix()
+        xr = m00 * x + m01 * y + m02 * z
+        yr = m10 * x + m11 * y + m12 * z
+        zr = m20 * x + m21 * y + m22 * z
+        return xr, yr, zr
+
+    def project_trail(self, now, newest=None, persistence=None):
+        """Rotate, project and shade every live trail point in one batch.
+        Inputs: current timestamp used for the fade, optional count to only
+        project the newest points, optional time constant in seconds for an
+        exponential fade instead of the linear FADE_TIME one.
+        Outputs: (px, py, zc, alpha, colors) arrays in screen space: clamped
+        pixel coordinates, camera depth, fade alpha and (n, 3) int RGB
+        already scaled by alpha and the volume gain."""
+        store = self.points
+
+        def column(name):
+            data = store.column(name)
+            return data if newest is None else data[-newest:]
+
+        xr, yr, zr = self._rotate_point(column("x"), column("y"), column("z"))
+        zc = np.maximum(zr + self.z_offset, 0.01)
+        X = self.focal * xr / zc
+        Y = self.focal * yr / zc
+        px = np.clip(self.width / 2 + self.view_scale * X, 0, self.width - 1)
+        py = np.clip(self.height / 2 - self.view_scale * Y, 0, self.height - 1)
+
+        age = now - column("birth")
+        if persistence is None:
+            alpha = np.where(age >= FADE_TIME, 0.0, 1.0 - (age / FADE_TIME))
+        else:
+            alpha = np.exp(-age / persistence)
+        vol_gain = 1.0 + 1.5 * self.volume
+        base = np.stack(unpack_rgb(column("rgb")), axis=1)
+        colors = np.minimum(255, base * alpha[:, None] * vol_gain).astype(np.int64)
+        return px, py, zc, alpha, colors
 
     def _project(self, x, y, z, clamp=True):
         """Project 3D point to 2D screen coordinates.
@@ -194,33 +389,74 @@ class TripleFrequency3DVisualizer:
     def update(self):
         """Advance phases, interpolate world-space points and manage trail.
         Inputs: none; uses internal target frequencies and elapsed time.
-        Outputs: updates self.points, phases and colors; no return value."""
-        now = time.time()
-
-        # Calculate delta time for frame-rate independent animation
-        if self.last_update_time is None:
-            delta_time = 1.0 / 60.0  # Assume 60 FPS for first frame
+        Outputs: updates self.points, phases and colors; no return value.
+
+        Per-frame mode integrates one step of the (clamped) frame time. With
+        set_fixed_timestep() every tick due since the last call is simulated
+        and all their segments are appended as one batch. With a point source
+        (set_point_source) its points are appended instead. Targets from
+        queue_frequencies() are applied before the first step that ends at
+        or after their arrival."""
+        t_start = time.perf_counter()
+        now = self.clock()
+
+        if self.point_source is not None:
+            self._apply_pending(None)
+            batch = self.point_source.read_points(self, now)
+            if batch is not None:
+                self.points.append_many(*batch)
+            self.sim_ticks = 0
+            ctrl = []
+        elif self.stepper is not None:
+            tick_times = self.stepper.advance(now)
+            ctrl = []
+            for t in tick_times:
+                self._apply_pending(t)
+                ctrl.append(self._step(self.stepper.dt, t))
+            self.sim_ticks = len(tick_times)
         else:
-            delta_time = now - self.last_update_time
-            # Clamp delta_time to avoid huge jumps
-            delta_time = min(delta_time, 0.1)
+            # Calculate delta time for frame-rate independent animation
+            if self.last_update_time is None:
+                delta_time = 1.0 / 60.0  # Assume 60 FPS for first frame
+            else:
+                delta_time = now - self.last_update_time
+                # Clamp delta_time to avoid huge jumps
+                delta_time = min(delta_time, 0.1)
+            self._apply_pending(None)
+            ctrl = [self._step(delta_time, now)]
+            self.sim_ticks = 1
         self.last_update_time = now
 
-        if self.target_freq_x > 0 and self.target_freq_y > 0 and self.target_freq_z > 0:
-            if self.current_freq_x == 0:
-                self.current_freq_x = self.target_freq_x
-                self.current_freq_y = self.target_freq_y
-                self.current_freq_z = self.target_freq_z
+        ctrl = [point for point in ctrl if point is not None]
+        if ctrl:
+            # Perform Catmull-Rom / linear interpolation in 3D world space
+            # Keep interpolation steps stable so point count is mostly delay-independent
+            self._append_segments(ctrl, max(0, int(self.lerp_steps)))
+
+        # Expired points sit at the front of the ring: drop them with one tail move
+        self.points.expire(now, FADE_TIME)
+
+        # Update last/second_last references
+        if len(self.points) >= 2:
+            self.second_last_point = self._trail_point(-2)
+            self.last_point = self._trail_point(-1)
+        elif len(self.points) == 1:
+            self.second_last_point, self.last_point = None, self._trail_point(0)
+        else:
+            self.second_last_point = self.last_point = None
+        self.frame_stats["update"] = time.perf_counter() - t_start
+
+    def _step(self, delta_time, now):
+        """Run one simulation step: smooth frequencies/color, advance phases.
+        Inputs: step length in seconds and the timestamp it ends at.
+        Outputs: new TrailPoint3D control point, or None while silent."""
+        if (self.target_freqs > 0).all():
+            if self.current_freqs[0] == 0:
+                self.current_freqs[:] = self.target_freqs
                 self.current_color = self.target_color
             else:
-                self.current_freq_x += (
-                    self.target_freq_x - self.current_freq_x
-                ) * self.smooth_factor
-                self.current_freq_y += (
-                    self.target_freq_y - self.current_freq_y
-                ) * self.smooth_factor
-                self.current_freq_z += (
-                    self.target_freq_z - self.current_freq_z
+                self.current_freqs += (
+                    self.target_freqs - self.current_freqs
                 ) * self.smooth_factor
             # Smooth color transition in HSV space
             curr_r, curr_g, curr_b = [c / 255.0 for c in self.current_color]
@@ -240,164 +476,212 @@ class TripleFrequency3DVisualizer:
             next_rgb = colorsys.hsv_to_rgb(next_h, next_s, next_v)
             self.current_color = tuple(int(c * 255) for c in next_rgb)
         else:
-            self.current_freq_x *= 0.95
-            self.current_freq_y *= 0.95
-            self.current_freq_z *= 0.95
-
-        if (
-            self.current_freq_x >= 1
-            and self.current_freq_y >= 1
-            and self.current_freq_z >= 1
-        ):
-            # Frame-rate independent phase advancement
-            # Multiply by delta_time and a base rate (60 = target FPS equivalent)
-            time_factor = delta_time * 60.0
-            self.phase_x += self.current_freq_x * self.speed_factor * time_factor
-            self.phase_y += self.current_freq_y * self.speed_factor * time_factor
-            self.phase_z += self.current_freq_z * self.speed_factor * time_factor
-
-            # Generate new 3D trail point in world coordinates using math.sin
-            xw = self.axis_scale * math.sin(self.phase_x)
-            yw = self.axis_scale * math.sin(self.phase_y)
-            zw = self.axis_scale * math.sin(self.phase_z)
-            color = tuple(int(c) for c in self.current_color)
-            curr = TrailPoint3D(xw, yw, zw, color, now)
-
-            # Perform Catmull-Rom / linear interpolation in 3D world space
-            # Keep interpolation steps stable so point count is mostly delay-independent
-            steps = max(0, int(self.lerp_steps))
-
-            if (
-                self.use_catmull_rom
-                and self.second_last_point
-                and self.last_point
-                and steps > 0
-            ):
-                p3 = TrailPoint3D(
-                    2 * curr.x - self.last_point.x,
-                    2 * curr.y - self.last_point.y,
-                    2 * curr.z - self.last_point.z,
-                    color,
-                    now,
-                )
-                for i in range(1, steps + 1):
-                    t = i / (steps + 1)
-                    self.points.append(
-                        self._catmull(
-                            self.second_last_point, self.last_point, curr, p3, t
-                        )
-                    )
-            elif self.last_point and steps > 0:
-                for i in range(1, steps + 1):
-                    t = i / (steps + 1)
-                    self.points.append(self._lerp(self.last_point, curr, t))
-
-            self.points.append(curr)
-            self.second_last_point = self.last_point
-            self.last_point = curr
-
-        # Remove expired points from the front of the deque
-        while self.points and not self.points[0].is_alive(now):
-            self.points.popleft()
-
-        # Update last/second_last references
-        if len(self.points) >= 2:
-            self.second_last_point, self.last_point = self.points[-2], self.points[-1]
-        elif len(self.points) == 1:
-            self.second_last_point, self.last_point = None, self.points[0]
-        else:
-            self.second_last_point = self.last_point = None
-
-    def _catmull(self, p0, p1, p2, p3, t):
-        """Catmull–Rom interpolation between 3D trail points.
-        Inputs: four TrailPoint3D control points and parameter t in [0, 1].
-        Outputs: new TrailPoint3D with jitter and brightness falloff applied."""
+            self.current_freqs *= 0.95
+
+        if not (self.current_freqs >= 1).all():
+            return None
+
+        # Frame-rate independent phase advancement
+        # Multiply by delta_time and a base rate (60 = target FPS equivalent)
+        time_factor = delta_time * 60.0
+        self.phases += self.current_freqs * self.speed_factor * time_factor
+
+        # Generate new 3D trail point in world coordinates: project the
+        # voice sines onto x, y, z in one matrix product
+        xw, yw, zw = (
+            self.axis_scale * (self.projection @ np.sin(self.phases))
+        ).tolist()
+        color = tuple(int(c) for c in self.current_color)
+        return TrailPoint3D(xw, yw, zw, color, now)
+
+    def set_fixed_timestep(self, dt, max_ticks=15):
+        """Switch between fixed-timestep and per-frame simulation.
+        Inputs: tick length in seconds (None for per-frame updates) and the
+        most ticks one update() may catch up.
+        Outputs: configures self.stepper; no return value."""
+        self.stepper = FixedStep(dt, max_ticks) if dt else None
+
+    def set_renderer(self, renderer):
+        """Install the backend that draws the trail and axes.
+        Inputs: renderer object (SoftwareRenderer, gl_renderer.GLRenderer or
+        anything with draw_trail(viz, surf, now) and close()); None restores
+        the software renderer.
+        Outputs: closes the previous renderer; no return value."""
+        if self.renderer is not None and self.renderer is not renderer:
+            self.renderer.close()
+        self.renderer = renderer or SoftwareRenderer()
+
+    def set_point_source(self, source):
+        """Replace the synthesized Lissajous curve with external points.
+        Inputs: object with read_points(viz, now) returning (x, y, z, rgb,
+        birth) arrays or None (e.g. pcm_source.PcmLissajous); None goes
+        back to synthesizing from the voice frequencies.
+        Outputs: closes the previous source; no return value."""
+        if self.point_source is not None and self.point_source is not source:
+            self.point_source.close()
+        self.point_source = source
+
+    def _trail_point(self, index):
+        """Materialize one stored point as a TrailPoint3D.
+        Inputs: index into the live trail (negative counts from the newest).
+        Outputs: TrailPoint3D copy used as an interpolation control point."""
+        x, y, z, rgb, birth, (jx, jy, jz) = self.points.get(index)
+        return TrailPoint3D(x, y, z, unpack_rgb(rgb), birth, jx, jy, jz)
+
+    def _head_point(self, now):
+        """Newest trail position visible at a render time.
+        Inputs: render timestamp.
+        Outputs: TrailPoint3D (interpolated between the two stored points
+        around now in fixed-timestep mode), or None if nothing is visible."""
+        if self.stepper is None:
+            return self._trail_point(-1)
+        birth = self.points.column("birth")
+        i = int(np.searchsorted(birth, now, side="right")) - 1
+        if i < 0:
+            return None
+        head = self._trail_point(i)
+        if i + 1 < len(birth) and birth[i + 1] > head.birth_time:
+            nxt = self._trail_point(i + 1)
+            f = (now - head.birth_time) / (nxt.birth_time - head.birth_time)
+            head.x += (nxt.x - head.x) * f
+            head.y += (nxt.y - head.y) * f
+            head.z += (nxt.z - head.z) * f
+        return head
+
+    def _append_segments(self, ctrl, steps):
+        """Interpolate the segments ending at each new control point and store them.
+        Inputs: new TrailPoint3D control points (oldest first) and number of
+        in-between points per segment.
+        Outputs: appends steps interpolated points plus the control point for
+        every segment, all as one batch.
+
+        Catmull–Rom (or linear) basis weights are evaluated for every t of every
+        segment at once; jitter comes from self.rng in a single draw and points
+        farther from the curve get dimmer (down to ~60%). Each segment starts
+        from the last two points written before it (the previous segment's
+        final in-between point and control point), so a batch is identical to
+        appending its segments one update at a time."""
+        p0, p1 = self.second_last_point, self.last_point
+        lead = []  # Control points appended without a segment
+        if steps <= 0:
+            lead, ctrl = ctrl, []
+        elif p1 is None:
+            lead, ctrl = ctrl[:1], ctrl[1:]
+            p1 = lead[0]
+            p0 = None
+        m = len(ctrl)
+
+        t = np.arange(1, steps + 1) / (steps + 1)
         t2, t3 = t * t, t * t * t
         c0 = -0.5 * t3 + t2 - 0.5 * t
         c1 = 1.5 * t3 - 2.5 * t2 + 1.0
         c2 = -1.5 * t3 + 2.0 * t2 + 0.5 * t
         c3 = 0.5 * t3 - 0.5 * t2
-        x = c0 * p0.x + c1 * p1.x + c2 * p2.x + c3 * p3.x
-        y = c0 * p0.y + c1 * p1.y + c2 * p2.y + c3 * p3.y
-        z = c0 * p0.z + c1 * p1.z + c2 * p2.z + c3 * p3.z
-        color = tuple(
-            int(max(0, min(255, c1 * p1.color[i] + c2 * p2.color[i]))) for i in range(3)
-        )
-        birth = (1 - t) * p1.birth_time + t * p2.birth_time
 
-        # Store jitter values with the point instead of recalculating each frame
-        jitter_x = jitter_y = jitter_z = 0.0
-        if self.delay > 0.0:
+        # Store jitter values with the points instead of recalculating each frame
+        jit = np.zeros((m, steps, 3))
+        jitter_amp = 0.0
+        if m and steps and self.delay > 0.0:
             # Overall scale of spatial jitter is reduced by about 3.5x
             jitter_amp = self.axis_scale * (0.4 / 3.5) * self.delay
-            jitter_x = jitter_amp * (random.random() * 2 - 1)
-            jitter_y = jitter_amp * (random.random() * 2 - 1)
-            jitter_z = jitter_amp * (random.random() * 2 - 1)
-            x += jitter_x
-            y += jitter_y
-            z += jitter_z
-            d = math.sqrt(
-                jitter_x * jitter_x + jitter_y * jitter_y + jitter_z * jitter_z
-            )
-            # Farther from the original curve, points become slightly dimmer (down to ~60%)
-            falloff = 1.0 - 0.4 * min(1.0, d / jitter_amp) if jitter_amp > 0 else 1.0
-            color = tuple(int(c * falloff) for c in color)
-
-        return TrailPoint3D(x, y, z, color, birth, jitter_x, jitter_y, jitter_z)
-
-    def _lerp(self, p1, p2, t):
-        """Linear interpolation between two 3D trail points.
-        Inputs: endpoints p1/p2 and parameter t in [0, 1].
-        Outputs: new TrailPoint3D with optional jitter and brightness falloff."""
-        x = p1.x * (1 - t) + p2.x * t
-        y = p1.y * (1 - t) + p2.y * t
-        z = p1.z * (1 - t) + p2.z * t
-        color = tuple(int(p1.color[i] * (1 - t) + p2.color[i] * t) for i in range(3))
-        birth = p1.birth_time * (1 - t) + p2.birth_time * t
-
-        # Store jitter values with the point instead of recalculating each frame
-        jitter_x = jitter_y = jitter_z = 0.0
-        if self.delay > 0.0:
-            jitter_amp = self.axis_scale * (0.4 / 3.5) * self.delay
-            jitter_x = jitter_amp * (random.random() * 2 - 1)
-            jitter_y = jitter_amp * (random.random() * 2 - 1)
-            jitter_z = jitter_amp * (random.random() * 2 - 1)
-            x += jitter_x
-            y += jitter_y
-            z += jitter_z
-            d = math.sqrt(
-                jitter_x * jitter_x + jitter_y * jitter_y + jitter_z * jitter_z
+            jit = jitter_amp * (self.rng.random((m, steps, 3)) * 2 - 1)
+
+        # Walk the control points to find each segment's neighbours; only the
+        # last in-between point of a segment is needed to start the next one
+        world_p0 = np.zeros((m, 3))
+        world_p1 = np.empty((m, 3))
+        world_p2 = np.empty((m, 3))
+        color1 = np.empty((m, 3), dtype=np.int64)
+        color2 = np.empty((m, 3), dtype=np.int64)
+        birth1 = np.empty(m)
+        birth2 = np.empty(m)
+        catmull = np.zeros(m, dtype=bool)
+        prev0 = None if p0 is None else (p0.x, p0.y, p0.z)
+        prev1 = p1
+        for j, curr in enumerate(ctrl):
+            a = (prev1.x, prev1.y, prev1.z)
+            b = (curr.x, curr.y, curr.z)
+            if self.use_catmull_rom and prev0 is not None:
+                catmull[j] = True
+                world_p0[j] = prev0
+                # p3 extrapolated from the last two control points
+                last = [
+                    c0[-1] * prev0[k]
+                    + c1[-1] * a[k]
+                    + c2[-1] * b[k]
+                    + c3[-1] * (2 * b[k] - a[k])
+                    for k in range(3)
+                ]
+            else:
+                last = [a[k] * (1 - t[-1]) + b[k] * t[-1] for k in range(3)]
+            world_p1[j] = a
+            world_p2[j] = b
+            color1[j] = prev1.color
+            color2[j] = curr.color
+            birth1[j] = prev1.birth_time
+            birth2[j] = curr.birth_time
+            prev0 = tuple(last[k] + jit[j, -1, k] for k in range(3))
+            prev1 = curr
+
+        tt = t[None, :]
+        cat = catmull[:, None]
+        coords = []
+        for k in range(3):
+            q0, q1, q2 = (
+                world_p0[:, k : k + 1],
+                world_p1[:, k : k + 1],
+                world_p2[:, k : k + 1],
             )
-            falloff = 1.0 - 0.4 * min(1.0, d / jitter_amp) if jitter_amp > 0 else 1.0
-            color = tuple(int(c * falloff) for c in color)
-
-        return TrailPoint3D(x, y, z, color, birth, jitter_x, jitter_y, jitter_z)
-
-    def draw(self, surf):
-        """Render 3D axes, trail particles and glow to a surface.
-        Inputs: pygame Surface covering the main 3D viewport.
-        Outputs: draws using current state; no return value."""
-        now = time.time()
-        items = []  # (depth, kind, color, size, x1, y1, x2?, y2?)
-        vol_gain = 1.0 + 1.5 * self.volume
+            spline = c0 * q0 + c1 * q1 + c2 * q2 + c3 * (2 * q2 - q1)
+            line = q1 * (1 - tt) + q2 * tt
+            coords.append(np.where(cat, spline, line) + jit[:, :, k])
+        x, y, z = coords
+        color = np.where(
+            cat[:, :, None],
+            np.clip(
+                c1[None, :, None] * color1[:, None, :]
+                + c2[None, :, None] * color2[:, None, :],
+                0,
+                255,
+            ),
+            color1[:, None, :] * (1 - tt)[:, :, None]
+            + color2[:, None, :] * tt[:, :, None],
+        ).astype(np.int64)
+        birth = (1 - tt) * birth1[:, None] + tt * birth2[:, None]
+        if jitter_amp > 0:
+            d = np.sqrt((jit * jit).sum(axis=2))
+            falloff = 1.0 - 0.4 * np.minimum(1.0, d / jitter_amp)
+            color = (color * falloff[:, :, None]).astype(np.int64)
+
+        # Each segment: its in-between points followed by its control point
+        x = np.concatenate([x, world_p2[:, 0:1]], axis=1).ravel()
+        y = np.concatenate([y, world_p2[:, 1:2]], axis=1).ravel()
+        z = np.concatenate([z, world_p2[:, 2:3]], axis=1).ravel()
+        color = np.concatenate([color, color2[:, None, :]], axis=1).reshape(-1, 3)
+        birth = np.concatenate([birth, birth2[:, None]], axis=1).ravel()
+        jitter = np.concatenate([jit, np.zeros((m, 1, 3))], axis=1).reshape(-1, 3)
+        if lead:
+            x = np.append([p.x for p in lead], x)
+            y = np.append([p.y for p in lead], y)
+            z = np.append([p.z for p in lead], z)
+            color = np.concatenate([np.array([p.color for p in lead]), color])
+            birth = np.append([p.birth_time for p in lead], birth)
+            jitter = np.concatenate([np.zeros((len(lead), 3)), jitter])
+
+        self.points.append_many(
+            x,
+            y,
+            z,
+            pack_rgb(color[:, 0], color[:, 1], color[:, 2]),
+            birth,
+            jitter,
+        )
 
-        # Project all points once
-        projected = []
-        if self.points:
-            for p in self.points:
-                xr, yr, zr = self._rotate_point(p.x, p.y, p.z)
-                zc = zr + self.z_offset
-                if zc <= 0.01:
-                    zc = 0.01
-                X = self.focal * xr / zc
-                Y = self.focal * yr / zc
-                px = self.width / 2 + self.view_scale * X
-                py = self.height / 2 - self.view_scale * Y
-                px = max(0, min(self.width - 1, px))
-                py = max(0, min(self.height - 1, py))
-                projected.append((px, py, zr, zc))
-
-        # Draw 3D axes
+    def _axis_segments(self):
+        """Project the three world axes and their arrow heads.
+        Inputs: none; uses the current camera orientation and viewport size.
+        Outputs: list of (depth, color, width, x1, y1, x2, y2) line segments."""
+        segments = []
         axis_len = 1.8
         axis_color = Theme.GOLD_DIM
         axes = [
@@ -421,13 +705,12 @@ class TripleFrequency3DVisualizer:
             px1 = self.width / 2 + self.view_scale * X1
             py1 = self.height / 2 - self.view_scale * Y1
             depth = (zc0 + zc1) / 2.0
-            items.append((depth, "line", axis_color, 3, px0, py0, px1, py1))
+            segments.append((depth, axis_color, 3, px0, py0, px1, py1))
 
-        # Draw axis arrows
+        # Axis arrows
         arrow_len = 12
         margin = 4
         for (x0, y0, z0), (x1, y1, z1) in axes:
-            xr0, yr0, zr0 = self._rotate_point(x0, y0, z0)
             xr1, yr1, zr1 = self._rotate_point(x1, y1, z1)
             zc1 = zr1 + self.z_offset
             if zc1 <= 0.01:
@@ -455,17 +738,177 @@ class TripleFrequency3DVisualizer:
             rx = bx + (ux * cos_a + uy * sin_a) * (arrow_len * 0.6)
             ry = by + (-ux * sin_a + uy * cos_a) * (arrow_len * 0.6)
             depth_arrow = zc1
-            items.append((depth_arrow, "line", axis_color, 3, tx, ty, lx, ly))
-            items.append((depth_arrow, "line", axis_color, 3, tx, ty, rx, ry))
+            segments.append((depth_arrow, axis_color, 3, tx, ty, lx, ly))
+            segments.append((depth_arrow, axis_color, 3, tx, ty, rx, ry))
+        return segments
+
+    def camera_key(self):
+        """Everything the screen position of a world point depends on.
+        Inputs: none.
+        Outputs: tuple of rotation, projection settings and viewport size;
+        equal keys mean cached projections are still valid."""
+        return (
+            self.rot_y,
+            self.rot_x,
+            self.base_rot_x,
+            self.width,
+            self.height,
+            self.z_offset,
+            self.focal,
+            self.view_scale,
+        )
+
+    def axis_overlay(self):
+        """Axis segments sorted far to near, cached per camera orientation.
+        Inputs: none; uses rotation, projection settings and viewport size.
+        Outputs: (segments, depths) - the _axis_segments() list ordered far
+        to near and its depths, rebuilt only when one of the inputs changed."""
+        key = self.camera_key()
+        if self._axis_cache is None or self._axis_cache[0] != key:
+            segments = sorted(
+                self._axis_segments(), key=lambda seg: seg[0], reverse=True
+            )
+            self._axis_cache = (key, segments, [seg[0] for seg in segments])
+        return self._axis_cache[1], self._axis_cache[2]
+
+    @staticmethod
+    def _depth_order(zc, live, segment_depths):
+        """Back-to-front ordering of trail points with axis segments merged in.
+        Inputs: camera depth array zc, boolean live mask, segment depths
+        (already sorted far to near).
+        Outputs: (order, cuts): trail indices sorted far to near, and for each
+        segment the number of ordered points drawn before it.
+
+        Equal depths keep insertion order (segments first, then trail order),
+        matching a stable sort over the combined render list."""
+        idx = np.flatnonzero(live)
+        neg = -zc[idx]
+        sort = np.argsort(neg, kind="stable")
+        order = idx[sort]
+        # Points strictly farther than a segment are drawn before it
+        cuts = np.searchsorted(neg[sort], -np.asarray(segment_depths), side="left")
+        return order, cuts.tolist()
+
+    def _draw_points(self, surf, order, pxj, pyj, colors, radius):
+        """Draw a run of depth-ordered trail particles.
+        Inputs: target surface, trail indices to draw (far to near) and
+        per-point screen x/y, RGB (n, 3) and radius arrays.
+        Outputs: draws onto surf with the current raster_mode; no return value."""
+        if self.raster_mode == "circles":
+            for i in order.tolist():
+                pygame.draw.circle(
+                    surf,
+                    tuple(colors[i]),
+                    (int(pxj[i]), int(pyj[i])),
+                    int(radius[i]),
+                )
+            return
+        self._scatter_points(surf, order, pxj, pyj, colors)
+
+    def _scatter_points(self, surf, order, pxj, pyj, colors):
+        """Write particles straight into the surface pixel buffer.
+        Inputs: target surface, ordered trail indices, screen x/y and RGB arrays.
+        Outputs: one vectorized scatter through a surfarray view; no return value.
+
+        Each particle covers the same 2x2 footprint pygame.draw.circle uses
+        for radius 1 (x-1..x, y-1..y). In overwrite mode later (nearer)
+        points win on overlap; with additive_blend colors are summed and
+        clamped to 255 regardless of order."""
+        w, h = surf.get_size()
+        cx = pxj[order].astype(np.int32)
+        cy = pyj[order].astype(np.int32)
+        xs = (cx[:, None] + self.SPRITE_DX).ravel()
+        ys = (cy[:, None] + self.SPRITE_DY).ravel()
+        colors = colors[order]
+        # Index (into this run) of the particle covering each pixel, in draw order
+        src = np.repeat(np.arange(len(order)), len(self.SPRITE_DX))
+        inside = (xs >= 0) & (xs < w) & (ys >= 0) & (ys < h)
+        if not inside.all():
+            xs, ys, src = xs[inside], ys[inside], src[inside]
+        if len(xs) == 0:
+            return
+
+        if self.additive_blend:
+            lin, inverse = np.unique(xs * h + ys, return_inverse=True)
+            rgb = colors[src]
+            total = np.stack(
+                [np.bincount(inverse, rgb[:, k], len(lin)) for k in range(3)], axis=1
+            ).astype(np.int64)
+            ux, uy = lin // h, lin % h
+            view = pygame.surfarray.pixels3d(surf)
+            try:
+                view[ux, uy] = np.minimum(255, view[ux, uy] + total)
+            finally:
+                del view
+        elif surf.get_bytesize() == 4:
+            # One 32-bit store per pixel, colors mapped to the surface format
+            rs, gs, bs, _ = surf.get_shifts()
+            rl, gl, bl, _ = surf.get_losses()
+            mapped = (
+                ((colors[:, 0] >> rl) << rs)
+                | ((colors[:, 1] >> gl) << gs)
+                | ((colors[:, 2] >> bl) << bs)
+                | surf.get_masks()[3]
+            )
+            view = pygame.surfarray.pixels2d(surf)
+            try:
+                # Repeated indices keep the last assignment: nearest point wins
+                view[xs, ys] = mapped[src]
+            finally:
+                del view
+        else:
+            view = pygame.surfarray.pixels3d(surf)
+            try:
+                view[xs, ys] = colors[src]
+            finally:
+                del view
+
+    def _draw_bloom(self, surf, now):
+        """Glow sprites along the newest part of the trail.
+        Inputs: target surface and render timestamp.
+        Outputs: one batched blit of cached bank sprites; no return value."""
+        count = self.bloom_points * self.bloom_stride
+        px, py, _, alpha, colors = self.project_trail(now, newest=count)
+        live = alpha > 0
+        if self.stepper is not None:
+            live &= alpha <= 1.0
+        idx = np.flatnonzero(live)[::-1][:: self.bloom_stride]
+        if len(idx) == 0:
+            return
+        taper = 1.0 - np.arange(len(idx)) / len(idx)
+        tints = (colors[idx] * taper[:, None]).astype(np.int64).tolist()
+        centers = zip(px[idx].tolist(), py[idx].tolist())
+        self.bloom.blit_many(surf, zip(centers, tints))
+
+    def draw(self, surf):
+        """Render 3D axes, trail particles and glow to a surface.
+        Inputs: pygame Surface covering the main 3D viewport.
+        Outputs: draws using current state and records per-stage timings in
+        frame_stats; no return value.
+
+        In fixed-timestep mode the scene is drawn one tick in the past: points
+        simulated after that instant are hidden and the head is interpolated
+        between the two points around it, so motion stays smooth whatever the
+        ratio between frame rate and tick rate.
+
+        The centre mark, bloom and head glow are 2D sprites drawn here; the
+        trail particles and axes go through self.renderer on top of them."""
+        now = self.clock()
+        if self.stepper is not None:
+            now -= self.stepper.dt
+        vol_gain = 1.0 + 1.5 * self.volume
 
         # Draw center point
         center_x = self.width / 2
         center_y = self.height / 2
         pygame.draw.circle(surf, (200, 200, 200), (int(center_x), int(center_y)), 3)
 
-        # Draw glow effect for the last point and collect trail points
-        if self.points:
-            last = self.points[-1]
+        if self.points and self.bloom_points > 0:
+            self._draw_bloom(surf, now)
+
+        # Draw glow effect for the last point
+        last = self._head_point(now) if self.points else None
+        if last is not None:
             xr, yr, zr = self._rotate_point(last.x, last.y, last.z)
             zc = zr + self.z_offset
             if zc < 0.01:
@@ -478,34 +921,59 @@ class TripleFrequency3DVisualizer:
             if alpha > 0:
                 glow_color = last.color
                 gc = tuple(int(min(255, v * alpha * vol_gain)) for v in glow_color)
-                s = pygame.Surface((50, 50), pygame.SRCALPHA)
-                pygame.draw.circle(s, (*gc, 80), (25, 25), 20)
-                surf.blit(s, (px - 25, py - 25))
+                self.glow.blit(surf, (px, py), gc)
                 pygame.draw.circle(surf, (255, 255, 255), (int(px), int(py)), 4)
 
-            # Add trail points to render list
-            if projected:
-                for (pxp, pyp, zr_p, zc_p), p in zip(projected, self.points):
-                    a = p.get_alpha(now)
-                    if a <= 0:
-                        continue
-                    base_c = p.color
-                    c = tuple(int(min(255, base_c[k] * a * vol_gain)) for k in range(3))
-                    radius = max(1, int((1 + 1.5 * a) * 0.25))
-                    # Use stored jitter instead of recalculating
-                    pxj = pxp + p.jitter_x * 10  # Scale jitter for screen space
-                    pyj = pyp + p.jitter_y * 10
-                    items.append((zc_p, "point", c, radius, pxj, pyj, 0, 0))
-
-        # Sort by depth (back to front) and render
-        items.sort(key=lambda it: it[0], reverse=True)
-        for _, kind, color, size, x1, y1, x2, y2 in items:
-            if kind == "line":
-                pygame.draw.line(
-                    surf, color, (int(x1), int(y1)), (int(x2), int(y2)), int(size)
+        self.renderer.draw_trail(self, surf, now)
+
+    def draw_software_trail(self, surf, now, persistence=None):
+        """Software trail rendering: project, depth-sort and rasterize.
+        Inputs: target surface, render timestamp and optional exponential
+        fade time constant (see project_trail).
+        Outputs: draws particles and axis segments far to near and records
+        the project/sort/rasterize timings in frame_stats."""
+        # Project all points once
+        t_start = time.perf_counter()
+        projected = (
+            self.project_trail(now, persistence=persistence) if self.points else None
+        )
+        self.frame_stats["project"] = time.perf_counter() - t_start
+
+        # 3D axes and arrows, ordered far to near (cached per camera orientation)
+        segments, segment_depths = self.axis_overlay()
+
+        # Depth-order trail points (argsort) and find where each axis segment fits
+        t_sort = time.perf_counter()
+        if projected is not None:
+            px, py, zc, alpha, colors = projected
+            live = alpha > 0
+            if self.stepper is not None:
+                live &= alpha <= 1.0  # Born after the render time: not shown yet
+            order, cuts = self._depth_order(zc, live, segment_depths)
+        else:
+            order, cuts = np.empty(0, dtype=np.int64), [0] * len(segments)
+        self.frame_stats["sort"] = time.perf_counter() - t_sort
+
+        # Render back to front
+        t_raster = time.perf_counter()
+        if projected is not None:
+            jitter = self.points.column("jitter")
+            # Use stored jitter instead of recalculating (scaled for screen space)
+            pxj = px + jitter[:, 0] * 10
+            pyj = py + jitter[:, 1] * 10
+            radius = np.maximum(1, ((1 + 1.5 * alpha) * 0.25).astype(np.int64))
+            point_colors = colors
+        drawn = 0
+        for cut, (_, color, width, x1, y1, x2, y2) in zip(cuts, segments):
+            if cut > drawn:
+                self._draw_points(
+                    surf, order[drawn:cut], pxj, pyj, point_colors, radius
                 )
-            elif kind == "point":
-                pygame.draw.circle(surf, color, (int(x1), int(y1)), int(size))
+                drawn = cut
+            pygame.draw.line(surf, color, (int(x1), int(y1)), (int(x2), int(y2)), width)
+        if len(order) > drawn:
+            self._draw_points(surf, order[drawn:], pxj, pyj, point_colors, radius)
+        self.frame_stats["rasterize"] = time.perf_counter() - t_raster
 
     def clear(self):
         """Clear all trail points and reset interpolation state.